@@ -0,0 +1,339 @@
+import argparse
+import io
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from conversion_profiler import ConversionProfiler
+from lazy_import import require_modules
+from memory_budget import format_bytes, parse_memory_size
+from litematic_metadata import iter_litematic_files
+from multi_format_converter import DEFAULT_FORMATS, WRITERS, PendingWrite
+from multi_format_converter import ThreadRoutedOutput, convert_to_formats
+from multi_format_converter import output_paths
+from output_cache import DEFAULT_CACHE_DIR, OutputCache, content_hash
+from output_cache import output_options, write_atomic
+from parallel_gzip import DEFAULT_LEVEL
+DONE = None
+DEFAULT_QUEUE_SIZE = 2
+
+
+class BatchItem:
+
+    def __init__(self, index: int, path: str):
+        self.index = index
+        self.path = path
+        self.data: Optional[bytes] = None
+        self.results: Dict[str, Any] = {}
+        self.write_errors: Dict[str, str] = {}
+        self.log = ''
+        self.error: Optional[str] = None
+        self.pending_writes = 0
+        self.cache_keys: Dict[str, str] = {}
+        self.cached_formats: List[str] = []
+        self.converted = False
+        self.finished = False
+        self.profiler = ConversionProfiler(label=path)
+
+    @property
+    def failed_outputs(self) ->List[str]:
+        return [fmt for fmt, output in self.results.items() if not output]
+
+
+class BatchPipeline:
+
+    def __init__(self, formats: Iterable[str]=DEFAULT_FORMATS, output_dir:
+        Optional[str]=None, region_name: Optional[str]=None, readers: int=1,
+        workers: int=1, writers: int=1, queue_size: int=DEFAULT_QUEUE_SIZE,
+        compresslevel: int=DEFAULT_LEVEL, compress_threads: int=1, cache:
+        Optional[OutputCache]=None):
+        self.formats = list(dict.fromkeys(formats))
+        self.output_dir = output_dir
+        self.region_name = region_name
+        self.readers = max(1, readers)
+        self.workers = max(1, workers)
+        self.writers = max(1, writers)
+        self.queue_size = max(1, queue_size)
+        self.compresslevel = compresslevel
+        self.compress_threads = compress_threads
+        self.cache = cache
+        self.profiler = ConversionProfiler(label='batch')
+        self._lock = threading.Lock()
+        self._paths: 'queue.Queue[BatchItem]' = queue.Queue()
+        self._decode_queue: 'queue.Queue[Optional[BatchItem]]' = queue.Queue(
+            self.queue_size)
+        self._write_queue = queue.Queue(self.queue_size)
+        self._done: 'queue.Queue[BatchItem]' = queue.Queue()
+
+    def max_items_in_flight(self) ->int:
+        return (self.readers + self.queue_size + self.workers + self.
+            queue_size + self.writers)
+
+    def _add_time(self, stage: str, seconds: float):
+        with self._lock:
+            self.profiler.add_time(stage, seconds)
+
+    def _count(self, name: str, value: int):
+        with self._lock:
+            self.profiler.count(name, value)
+
+    def _finish_if_ready(self, item: BatchItem):
+        with self._lock:
+            if item.finished or not item.converted or item.pending_writes:
+                return
+            item.finished = True
+        for fmt, error in item.write_errors.items():
+            item.results[fmt] = False
+            item.log += f'❌ {fmt} write failed: {error}\n'
+        self._done.put(item)
+
+    def _fail(self, item: BatchItem, error: str):
+        item.error = error
+        item.results = {fmt: False for fmt in self.formats}
+        item.data = None
+        item.converted = True
+        self._finish_if_ready(item)
+
+    def _read(self):
+        while True:
+            try:
+                item = self._paths.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            try:
+                with open(item.path, 'rb') as f:
+                    item.data = f.read()
+            except OSError as e:
+                self._fail(item, f'Error reading {item.path}: {e}')
+                continue
+            self._add_time('read', time.perf_counter() - start)
+            self._count('bytes_read', len(item.data))
+            self._decode_queue.put(item)
+
+    def _cached_outputs(self, item: BatchItem) ->Dict[str, bytes]:
+        if self.cache is None:
+            return {}
+        start = time.perf_counter()
+        input_hash = content_hash(item.data)
+        name = Path(item.path).stem
+        cached = {}
+        for fmt in self.formats:
+            key = self.cache.key(input_hash, fmt, output_options(fmt, name,
+                self.region_name, compression_level=self.compresslevel))
+            item.cache_keys[fmt] = key
+            data = self.cache.get(key)
+            if data is not None:
+                cached[fmt] = data
+        item.cached_formats = list(cached)
+        self._add_time('cache', time.perf_counter() - start)
+        return cached
+
+    def _store(self, item: BatchItem, pending: PendingWrite):
+        start = time.perf_counter()
+        try:
+            with open(pending.output_path, 'rb') as f:
+                self.cache.put(item.cache_keys[pending.fmt], f.read())
+        except OSError:
+            pass
+        self._add_time('cache', time.perf_counter() - start)
+
+    def _convert(self, routed: ThreadRoutedOutput):
+        while True:
+            item = self._decode_queue.get()
+            if item is DONE:
+                return
+
+            def sink(pending: PendingWrite, item=item):
+                with self._lock:
+                    item.pending_writes += 1
+                self._write_queue.put((item, pending))
+            start = time.perf_counter()
+            try:
+                with routed.capture() as log:
+                    cached = self._cached_outputs(item)
+                    paths = output_paths(item.path, cached, self.output_dir)
+                    for fmt, data in cached.items():
+                        print(
+                            f'🗄️  {fmt}: reused cached output ({len(data):,} bytes)'
+                            )
+                        sink(PendingWrite(fmt, paths[fmt], lambda path=
+                            paths[fmt], data=data: write_atomic(path, data)))
+                    results = dict(paths)
+                    formats = [fmt for fmt in self.formats if fmt not in
+                        cached]
+                    if formats:
+                        results.update(convert_to_formats(item.path,
+                            formats, self.output_dir, self.region_name,
+                            concurrent=False, profiler=item.profiler,
+                            fileobj=io.BytesIO(item.data), sink=sink,
+                            compresslevel=self.compresslevel,
+                            compress_threads=self.compress_threads))
+                    item.results = {fmt: results[fmt] for fmt in self.formats}
+                item.log = log.getvalue()
+            except Exception as e:
+                self._fail(item, f'Error converting {item.path}: {e}')
+                continue
+            finally:
+                self._add_time('convert', time.perf_counter() - start)
+            item.data = None
+            with self._lock:
+                item.converted = True
+            self._finish_if_ready(item)
+
+    def _write(self):
+        while True:
+            entry = self._write_queue.get()
+            if entry is DONE:
+                return
+            item, pending = entry
+            start = time.perf_counter()
+            try:
+                pending.write()
+            except Exception as e:
+                item.write_errors[pending.fmt] = str(e)
+            self._add_time('write', time.perf_counter() - start)
+            if (self.cache is not None and pending.fmt not in item.
+                cached_formats and pending.fmt not in item.write_errors):
+                self._store(item, pending)
+            with self._lock:
+                item.pending_writes -= 1
+            self._finish_if_ready(item)
+
+    def run(self, paths: Iterable[str], quiet: bool=False) ->List[BatchItem]:
+        items = [BatchItem(index, path) for index, path in enumerate(paths)]
+        if not items:
+            return items
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+        for item in items:
+            self._paths.put(item)
+        routed = ThreadRoutedOutput(sys.stdout)
+        threads = [threading.Thread(target=self._read, name=
+            f'reader-{n}', daemon=True) for n in range(min(self.readers,
+            len(items)))]
+        threads += [threading.Thread(target=self._convert, args=(routed,),
+            name=f'worker-{n}', daemon=True) for n in range(self.workers)]
+        threads += [threading.Thread(target=self._write, name=
+            f'writer-{n}', daemon=True) for n in range(self.writers)]
+        self.profiler.start()
+        sys.stdout = routed
+        try:
+            for thread in threads:
+                thread.start()
+            for _ in items:
+                item = self._done.get()
+                if not quiet:
+                    print(f'\n=== [{item.index + 1}/{len(items)}] {item.path} ==='
+                        )
+                    print(item.log, end='')
+                if item.error:
+                    print(f'❌ {item.error}')
+        finally:
+            for _ in range(self.workers):
+                self._decode_queue.put(DONE)
+            for _ in range(self.writers):
+                self._write_queue.put(DONE)
+            for thread in threads:
+                thread.join()
+            sys.stdout = routed.stream
+            self.profiler.stop()
+        self.profiler.count('files', len(items))
+        if self.cache is not None:
+            stats = self.cache.stats()
+            for name in ('hits', 'misses', 'bytes_saved', 'evictions'):
+                self.profiler.set_counter(f'cache_{name}', stats[name])
+        return items
+
+    def print_summary(self, items: List[BatchItem]):
+        elapsed = self.profiler.total_seconds()
+        failed = [item for item in items if item.failed_outputs]
+        busy = {stage: self.profiler.stages.get(stage, {}).get('seconds',
+            0.0) for stage in ('read', 'convert', 'write')}
+        print(
+            f"\n⏱️  read {busy['read']:.2f}s, convert {busy['convert']:.2f}s, write {busy['write']:.2f}s of thread time in {elapsed:.2f}s wall clock"
+            )
+        print(
+            f'📦 At most {self.max_items_in_flight()} file(s) in flight ({self.readers} reader(s), {self.workers} worker(s), {self.writers} writer(s), queues of {self.queue_size})'
+            )
+        if self.cache is not None:
+            stats = self.cache.stats()
+            print(
+                f"🗄️  Cache: {stats['hits']} hit(s), {stats['misses']} miss(es) ({stats['hit_rate']:.0%} hit rate), {format_bytes(stats['bytes_saved'])} reused"
+                )
+        for item in failed:
+            print(f"❌ {item.path}: {', '.join(item.failed_outputs)}")
+        print(
+            f'🎯 {len(items)} file(s), {len(failed)} with failed outputs in {elapsed:.2f}s'
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=
+        'Convert many .litematic files with reading, converting and writing overlapped'
+        )
+    parser.add_argument('inputs', nargs='+', help=
+        '.litematic files or directories to convert')
+    parser.add_argument('-o', '--output-dir', help=
+        'Directory for the outputs (default: next to each input)')
+    parser.add_argument('--formats', nargs='+', choices=sorted(WRITERS),
+        default=list(DEFAULT_FORMATS), help=
+        'Formats to write (default: bp schem)')
+    parser.add_argument('--region', help=
+        'Region to convert (default: the first one)')
+    parser.add_argument('--no-recursive', action='store_true', help=
+        'Only scan the top level of directories')
+    parser.add_argument('--readers', type=int, default=2, help=
+        'Threads reading input files (default: 2)')
+    parser.add_argument('--workers', type=int, default=1, help=
+        'Threads decoding and encoding (default: 1)')
+    parser.add_argument('--writers', type=int, default=2, help=
+        'Threads compressing and writing outputs (default: 2)')
+    parser.add_argument('--queue-size', type=int, default=
+        DEFAULT_QUEUE_SIZE, help=
+        f'Files buffered between stages; bounds memory (default: {DEFAULT_QUEUE_SIZE})'
+        )
+    parser.add_argument('--compression-level', type=int, choices=range(1,
+        10), default=DEFAULT_LEVEL, metavar='1-9', help=
+        'gzip level: 1 is fastest, 9 is smallest (default: 9)')
+    parser.add_argument('--compress-threads', type=int, default=1, help=
+        'Threads compressing each output (default: 1, 0 = all cores)')
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_DIR,
+        metavar='DIR', help=
+        f'Reuse outputs of identical inputs from a disk cache (default DIR: {DEFAULT_CACHE_DIR})'
+        )
+    parser.add_argument('--cache-size', default='1G', help=
+        'Largest total size of the cache, e.g. 512M or 4G (default: 1G)')
+    parser.add_argument('--quiet', action='store_true', help=
+        'Only print the summary')
+    parser.add_argument('--profile', metavar='REPORT', help=
+        'Write a JSON report of the stage busy times')
+    args = parser.parse_args()
+    require_modules(('nbtlib', 'numpy') + (('PIL',) if 'bp' in args.
+        formats else ()))
+    paths = list(iter_litematic_files(args.inputs, not args.no_recursive))
+    if not paths:
+        print('No .litematic files found')
+        return 1
+    cache = None
+    if args.cache:
+        try:
+            cache = OutputCache(args.cache, parse_memory_size(args.cache_size))
+        except ValueError as e:
+            parser.error(str(e))
+    pipeline = BatchPipeline(args.formats, args.output_dir, args.region,
+        args.readers, args.workers, args.writers, args.queue_size, args.
+        compression_level, args.compress_threads, cache)
+    items = pipeline.run(paths, args.quiet)
+    pipeline.print_summary(items)
+    if args.profile:
+        pipeline.profiler.save(args.profile)
+        print(f'📊 Profile report: {args.profile}')
+    return 1 if any(item.failed_outputs for item in items) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from queue import Empty
+from typing import Any, Dict, List, Optional
+from synthetic_litematic import generate_litematic
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'benchmarks', 'baseline.json')
+BASE_CASE = {'size': 32, 'palette': 16, 'fill': 0.5, 'tile_entities': 0.0,
+    'regions': 1, 'pattern': 'random'}
+SUITES = {'quick': {'size': [64], 'palette': [1, 256], 'fill': [0.05,
+    1.0], 'tile_entities': [0.01], 'regions': [2]}, 'full': {'size': [64,
+    128, 256, 512], 'palette': [1, 16, 256, 1024, 4000], 'fill': [0.01,
+    0.1, 0.5, 1.0], 'tile_entities': [0.001, 0.01, 0.05], 'regions': [2, 4
+    ], 'pattern': ['layered', 'solid']}}
+CONVERTERS = ['bp', 'schem']
+
+
+def build_cases(suite: str, max_size: Optional[int]=None) ->List[Dict[str,
+    Any]]:
+    cases = [dict(BASE_CASE)]
+    for axis, values in SUITES[suite].items():
+        for value in values:
+            case = dict(BASE_CASE)
+            case[axis] = value
+            if case not in cases:
+                cases.append(case)
+    if max_size:
+        cases = [case for case in cases if case['size'] <= max_size]
+    return cases
+
+
+def case_id(case: Dict[str, Any]) ->str:
+    return (
+        f"s{case['size']}_p{case['palette']}_f{case['fill']}_te{case['tile_entities']}_r{case['regions']}_{case['pattern']}"
+        )
+
+
+def _peak_rss_mb() ->Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _run_converter(converter: str, input_path: str, output_dir: str,
+    all_regions: bool, queue):
+    from conversion_profiler import ConversionProfiler
+    profiler = ConversionProfiler(label=input_path).start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if converter == 'bp':
+            from litematic_to_bp_converter import convert_litematic_to_bp
+            success = convert_litematic_to_bp(input_path, os.path.join(
+                output_dir, 'out.bp'), profiler=profiler)
+        else:
+            from litematic_to_schem_advanced import AdvancedLitematicConverter
+            success = AdvancedLitematicConverter(profiler=profiler
+                ).convert_litematic_to_schem(input_path, os.path.join(
+                output_dir, 'out.schem'), all_regions=all_regions)
+    profiler.stop()
+    report = profiler.report()
+    queue.put({'success': bool(success), 'total_seconds': report[
+        'total_seconds'], 'stages': {name: stage['seconds'] for name, stage in
+        report['stages'].items()}, 'counters': report['counters'],
+        'peak_rss_mb': _peak_rss_mb()})
+
+
+def run_isolated(converter: str, input_path: str, output_dir: str,
+    all_regions: bool, timeout: float) ->Dict[str, Any]:
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_converter, args=(converter,
+        input_path, output_dir, all_regions, queue))
+    process.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=0.2)
+        except Empty:
+            if not process.is_alive():
+                try:
+                    result = queue.get(timeout=0.5)
+                except Empty:
+                    result = {'success': False, 'error':
+                        f'converter process exited with code {process.exitcode} without a result'
+                        }
+            elif time.monotonic() > deadline:
+                process.terminate()
+                result = {'success': False, 'error':
+                    f'timed out after {timeout}s'}
+    process.join()
+    return result
+
+
+def run_case(case: Dict[str, Any], work_dir: str, repeat: int, timeout:
+    float) ->Dict[str, Any]:
+    size = case['size']
+    input_path = os.path.join(work_dir, f'{case_id(case)}.litematic')
+    if not os.path.exists(input_path):
+        generate_litematic(input_path, (size, size, size), palette_size=
+            case['palette'], fill=case['fill'], tile_entity_density=case[
+            'tile_entities'], region_count=case['regions'], pattern=case[
+            'pattern'])
+    results = {'case': case, 'input_bytes': os.path.getsize(input_path)}
+    for converter in CONVERTERS:
+        best = None
+        for _ in range(repeat):
+            result = run_isolated(converter, input_path, work_dir, case[
+                'regions'] > 1, timeout)
+            if not result.get('success'):
+                best = result
+                break
+            if best is None or result['total_seconds'] < best['total_seconds'
+                ]:
+                best = result
+        results[converter] = best
+    return results
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any],
+    threshold: float, min_seconds: float) ->List[str]:
+    regressions = []
+    for cid, case_result in results['cases'].items():
+        base_case = baseline.get('cases', {}).get(cid)
+        if not base_case:
+            continue
+        for converter in CONVERTERS:
+            current = case_result.get(converter) or {}
+            previous = base_case.get(converter) or {}
+            if not current.get('success') or not previous.get('success'):
+                continue
+            checks = [('total', current['total_seconds'], previous[
+                'total_seconds'])]
+            for stage, seconds in current['stages'].items():
+                if stage in previous['stages']:
+                    checks.append((stage, seconds, previous['stages'][stage]))
+            for name, now, before in checks:
+                if now - before > min_seconds and now > before * (1 +
+                    threshold):
+                    regressions.append(
+                        f'{cid} {converter} {name}: {before:.3f}s -> {now:.3f}s (+{(now / before - 1) * 100 if before else 100:.0f}%)'
+                        )
+            now_rss = current.get('peak_rss_mb')
+            before_rss = previous.get('peak_rss_mb')
+            if now_rss and before_rss and now_rss > before_rss * (1 + threshold
+                ):
+                regressions.append(
+                    f'{cid} {converter} peak RSS: {before_rss:.1f}MB -> {now_rss:.1f}MB'
+                    )
+    return regressions
+
+
+def print_results(results: Dict[str, Any]):
+    print(
+        f"{'case':<44} {'conv':<6} {'total':>9} {'rss MB':>8}  slowest stage"
+        )
+    for cid, case_result in results['cases'].items():
+        for converter in CONVERTERS:
+            result = case_result.get(converter) or {}
+            if not result.get('success'):
+                print(
+                    f"{cid:<44} {converter:<6} {'FAILED':>9}  {result.get('error', '')}"
+                    )
+                continue
+            slowest = max(result['stages'].items(), key=lambda item: item[1
+                ], default=('-', 0.0))
+            rss = result.get('peak_rss_mb')
+            rss_text = f'{rss:8.1f}' if rss is not None else f"{'n/a':>8}"
+            print(
+                f"{cid:<44} {converter:<6} {result['total_seconds']:9.3f} {rss_text}  {slowest[0]} ({slowest[1]:.3f}s)"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=
+        'Benchmark the .bp and .schem converters on synthetic litematics')
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick',
+        help='Which axis sweep to run')
+    parser.add_argument('--max-size', type=int, help=
+        'Skip cases with a larger edge length')
+    parser.add_argument('--repeat', type=int, default=1, help=
+        'Runs per case; the fastest run is kept')
+    parser.add_argument('--timeout', type=float, default=1800.0, help=
+        'Seconds before a single conversion is abandoned')
+    parser.add_argument('--work-dir', help=
+        'Where synthetic inputs are cached (default: temporary directory)')
+    parser.add_argument('--output', help='Write the results JSON here')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help=
+        'Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help=
+        'Store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help=
+        'Relative slowdown that counts as a regression')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help=
+        'Ignore slowdowns smaller than this many seconds')
+    args = parser.parse_args()
+    cases = build_cases(args.suite, args.max_size)
+    results = {'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'python':
+        platform.python_version(), 'platform': platform.platform(), 'suite':
+        args.suite, 'cases': {}}
+    with tempfile.TemporaryDirectory(prefix='litematic_bench_') as temp_dir:
+        work_dir = args.work_dir or temp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        for i, case in enumerate(cases, 1):
+            print(f'[{i}/{len(cases)}] {case_id(case)}', flush=True)
+            results['cases'][case_id(case)] = run_case(case, work_dir, args
+                .repeat, args.timeout)
+    print()
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)),
+            exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nBaseline saved to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(
+            f'\nNo baseline at {args.baseline}; run with --save-baseline to create one.'
+            )
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.threshold,
+        args.min_seconds)
+    if regressions:
+        print(f'\n❌ {len(regressions)} regression(s) against {args.baseline}:'
+            )
+        for line in regressions:
+            print(f'   {line}')
+        return 1
+    print(f'\n✅ No regressions against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
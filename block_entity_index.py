@@ -0,0 +1,99 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+BLOCK_HINTS = {'minecraft:banner': ('_banner',), 'minecraft:bed': ('_bed',
+    ), 'minecraft:skull': ('_head', '_skull'), 'minecraft:sign': ('_sign',),
+    'minecraft:hanging_sign': ('_hanging_sign',), 'minecraft:mob_spawner':
+    ('spawner',), 'minecraft:shulker_box': ('shulker_box',)}
+
+
+def entity_matches_block(entity_id: str, block_state: str) ->bool:
+    name = block_state.split('[', 1)[0]
+    hints = BLOCK_HINTS.get(entity_id)
+    if hints:
+        return any(hint in name for hint in hints)
+    return entity_id.split(':')[-1] in name
+
+
+class BlockEntityIndex:
+
+    def __init__(self, entities: Sequence[Any], coords: np.ndarray):
+        self.entities = list(entities)
+        self.ids = [str(entity.get('id', entity.get('Id', ''))) for entity in
+            self.entities]
+        self.coords = np.asarray(coords, dtype=np.int64).reshape(-1, 3)
+        self._rebuild()
+
+    @classmethod
+    def from_xyz(cls, entities: Sequence[Any]) ->'BlockEntityIndex':
+        return cls(entities, [(int(entity.get('x', 0)), int(entity.get('y',
+            0)), int(entity.get('z', 0))) for entity in entities])
+
+    @classmethod
+    def from_pos(cls, entities: Sequence[Any]) ->'BlockEntityIndex':
+        return cls(entities, [[int(value) for value in entity['Pos']] for
+            entity in entities])
+
+    def _rebuild(self):
+        self.by_position: Dict[Tuple[int, int, int], int] = {}
+        for i, position in enumerate(map(tuple, self.coords.tolist())):
+            self.by_position.setdefault(position, i)
+
+    def __len__(self) ->int:
+        return len(self.entities)
+
+    def get(self, position: Tuple[int, int, int]) ->Optional[Any]:
+        i = self.by_position.get(tuple(position))
+        return None if i is None else self.entities[i]
+
+    def id_mask(self, entity_id: str) ->np.ndarray:
+        return np.array([(i == entity_id) for i in self.ids], dtype=bool)
+
+    def alignment_offset(self, block_coords: np.ndarray, entity_id: str
+        ) ->Optional[Tuple[int, int, int]]:
+        entity_coords = self.coords[self.id_mask(entity_id)]
+        block_coords = np.asarray(block_coords).reshape(-1, 3)
+        if not len(entity_coords) or not len(block_coords):
+            return None
+        return tuple((entity_coords.min(axis=0) - block_coords.min(axis=0))
+            .tolist())
+
+    def shift(self, offset: Tuple[int, int, int]):
+        self.coords = self.coords - np.asarray(offset, dtype=np.int64)
+        self._rebuild()
+
+    def validate(self, states_at: Callable[[np.ndarray], List[Optional[str]]]
+        ) ->List[Dict[str, Any]]:
+        report = []
+        states = states_at(self.coords)
+        for i, (entity_id, position, state) in enumerate(zip(self.ids, map(
+            tuple, self.coords.tolist()), states)):
+            if state is None or state.split('[', 1)[0] == 'minecraft:air':
+                status = 'missing'
+            elif entity_matches_block(entity_id, state):
+                status = 'match'
+            else:
+                status = 'mismatch'
+            report.append({'index': i, 'id': entity_id, 'position':
+                position, 'block': state, 'status': status})
+        return report
+
+
+def summarize_report(report: List[Dict[str, Any]]) ->Dict[str, int]:
+    summary = {'match': 0, 'mismatch': 0, 'missing': 0}
+    for entry in report:
+        summary[entry['status']] += 1
+    summary['duplicate_positions'] = len(report) - len({entry['position'] for
+        entry in report})
+    return summary
+
+
+def print_report(report: List[Dict[str, Any]], indent: str='', limit: int=5):
+    summary = summarize_report(report)
+    print(
+        f"{indent}Block entities matched: {summary['match']}/{len(report)} ({summary['mismatch']} mismatched, {summary['missing']} without a block, {summary['duplicate_positions']} duplicate positions)"
+        )
+    problems = [entry for entry in report if entry['status'] != 'match']
+    for entry in problems[:limit]:
+        print(
+            f"{indent}  ⚠️  {entry['id']} at {entry['position']}: {entry['status']} (block: {entry['block']})"
+            )
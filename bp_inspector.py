@@ -0,0 +1,232 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import struct
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from litematic_metadata import iter_litematic_files
+from nbt_stream import TAG_COMPOUND, TAG_LIST, NBTStreamError, iter_compound
+from nbt_stream import open_root, read_compound, read_exact, read_payload
+from nbt_stream import skip_payload
+MAGIC_NUMBER = 182827830
+SECTION_SIZE = 16
+SECTION_VOLUME = SECTION_SIZE ** 3
+VOID_BLOCK = 'minecraft:structure_void'
+READ_BUFFER = 1 << 16
+LENGTH = struct.Struct('>I')
+
+
+def unpack_data_array(data, palette_size: int) ->np.ndarray:
+    bits_per_block = max(4, (palette_size - 1).bit_length())
+    blocks_per_long = 64 // bits_per_block
+    longs = np.asarray(data, dtype=np.int64).view(np.uint64)
+    shifts = np.arange(blocks_per_long, dtype=np.uint64) * np.uint64(
+        bits_per_block)
+    mask = np.uint64((1 << bits_per_block) - 1)
+    values = (longs[:, None] >> shifts & mask).reshape(-1)[:SECTION_VOLUME]
+    if len(values) != SECTION_VOLUME:
+        raise NBTStreamError(
+            f'Section data holds {len(values)} blocks, expected {SECTION_VOLUME}'
+            )
+    return values.astype(np.uint16)
+
+
+def block_state_string(entry) ->str:
+    name = str(entry.get('Name', ''))
+    properties = entry.get('Properties')
+    if not properties:
+        return name
+    return name + '[' + ','.join(f'{key}={value}' for key, value in
+        properties.items()) + ']'
+
+
+class BlueprintSection:
+
+    def __init__(self, x: int, y: int, z: int, palette: List[str], data):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.palette = palette
+        self.data = data
+        self._indices: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_nbt(cls, section) ->'BlueprintSection':
+        states = section.get('BlockStates', {})
+        return cls(int(section.get('X', 0)), int(section.get('Y', 0)), int(
+            section.get('Z', 0)), [block_state_string(entry) for entry in
+            states.get('palette', [])], states.get('data', []))
+
+    @property
+    def origin(self) ->Tuple[int, int, int]:
+        return (self.x * SECTION_SIZE, self.y * SECTION_SIZE, self.z *
+            SECTION_SIZE)
+
+    def indices(self) ->np.ndarray:
+        if self._indices is None:
+            self._indices = unpack_data_array(self.data, len(self.palette)
+                ).reshape(SECTION_SIZE, SECTION_SIZE, SECTION_SIZE)
+        return self._indices
+
+    def block_at(self, x: int, y: int, z: int) ->str:
+        return self.palette[self.indices()[y, z, x]]
+
+    def block_counts(self) ->Dict[str, int]:
+        counts = np.bincount(self.indices().reshape(-1), minlength=len(
+            self.palette))
+        return {state: int(count) for state, count in zip(self.palette,
+            counts) if count and state != VOID_BLOCK}
+
+
+class LazyBlueprint:
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, = LENGTH.unpack(read_exact(f, 4))
+            if magic != MAGIC_NUMBER:
+                raise NBTStreamError(
+                    f'{path} is not a blueprint (magic {magic:#x})')
+            header_length, = LENGTH.unpack(read_exact(f, 4))
+            header_stream = io.BytesIO(read_exact(f, header_length))
+            open_root(header_stream)
+            self.header = read_compound(header_stream)
+            thumbnail_length, = LENGTH.unpack(read_exact(f, 4))
+            self.thumbnail = read_exact(f, thumbnail_length)
+            self.block_data_size, = LENGTH.unpack(read_exact(f, 4))
+            self.block_data_offset = f.tell()
+        self.file_size = os.path.getsize(path)
+        if self.block_data_offset + self.block_data_size > self.file_size:
+            raise NBTStreamError(
+                f'{path} is truncated: block data needs {self.block_data_size} bytes, {self.file_size - self.block_data_offset} present'
+                )
+
+    def info(self) ->Dict[str, Any]:
+        header = self.header
+        return {'path': self.path, 'file_size': self.file_size, 'name': str
+            (header.get('Name', '')), 'author': str(header.get('Author', '')
+            ), 'tags': [str(tag) for tag in header.get('Tags', [])],
+            'block_count': int(header.get('BlockCount', 0)), 'contains_air':
+            bool(header.get('ContainsAir', 0)), 'version': int(header.get(
+            'Version', 0)), 'thumbnail_size': len(self.thumbnail),
+            'block_data_size': self.block_data_size}
+
+    def _open_block_data(self):
+        raw = open(self.path, 'rb')
+        raw.seek(self.block_data_offset)
+        gz = gzip.GzipFile(fileobj=raw, mode='rb')
+        return raw, io.BufferedReader(gz, READ_BUFFER)
+
+    def iter_block_data(self) ->Iterator[Tuple[str, Any]]:
+        raw, stream = self._open_block_data()
+        try:
+            open_root(stream)
+            for tag_id, name in iter_compound(stream):
+                if tag_id == TAG_LIST:
+                    item_id = read_exact(stream, 1)[0]
+                    count, = struct.unpack('>i', read_exact(stream, 4))
+                    if item_id != TAG_COMPOUND and count:
+                        for _ in range(count):
+                            skip_payload(stream, item_id)
+                        continue
+                    for _ in range(count):
+                        yield name, read_compound(stream)
+                else:
+                    yield name, read_payload(stream, tag_id)
+        finally:
+            stream.close()
+            raw.close()
+
+    def iter_sections(self) ->Iterator[BlueprintSection]:
+        for name, value in self.iter_block_data():
+            if name == 'BlockRegion':
+                yield BlueprintSection.from_nbt(value)
+            elif name in ('BlockEntities', 'Entities'):
+                return
+
+    def section(self, x: int, y: int, z: int) ->Optional[BlueprintSection]:
+        for section in self.iter_sections():
+            if (section.x, section.y, section.z) == (x, y, z):
+                return section
+        return None
+
+    def block_entities(self) ->List[Any]:
+        return [value for name, value in self.iter_block_data() if name ==
+            'BlockEntities']
+
+    def palette(self) ->Dict[str, int]:
+        states: Dict[str, set] = {}
+        for section in self.iter_sections():
+            for state in section.palette:
+                if state != VOID_BLOCK:
+                    states.setdefault(state.split('[', 1)[0], set()).add(state)
+        return {block: len(variants) for block, variants in states.items()}
+
+
+def read_bp_info(path: str) ->Dict[str, Any]:
+    return LazyBlueprint(path).info()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=
+        'List .bp blueprints from their header and thumbnail without decompressing block data'
+        )
+    parser.add_argument('paths', nargs='+', help=
+        '.bp files or directories to scan')
+    parser.add_argument('--json', action='store_true', help=
+        'Print one JSON object per line')
+    parser.add_argument('--no-recursive', action='store_true', help=
+        'Only scan the top level of directories')
+    parser.add_argument('--thumbnails', metavar='DIR', help=
+        'Write each thumbnail PNG into this directory')
+    parser.add_argument('--sections', action='store_true', help=
+        'Also decompress the block data and count sections and blocks')
+    args = parser.parse_args()
+    if args.thumbnails:
+        os.makedirs(args.thumbnails, exist_ok=True)
+    started = time.perf_counter()
+    count = failed = 0
+    for path in iter_litematic_files(args.paths, not args.no_recursive, (
+        '.bp',)):
+        try:
+            blueprint = LazyBlueprint(path)
+            info = blueprint.info()
+            if args.sections:
+                blocks = sections = 0
+                for section in blueprint.iter_sections():
+                    sections += 1
+                    blocks += sum(section.block_counts().values())
+                info['sections'] = sections
+                info['decoded_blocks'] = blocks
+        except (OSError, EOFError, NBTStreamError) as e:
+            failed += 1
+            print(f'❌ {path}: {e}', file=sys.stderr)
+            continue
+        count += 1
+        if args.thumbnails:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            with open(os.path.join(args.thumbnails, stem + '.png'), 'wb') as f:
+                f.write(blueprint.thumbnail)
+        if args.json:
+            print(json.dumps(info))
+            continue
+        line = (
+            f"{path}  {info['name']!r} by {info['author'] or 'Unknown'}  {info['block_count']:,} blocks  thumbnail {info['thumbnail_size']:,} B  block data {info['block_data_size']:,} B"
+            )
+        if args.sections:
+            line += f"  {info['sections']} sections"
+        print(line)
+    elapsed = time.perf_counter() - started
+    per_file = elapsed / count * 1000 if count else 0.0
+    print(
+        f'📊 {count} file(s) read, {failed} failed in {elapsed:.3f}s ({per_file:.2f} ms/file)'
+        , file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional, Sequence
+PROGRESS_PREFIX = '@progress'
+PROGRESS_INTERVAL = 0.5
+HEARTBEAT_INTERVAL = 10.0
+DEFAULT_STALL_TIMEOUT = 120.0
+TERMINATE_GRACE = 5.0
+CANCELLED_EXIT_CODE = 130
+
+
+class ConversionCancelled(Exception):
+    pass
+
+
+class CancellationToken:
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    def cancel(self, reason: str='Conversion cancelled'):
+        if not self._event.is_set():
+            self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) ->bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise ConversionCancelled(self.reason)
+
+    def wait(self, timeout: Optional[float]=None) ->bool:
+        return self._event.wait(timeout)
+
+
+def cancel_on_signals(token: CancellationToken, names: Sequence[str]=(
+    'SIGTERM', 'SIGBREAK')):
+
+    def handler(signum, frame):
+        token.cancel(f'Received {signal.Signals(signum).name}')
+    for name in names:
+        signum = getattr(signal, name, None)
+        if signum is not None:
+            signal.signal(signum, handler)
+
+
+def print_progress(stage: str, done: Optional[int]=None, total: Optional[
+    int]=None):
+    text = f'{PROGRESS_PREFIX} {stage}'
+    if done is not None:
+        text += f' {done}/{total}' if total else f' {done}'
+    print(text, flush=True)
+
+
+def parse_progress(line: str) ->Optional[str]:
+    if line.startswith(PROGRESS_PREFIX + ' '):
+        return line[len(PROGRESS_PREFIX) + 1:].strip()
+    return None
+
+
+class WatchedRun:
+
+    def __init__(self, returncode: int, output: List[str], status: str):
+        self.returncode = returncode
+        self.output = output
+        self.status = status
+
+    @property
+    def succeeded(self) ->bool:
+        return self.status == 'finished' and self.returncode == 0
+
+
+def stop_process(process: subprocess.Popen, grace: float=TERMINATE_GRACE):
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(grace)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_watched(command: Sequence[str], token: Optional[
+    CancellationToken]=None, stall_timeout: Optional[float]=
+    DEFAULT_STALL_TIMEOUT, on_output: Optional[Callable[[str], None]]=None,
+    on_progress: Optional[Callable[[str], None]]=None, poll_interval: float
+    =0.2) ->WatchedRun:
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=
+        subprocess.STDOUT, text=True, encoding='utf-8', errors='replace',
+        bufsize=1)
+    output: List[str] = []
+    last_activity = [time.monotonic()]
+
+    def read():
+        for line in process.stdout:
+            last_activity[0] = time.monotonic()
+            line = line.rstrip('\n')
+            progress = parse_progress(line)
+            if progress is None:
+                output.append(line)
+                if on_output is not None:
+                    on_output(line)
+            elif on_progress is not None:
+                on_progress(progress)
+    reader = threading.Thread(target=read, name='watchdog-reader', daemon=True
+        )
+    reader.start()
+    status = 'finished'
+    while True:
+        try:
+            process.wait(poll_interval)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+        if token is not None and token.cancelled:
+            status = 'cancelled'
+        elif stall_timeout and time.monotonic() - last_activity[0
+            ] > stall_timeout:
+            status = 'stalled'
+        if status != 'finished':
+            stop_process(process)
+            break
+    reader.join()
+    process.stdout.close()
+    return WatchedRun(process.returncode, output, status)
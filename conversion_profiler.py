@@ -0,0 +1,261 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from cancellation import HEARTBEAT_INTERVAL, PROGRESS_INTERVAL
+
+
+class ConversionProfiler:
+
+    def __init__(self, label: Optional[str]=None, pstats_path: Optional[
+        str]=None, track_memory: bool=False, token=None, progress: Optional
+        [Callable[..., None]]=None, trace_allocations: bool=True):
+        self.label = label
+        self.pstats_path = pstats_path
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.memory = None
+        self.token = token
+        self.progress = progress
+        self._last_progress = 0.0
+        self._progress_lock = threading.Lock()
+        self._open_stages: List[str] = []
+        self._heartbeat: Optional[threading.Thread] = None
+        self._heartbeat_stop = threading.Event()
+        self._cprofile = cProfile.Profile() if pstats_path else None
+        self._track_memory = track_memory
+        self._trace_allocations = trace_allocations
+        self._started = None
+        self._finished = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self._track_memory:
+            from memory_budget import MemoryTracker
+            self.memory = MemoryTracker(trace=self._trace_allocations).start()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        return self
+
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self.memory is not None:
+            self.memory.stop()
+        self._heartbeat_stop.set()
+        self._finished = time.perf_counter()
+        return self
+
+    def checkpoint(self, stage: str, done: Optional[int]=None, total:
+        Optional[int]=None):
+        if self.token is not None:
+            self.token.check()
+        if self.progress is not None:
+            self._report_progress(PROGRESS_INTERVAL, stage, done, total)
+
+    def _report_progress(self, interval: float, stage: str, done: Optional[
+        int]=None, total: Optional[int]=None):
+        with self._progress_lock:
+            now = time.monotonic()
+            if now - self._last_progress >= interval:
+                self._last_progress = now
+                self.progress(stage, done, total)
+
+    def _beat(self):
+        while not self._heartbeat_stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                stage = self._open_stages[-1]
+            except IndexError:
+                continue
+            self._report_progress(HEARTBEAT_INTERVAL, stage)
+
+    @contextmanager
+    def stage(self, name: str):
+        self.checkpoint(name)
+        if self.progress is not None and self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._beat, name=
+                'progress-heartbeat', daemon=True)
+            self._heartbeat.start()
+        if self.memory is not None:
+            self.memory.enter(name)
+        self._open_stages.append(name)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+            self._open_stages.pop()
+            if self.memory is not None:
+                self.memory.exit(name)
+
+    def add_time(self, name: str, seconds: float):
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        stage['seconds'] += seconds
+        stage['calls'] += 1
+
+    def count(self, name: str, value: int=1):
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def set_counter(self, name: str, value: int):
+        self.counters[name] = int(value)
+
+    def merge(self, other: 'ConversionProfiler', prefix: str=''):
+        for name, stage in other.stages.items():
+            merged = self.stages.setdefault(prefix + name, {'seconds': 0.0,
+                'calls': 0})
+            merged['seconds'] += stage['seconds']
+            merged['calls'] += stage['calls']
+        for name, value in other.counters.items():
+            self.count(prefix + name, value)
+
+    def total_seconds(self) ->float:
+        if self._started is None:
+            return sum(stage['seconds'] for stage in self.stages.values())
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return end - self._started
+
+    def report(self) ->Dict[str, Any]:
+        total = self.total_seconds()
+        stages = {}
+        for name, stage in self.stages.items():
+            stages[name] = {'seconds': round(stage['seconds'], 6), 'calls':
+                stage['calls'], 'share': round(stage['seconds'] / total, 4) if
+                total > 0 else 0.0}
+        report = {'label': self.label, 'total_seconds': round(total, 6),
+            'stages': stages, 'counters': dict(self.counters)}
+        report['throughput'] = _throughput(self.counters, total)
+        if self.memory is not None:
+            report['memory'] = self.memory.report()
+        return report
+
+    def save(self, report_path: str):
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(self.pstats_path)
+
+    def print_summary(self):
+        report = self.report()
+        print(f"⏱️  Profile ({report['total_seconds']:.3f}s total):")
+        for name, stage in sorted(report['stages'].items(), key=lambda
+            item: -item[1]['seconds']):
+            print(
+                f"   {name:<20} {stage['seconds']:>9.3f}s  {stage['share'] * 100:5.1f}%"
+                )
+        for name, value in report['counters'].items():
+            print(f'   {name:<20} {value:>12,}')
+        if 'memory' in report:
+            self.print_memory_summary(report['memory'])
+
+    @staticmethod
+    def print_memory_summary(memory: Dict[str, Any]):
+        from memory_budget import format_bytes
+        print(
+            f"🧠 Peak memory ({format_bytes(memory['peak_rss_bytes'])} RSS overall):"
+            )
+        for name, stage in sorted(memory['stages'].items(), key=lambda
+            item: -item[1].get('peak_traced_bytes', item[1]['peak_rss_bytes'])
+            ):
+            traced = stage.get('peak_traced_bytes')
+            traced = f'{format_bytes(traced):>10} traced  ' if traced is not None else ''
+            print(
+                f"   {name:<20} {traced}{format_bytes(stage['peak_rss_bytes']):>10} RSS"
+                )
+
+
+class MeteredWriter:
+
+    def __init__(self, fileobj, profiler: ConversionProfiler, stage: str,
+        counter: str, inner: Optional['MeteredWriter']=None):
+        self.fileobj = fileobj
+        self.profiler = profiler
+        self.stage = stage
+        self.counter = counter
+        self.inner = inner
+        self.seconds = 0.0
+
+    def write(self, data) ->int:
+        inner_before = self.inner.seconds if self.inner is not None else 0.0
+        start = time.perf_counter()
+        written = self.fileobj.write(data)
+        self._record(time.perf_counter() - start, inner_before)
+        self.profiler.count(self.counter, len(data))
+        return written
+
+    def close(self):
+        inner_before = self.inner.seconds if self.inner is not None else 0.0
+        start = time.perf_counter()
+        self.fileobj.close()
+        self._record(time.perf_counter() - start, inner_before)
+
+    def _record(self, elapsed: float, inner_before: float):
+        if self.inner is not None:
+            elapsed -= self.inner.seconds - inner_before
+        self.seconds += elapsed
+        self.profiler.add_time(self.stage, elapsed)
+
+    def __getattr__(self, name):
+        return getattr(self.fileobj, name)
+
+
+def _throughput(counters: Dict[str, int], seconds: float) ->Dict[str, float]:
+    throughput = {}
+    if seconds <= 0:
+        return throughput
+    if 'voxels_scanned' in counters:
+        throughput['voxels_per_second'] = round(counters['voxels_scanned'
+            ] / seconds, 1)
+    if 'bytes_uncompressed' in counters:
+        throughput['uncompressed_mb_per_second'] = round(counters[
+            'bytes_uncompressed'] / seconds / 1000000.0, 3)
+    if counters.get('bytes_uncompressed') and 'bytes_compressed' in counters:
+        throughput['compression_ratio'] = round(counters['bytes_compressed'
+            ] / counters['bytes_uncompressed'], 4)
+    return throughput
+
+
+def load_report(report_path: str) ->Dict[str, Any]:
+    with open(report_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def aggregate_reports(reports: Iterable[Dict[str, Any]]) ->Dict[str, Any]:
+    files: List[Dict[str, Any]] = []
+    stages: Dict[str, Dict[str, float]] = {}
+    counters: Dict[str, int] = {}
+    total = 0.0
+    for report in reports:
+        files.append({'label': report.get('label'), 'total_seconds':
+            report.get('total_seconds', 0.0)})
+        total += report.get('total_seconds', 0.0)
+        for name, stage in report.get('stages', {}).items():
+            merged = stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            merged['seconds'] += stage.get('seconds', 0.0)
+            merged['calls'] += stage.get('calls', 0)
+        for name, value in report.get('counters', {}).items():
+            counters[name] = counters.get(name, 0) + value
+    for stage in stages.values():
+        stage['share'] = round(stage['seconds'] / total, 4) if total > 0 else 0.0
+        stage['seconds'] = round(stage['seconds'], 6)
+    slowest = sorted(files, key=lambda item: -item['total_seconds'])
+    return {'file_count': len(files), 'total_seconds': round(total, 6),
+        'stages': stages, 'counters': counters, 'throughput': _throughput(
+        counters, total), 'slowest_files': slowest[:10], 'files': files}
+
+
+def aggregate_report_files(report_paths: Iterable[str], output_path:
+    Optional[str]=None) ->Dict[str, Any]:
+    reports = [load_report(path) for path in report_paths if os.path.
+        exists(path)]
+    aggregate = aggregate_reports(reports)
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(aggregate, f, indent=2)
+    return aggregate
+
+
+def default_report_path(output_path: str) ->str:
+    return f'{os.path.splitext(output_path)[0]}.profile.json'
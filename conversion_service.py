@@ -0,0 +1,549 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import queue
+import re
+import signal
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+from output_cache import DEFAULT_CACHE_DIR, OutputCache, content_hash
+from output_cache import output_options, write_atomic
+from parallel_gzip import DEFAULT_LEVEL
+DEFAULT_PORT = 8765
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_MAX_QUEUE = 32
+ROUTES = {'/convert/bp': 'bp', '/convert/schem': 'schem', '/metadata':
+    'metadata'}
+EXTENSIONS = {'bp': '.bp', 'schem': '.schem'}
+WARM_MODULES = ('nbtlib', 'numpy', 'PIL.Image', 'litemapy',
+    'litematic_to_bp_converter', 'litematic_to_schem_advanced',
+    'litematic_metadata', 'litematic_reader', 'litematic_volume',
+    'litematic_api')
+
+
+class ServiceError(Exception):
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _warm_up():
+    import importlib
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def safe_name(name: Optional[str], default: str='upload') ->str:
+    stem = os.path.splitext(os.path.basename(name or ''))[0]
+    stem = re.sub('[^\\w.-]+', '_', stem).strip('._')
+    return stem or default
+
+
+def _convert(kind: str, source, sink, options: Dict[str, Any]):
+    from litematic_api import convert_to_bp, convert_to_schem
+    if kind == 'bp':
+        return convert_to_bp(source, options['name'], sink, options[
+            'engine'], options['region'], compresslevel=options[
+            'compression_level'])
+    return convert_to_schem(source, options['name'], sink, options['engine'
+        ], options['region'], options['legacy'], options['crop'], options[
+        'compression_level'])
+
+
+def run_task(kind: str, data: Optional[bytes], options: Dict[str, Any]
+    ) ->Dict[str, Any]:
+    started = time.perf_counter()
+    input_path = options.get('path')
+    if kind == 'metadata':
+        from litematic_api import read_metadata
+        from litematic_metadata import read_litematic_metadata
+        metadata = read_litematic_metadata(input_path
+            ) if input_path else read_metadata(data)
+        return {'metadata': metadata, 'seconds': time.perf_counter() - started
+            }
+    output_path = options.get('output_path')
+    with contextlib.ExitStack() as stack:
+        source = data if input_path is None else stack.enter_context(open(
+            input_path, 'rb'))
+        sink = None if output_path is None else stack.enter_context(open(
+            output_path, 'wb'))
+        conversion = _convert(kind, source, sink, options)
+    if output_path and not conversion.success:
+        os.remove(output_path)
+    result = {'success': conversion.success, 'log': conversion.log,
+        'warnings': conversion.warnings, 'stats': conversion.stats,
+        'seconds': time.perf_counter() - started}
+    if conversion.success and output_path:
+        result['path'] = output_path
+        result['bytes'] = conversion.size
+    elif conversion.success:
+        result['output'] = conversion.output
+        result['bytes'] = conversion.size
+    return result
+
+
+def _worker_main(conn):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _warm_up()
+    conn.send('ready')
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            conn.send(('ok', run_task(*task)))
+        except Exception as e:
+            conn.send(('error', f'{type(e).__name__}: {e}'))
+
+
+class WarmWorker:
+
+    def __init__(self, context, index: int):
+        self.context = context
+        self.index = index
+        self.restarts = 0
+        self._start()
+
+    def _start(self):
+        self.conn, child = self.context.Pipe()
+        self.process = self.context.Process(target=_worker_main, args=(
+            child,), name=f'conversion-worker-{self.index}', daemon=True)
+        self.process.start()
+        child.close()
+        self._ready = False
+
+    def _wait_ready(self, timeout: float):
+        if self._ready:
+            return
+        if not self.conn.poll(timeout):
+            raise TimeoutError('worker did not start in time')
+        self.conn.recv()
+        self._ready = True
+
+    def run(self, task: Tuple[str, Optional[bytes], Dict[str, Any]],
+        deadline: float) ->Dict[str, Any]:
+        try:
+            self._wait_ready(max(0.0, deadline - time.monotonic()))
+            self.conn.send(task)
+            if not self.conn.poll(max(0.0, deadline - time.monotonic())):
+                raise TimeoutError('conversion timed out')
+            status, value = self.conn.recv()
+        except (TimeoutError, EOFError, OSError) as e:
+            self.restart()
+            if isinstance(e, TimeoutError):
+                raise
+            raise RuntimeError(f'worker exited unexpectedly: {e}')
+        if status == 'error':
+            raise RuntimeError(value)
+        return value
+
+    def restart(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+        self.restarts += 1
+        self._start()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+
+    def __init__(self, workers: int, max_queue: int=DEFAULT_MAX_QUEUE):
+        context = multiprocessing.get_context('spawn')
+        self.workers = [WarmWorker(context, index) for index in range(max(
+            1, workers))]
+        self.max_queue = max_queue
+        self.waiting = 0
+        self.busy = 0
+        self._lock = threading.Lock()
+        self._idle: 'queue.Queue[WarmWorker]' = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+
+    def run(self, task: Tuple[str, Optional[bytes], Dict[str, Any]],
+        timeout: float) ->Dict[str, Any]:
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                raise ServiceError(503,
+                    f'Queue is full ({self.max_queue} requests waiting)')
+            self.waiting += 1
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError('no worker became free in time')
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        with self._lock:
+            self.busy += 1
+        try:
+            return worker.run(task, deadline)
+        finally:
+            with self._lock:
+                self.busy -= 1
+            self._idle.put(worker)
+
+    def restarts(self) ->int:
+        return sum(worker.restarts for worker in self.workers)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+class ServiceMetrics:
+
+    def __init__(self):
+        self.started = time.time()
+        self.endpoints: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, outcome: str, seconds: float, bytes_in:
+        int, bytes_out: int):
+        with self._lock:
+            endpoint = self.endpoints.setdefault(kind, {'requests': 0,
+                'succeeded': 0, 'failed': 0, 'timeouts': 0, 'rejected': 0,
+                'seconds': 0.0, 'bytes_in': 0, 'bytes_out': 0})
+            endpoint['requests'] += 1
+            endpoint[outcome] += 1
+            endpoint['seconds'] += seconds
+            endpoint['bytes_in'] += bytes_in
+            endpoint['bytes_out'] += bytes_out
+
+    def report(self) ->Dict[str, Any]:
+        with self._lock:
+            endpoints = {kind: dict(endpoint) for kind, endpoint in self.
+                endpoints.items()}
+        uptime = time.time() - self.started
+        totals = {name: sum(endpoint[name] for endpoint in endpoints.values
+            ()) for name in ('requests', 'succeeded', 'failed', 'timeouts',
+            'rejected', 'seconds', 'bytes_in', 'bytes_out')}
+        for endpoint in endpoints.values():
+            endpoint['average_seconds'] = round(endpoint['seconds'] /
+                endpoint['requests'], 4) if endpoint['requests'] else 0.0
+            endpoint['seconds'] = round(endpoint['seconds'], 4)
+        throughput = {'requests_per_minute': round(totals['succeeded'] *
+            60 / uptime, 3) if uptime > 0 else 0.0, 'input_mb_per_second':
+            round(totals['bytes_in'] / uptime / 1000000.0, 4) if uptime > 0
+             else 0.0}
+        return {'uptime_seconds': round(uptime, 3), 'totals': totals,
+            'endpoints': endpoints, 'throughput': throughput}
+
+
+class ConversionService:
+
+    def __init__(self, workers: int=1, max_queue: int=DEFAULT_MAX_QUEUE,
+        timeout: float=DEFAULT_TIMEOUT, output_dir: Optional[str]=None,
+        cache: Optional[OutputCache]=None):
+        self.timeout = timeout
+        self.output_dir = output_dir
+        self.cache = cache
+        self.metrics = ServiceMetrics()
+        self.pool = WorkerPool(workers, max_queue)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def health(self) ->Dict[str, Any]:
+        with self.pool._lock:
+            busy, waiting = self.pool.busy, self.pool.waiting
+        alive = sum(worker.process.is_alive() for worker in self.pool.workers)
+        return {'status': 'ok' if alive == len(self.pool.workers) else
+            'degraded', 'workers': len(self.pool.workers), 'workers_alive':
+            alive, 'busy': busy, 'queue_depth': waiting, 'max_queue': self.
+            pool.max_queue}
+
+    def metrics_report(self) ->Dict[str, Any]:
+        report = self.metrics.report()
+        report.update(self.health())
+        report['worker_restarts'] = self.pool.restarts()
+        if self.cache is not None:
+            report['cache'] = self.cache.stats()
+        return report
+
+    def parse_options(self, kind: str, params: Dict[str, str]) ->Dict[str, Any
+        ]:
+        options = {'name': safe_name(params.get('name') or params.get(
+            'path')), 'engine': params.get('engine', 'reference'), 'region':
+            params.get('region'), 'crop': params.get('crop', '') in ('1',
+            'true', 'yes'), 'legacy': params.get('legacy', '') in ('1',
+            'true', 'yes')}
+        if options['engine'] not in ('reference', 'fast'):
+            raise ServiceError(400, f"Unknown engine {options['engine']!r}")
+        try:
+            options['compression_level'] = int(params.get(
+                'compression_level', DEFAULT_LEVEL))
+            options['timeout'] = float(params.get('timeout', self.timeout))
+        except ValueError as e:
+            raise ServiceError(400, f'Invalid number: {e}')
+        if not 1 <= options['compression_level'] <= 9:
+            raise ServiceError(400, 'compression_level must be 1-9')
+        options['timeout'] = min(max(options['timeout'], 0.1), self.timeout)
+        if 'path' in params:
+            path = os.path.abspath(params['path'])
+            if not path.endswith('.litematic') or not os.path.isfile(path):
+                raise ServiceError(400, f'{path} is not a .litematic file')
+            options['path'] = path
+        if params.get('output') == 'path' and kind in EXTENSIONS:
+            if not self.output_dir:
+                raise ServiceError(400,
+                    'output=path needs the service to run with --output-dir')
+            options['output_path'] = os.path.join(os.path.abspath(self.
+                output_dir), options['name'] + ('.schematic' if options[
+                'legacy'] else EXTENSIONS[kind]))
+        return options
+
+    def cache_key(self, kind: str, body: bytes, options: Dict[str, Any]
+        ) ->Optional[str]:
+        if self.cache is None or kind not in EXTENSIONS:
+            return None
+        data = body
+        if 'path' in options:
+            try:
+                with open(options['path'], 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                raise ServiceError(400, str(e))
+        fmt = 'schematic' if kind == 'schem' and options['legacy'] else kind
+        return self.cache.key(content_hash(data), fmt, output_options(fmt,
+            options['name'], options['region'], options['crop'], options[
+            'compression_level']))
+
+    def cached_result(self, key: str, options: Dict[str, Any], started: float
+        ) ->Optional[Dict[str, Any]]:
+        data = self.cache.get(key)
+        if data is None:
+            return None
+        result = {'success': True, 'cached': True, 'log': '', 'warnings': [
+            ], 'stats': {}, 'bytes': len(data)}
+        if options.get('output_path'):
+            write_atomic(options['output_path'], data)
+            result['path'] = options['output_path']
+        else:
+            result['output'] = data
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    def store(self, key: str, result: Dict[str, Any]):
+        data = result.get('output')
+        if data is None:
+            with open(result['path'], 'rb') as f:
+                data = f.read()
+        self.cache.put(key, data)
+        result['cached'] = False
+
+    def handle(self, kind: str, body: bytes, params: Dict[str, str]
+        ) ->Dict[str, Any]:
+        started = time.perf_counter()
+        outcome = 'failed'
+        bytes_out = 0
+        try:
+            options = self.parse_options(kind, params)
+            if not body and 'path' not in options:
+                raise ServiceError(400,
+                    'Send the .litematic as the request body or pass ?path=')
+            key = self.cache_key(kind, body, options)
+            result = key and self.cached_result(key, options, started)
+            if result:
+                outcome = 'succeeded'
+                bytes_out = len(result.get('output', b''))
+                return result
+            result = self.pool.run((kind, body or None, options), options[
+                'timeout'])
+            if kind != 'metadata' and not result['success']:
+                raise ServiceError(422, result['log'].strip().splitlines()[
+                    -1] if result['log'].strip() else 'Conversion failed')
+            if key:
+                self.store(key, result)
+            outcome = 'succeeded'
+            bytes_out = len(result.get('output', b''))
+            return result
+        except ServiceError as e:
+            if e.status == 503:
+                outcome = 'rejected'
+            raise
+        except TimeoutError as e:
+            outcome = 'timeouts'
+            raise ServiceError(504, str(e))
+        except RuntimeError as e:
+            raise ServiceError(500, str(e))
+        finally:
+            self.metrics.record(kind, outcome, time.perf_counter() -
+                started, len(body), bytes_out)
+
+    def close(self):
+        self.pool.close()
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'LitematicConverter/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self) ->str:
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+        return 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers:
+        Optional[Dict[str, str]]=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        self._send(status, json.dumps(payload, indent=2).encode('utf-8'),
+            'application/json')
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self._send_json(200, self.server.service.health())
+        elif path == '/metrics':
+            self._send_json(200, self.server.service.metrics_report())
+        else:
+            self._send_json(404, {'error': f'Unknown endpoint {path}'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        kind = ROUTES.get(url.path)
+        if kind is None:
+            self._send_json(404, {'error': f'Unknown endpoint {url.path}'})
+            return
+        params = dict(parse_qsl(url.query))
+        try:
+            result = self.server.service.handle(kind, body, params)
+        except ServiceError as e:
+            self._send_json(e.status, {'error': str(e)})
+            return
+        headers = {'X-Conversion-Seconds': f"{result['seconds']:.3f}"}
+        if 'cached' in result:
+            headers['X-Cache'] = 'HIT' if result['cached'] else 'MISS'
+        if 'output' in result:
+            name = safe_name(params.get('name') or params.get('path'))
+            extension = '.schematic' if params.get('legacy') in ('1',
+                'true', 'yes') else EXTENSIONS[kind]
+            headers['Content-Disposition'
+                ] = f'attachment; filename="{name}{extension}"'
+            self._send(200, result['output'], 'application/octet-stream',
+                headers)
+        else:
+            self._send_json(200, {key: value for key, value in result.items
+                () if key != 'output'})
+
+
+class UnixConversionServer(socketserver.ThreadingMixIn, socketserver.
+    UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(service: ConversionService, host: str='127.0.0.1', port:
+    int=DEFAULT_PORT, socket_path: Optional[str]=None, verbose: bool=False):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixConversionServer(socket_path, ConversionRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ConversionRequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=
+        'Serve .litematic conversions over localhost HTTP or a Unix socket')
+    parser.add_argument('--host', default='127.0.0.1', help=
+        'Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=
+        f'TCP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--socket', metavar='PATH', help=
+        'Listen on a Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=0, help=
+        'Warm worker processes, i.e. concurrent conversions (default: all cores)'
+        )
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+        help=
+        f'Requests allowed to wait for a worker before returning 503 (default: {DEFAULT_MAX_QUEUE})'
+        )
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+        help=
+        f'Longest a request may take, queueing included, in seconds (default: {DEFAULT_TIMEOUT:.0f})'
+        )
+    parser.add_argument('--output-dir', help=
+        'Directory for outputs requested with output=path')
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_DIR,
+        metavar='DIR', help=
+        f'Reuse outputs of identical uploads from a disk cache (default DIR: {DEFAULT_CACHE_DIR})'
+        )
+    parser.add_argument('--cache-size', default='1G', help=
+        'Largest total size of the cache, e.g. 512M or 4G (default: 1G)')
+    parser.add_argument('--verbose', action='store_true', help=
+        'Log every request')
+    args = parser.parse_args()
+    if args.socket and not hasattr(socketserver, 'UnixStreamServer'):
+        print('❌ Unix sockets are not available on this platform')
+        return 1
+    workers = args.workers if args.workers > 0 else os.cpu_count() or 1
+    cache = None
+    if args.cache:
+        from memory_budget import parse_memory_size
+        try:
+            cache = OutputCache(args.cache, parse_memory_size(args.cache_size))
+        except ValueError as e:
+            parser.error(str(e))
+    service = ConversionService(workers, args.max_queue, args.timeout, args
+        .output_dir, cache)
+    server = create_server(service, args.host, args.port, args.socket,
+        args.verbose)
+    where = args.socket or f'http://{args.host}:{args.port}'
+    print(f'🚀 Serving conversions on {where} with {workers} worker(s)')
+    if cache is not None:
+        print(f'🗄️  Output cache: {cache.directory}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('\n🛑 Shutting down')
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,358 @@
+import argparse
+import contextlib
+import gzip
+import io
+import math
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+import nbtlib
+import numpy as np
+from synthetic_litematic import generate_litematic
+from litematic_to_bp_converter import PARALLEL_MIN_SECTIONS, convert_litematic_to_bp
+from litematic_to_schem_advanced import AdvancedLitematicConverter
+PALETTE_SIZES = [1, 2, 3, 15, 16, 17, 127, 128, 129, 300, 1100]
+PATTERNS = ['random', 'random', 'layered', 'solid']
+FORMATS = ['bp', 'schem', 'schematic']
+PARALLEL_WORKERS = 2
+PARALLEL_SIDE = 16 * math.ceil(math.sqrt(PARALLEL_MIN_SECTIONS))
+PARALLEL_CASE = {'size': [PARALLEL_SIDE, 16, PARALLEL_SIDE], 'palette': 17,
+    'fill': 0.3, 'tile_entities': 0.002, 'regions': 1, 'pattern': 'random',
+    'seed': 1}
+
+
+def random_case(rng: np.random.Generator, max_size: int) ->Dict[str, Any]:
+    return {'size': [int(rng.integers(1, max_size + 1)) for _ in range(3)],
+        'palette': int(rng.choice(PALETTE_SIZES)), 'fill': float(rng.choice
+        ([0.0, 0.01, 0.3, 0.9, 1.0])), 'tile_entities': float(rng.choice([
+        0.0, 0.0, 0.02])), 'regions': int(rng.integers(1, 3)), 'pattern':
+        str(rng.choice(PATTERNS)), 'seed': int(rng.integers(0, 2 ** 31))}
+
+
+def describe_case(case: Dict[str, Any]) ->str:
+    size = 'x'.join(str(n) for n in case['size'])
+    return (
+        f"size={size} palette={case['palette']} fill={case['fill']} te={case['tile_entities']} regions={case['regions']} pattern={case['pattern']} seed={case['seed']}"
+        )
+
+
+def generate_case(case: Dict[str, Any], path: str):
+    generate_litematic(path, tuple(case['size']), palette_size=case[
+        'palette'], fill=case['fill'], tile_entity_density=case[
+        'tile_entities'], region_count=case['regions'], pattern=case[
+        'pattern'], seed=case['seed'])
+
+
+def run_engine(fmt: str, engine: str, input_path: str, output_dir: str,
+    workers: int=1) ->Optional[List[str]]:
+    os.makedirs(output_dir, exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if fmt == 'bp':
+            output_path = os.path.join(output_dir, 'out.bp')
+            success = convert_litematic_to_bp(input_path, output_path,
+                engine=engine, workers=workers)
+        else:
+            output_path = os.path.join(output_dir, f'out.{fmt}')
+            success = AdvancedLitematicConverter(engine=engine
+                ).convert_litematic_to_schem(input_path, output_path,
+                all_regions=True, use_modern_format=fmt == 'schem')
+    if not success:
+        return None
+    return sorted(os.path.join(output_dir, name) for name in os.listdir(
+        output_dir))
+
+
+def read_bp(path: str) ->Tuple[bytes, bytes, bytes]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 4
+    parts = []
+    for _ in range(3):
+        length, = struct.unpack('>I', data[offset:offset + 4])
+        parts.append(data[offset + 4:offset + 4 + length])
+        offset += 4 + length
+    return parts[0], parts[1], gzip.decompress(parts[2])
+
+
+def unpack_section(states: nbtlib.Compound) ->np.ndarray:
+    palette_size = len(states['palette'])
+    bits = max(4, (palette_size - 1).bit_length())
+    per_long = 64 // bits
+    longs = np.asarray(states['data'], dtype=np.int64).view(np.uint64)
+    shifts = np.arange(per_long, dtype=np.uint64) * np.uint64(bits)
+    values = longs[:, None] >> shifts & np.uint64((1 << bits) - 1)
+    return values.ravel()[:4096].astype(np.int64)
+
+
+def bp_volume(block_data: bytes) ->Dict[Tuple[int, int, int], str]:
+    root = nbtlib.File.parse(io.BytesIO(block_data))
+    blocks = {}
+    for section in root['BlockRegion']:
+        palette = [str(state) for state in section['BlockStates']['palette']]
+        values = unpack_section(section['BlockStates'])
+        base = int(section['X']) * 16, int(section['Y']) * 16, int(section[
+            'Z']) * 16
+        for index in np.flatnonzero(values):
+            y, rest = divmod(int(index), 256)
+            z, x = divmod(rest, 16)
+            blocks[base[0] + x, base[1] + y, base[2] + z] = palette[values[
+                index]]
+    return blocks
+
+
+def diff_bp(reference: str, fast: str) ->List[str]:
+    ref_parts = read_bp(reference)
+    fast_parts = read_bp(fast)
+    problems = []
+    for name, ref_part, fast_part in zip(['header', 'thumbnail',
+        'block data'], ref_parts, fast_parts):
+        if ref_part != fast_part:
+            problems.append(
+                f'{name} differs ({len(ref_part)} vs {len(fast_part)} bytes)')
+    if ref_parts[2] == fast_parts[2]:
+        return problems
+    ref_root = nbtlib.File.parse(io.BytesIO(ref_parts[2]))
+    fast_root = nbtlib.File.parse(io.BytesIO(fast_parts[2]))
+    ref_sections = [(int(s['X']), int(s['Y']), int(s['Z'])) for s in
+        ref_root['BlockRegion']]
+    fast_sections = [(int(s['X']), int(s['Y']), int(s['Z'])) for s in
+        fast_root['BlockRegion']]
+    if ref_sections != fast_sections:
+        problems.append(
+            f'section order differs: {ref_sections[:5]} vs {fast_sections[:5]}'
+            )
+    for ref_section, fast_section in zip(ref_root['BlockRegion'],
+        fast_root['BlockRegion']):
+        position = int(ref_section['X']), int(ref_section['Y']), int(
+            ref_section['Z'])
+        if ref_section['BlockStates']['palette'] != fast_section['BlockStates'
+            ]['palette']:
+            problems.append(f'section {position} palette order differs')
+        elif ref_section['BlockStates']['data'] != fast_section['BlockStates'
+            ]['data']:
+            problems.append(f'section {position} packed data differs')
+    ref_blocks = bp_volume(ref_parts[2])
+    fast_blocks = bp_volume(fast_parts[2])
+    if ref_blocks != fast_blocks:
+        wrong = [pos for pos in sorted(set(ref_blocks) | set(fast_blocks)) if
+            ref_blocks.get(pos) != fast_blocks.get(pos)]
+        problems.append(
+            f'{len(wrong)} voxel(s) differ, first at {wrong[0]}: {ref_blocks.get(wrong[0])} vs {fast_blocks.get(wrong[0])}'
+            )
+    if ref_root['BlockEntities'] != fast_root['BlockEntities']:
+        problems.append('BlockEntities differ')
+    return problems
+
+
+def decode_varints(data) ->List[int]:
+    values = []
+    value = shift = 0
+    for byte in bytes(np.asarray(data, dtype=np.int8).view(np.uint8)):
+        value |= (byte & 127) << shift
+        shift += 7
+        if not byte & 128:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def load_schematic(path: str) ->nbtlib.Compound:
+    schematic = nbtlib.load(path)
+    schematic = schematic.get('Schematic', schematic)
+    if 'Metadata' in schematic:
+        schematic['Metadata']['Date'] = nbtlib.Long(0)
+    return schematic
+
+
+def diff_schem(reference: str, fast: str) ->List[str]:
+    ref = load_schematic(reference)
+    fast_nbt = load_schematic(fast)
+    if ref == fast_nbt:
+        return []
+    problems = []
+    for key in sorted(set(ref) | set(fast_nbt)):
+        if key not in ref or key not in fast_nbt:
+            problems.append(f'{key} only present in one output')
+        elif key == 'Blocks' and isinstance(ref[key], nbtlib.Compound):
+            blocks, fast_blocks = ref[key], fast_nbt[key]
+            if blocks['Palette'] != fast_blocks['Palette']:
+                problems.append('palette differs')
+            ref_ids = decode_varints(blocks['Data'])
+            fast_ids = decode_varints(fast_blocks['Data'])
+            if ref_ids != fast_ids:
+                first = next((i for i, (a, b) in enumerate(zip(ref_ids,
+                    fast_ids)) if a != b), min(len(ref_ids), len(fast_ids)))
+                problems.append(
+                    f'block data differs ({len(ref_ids)} vs {len(fast_ids)} voxels, first at index {first})'
+                    )
+            if blocks['BlockEntities'] != fast_blocks['BlockEntities']:
+                problems.append('BlockEntities differ')
+        elif ref[key] != fast_nbt[key]:
+            problems.append(f'{key} differs')
+    return problems or ['NBT differs']
+
+
+def check_file(input_path: str, work_dir: str, formats: List[str],
+    workers: int=1) ->Dict[str, List[str]]:
+    failures = {}
+    for fmt in formats:
+        try:
+            ref_outputs = run_engine(fmt, 'reference', input_path, os.path.
+                join(work_dir, fmt, 'reference'))
+            fast_outputs = run_engine(fmt, 'fast', input_path, os.path.join
+                (work_dir, fmt, 'fast'), workers)
+        except Exception as e:
+            failures[fmt] = [f'{type(e).__name__}: {e}']
+            continue
+        if ref_outputs is None or fast_outputs is None:
+            if ref_outputs is not fast_outputs:
+                failed_engine = 'reference' if ref_outputs is None else 'fast'
+                failures[fmt] = [f'only the {failed_engine} engine failed']
+            continue
+        if [os.path.basename(p) for p in ref_outputs] != [os.path.basename(
+            p) for p in fast_outputs]:
+            failures[fmt] = ['engines wrote different output files']
+            continue
+        problems = []
+        for ref_path, fast_path in zip(ref_outputs, fast_outputs):
+            with open(ref_path, 'rb') as a, open(fast_path, 'rb') as b:
+                if fmt == 'bp' and a.read() == b.read():
+                    continue
+            found = diff_bp(ref_path, fast_path) if fmt == 'bp' else diff_schem(
+                ref_path, fast_path)
+            problems += [f'{os.path.basename(ref_path)}: {p}' for p in found]
+        if problems:
+            failures[fmt] = problems
+    return failures
+
+
+def check_case(case: Dict[str, Any], work_dir: str, formats: List[str],
+    workers: int=1) ->Dict[str, List[str]]:
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+    input_path = os.path.join(work_dir, 'case.litematic')
+    generate_case(case, input_path)
+    return check_file(input_path, work_dir, formats, workers)
+
+
+def shrink_candidates(case: Dict[str, Any]) ->List[Dict[str, Any]]:
+    candidates = []
+    for axis in range(3):
+        if case['size'][axis] > 1:
+            smaller = dict(case, size=list(case['size']))
+            smaller['size'][axis] = max(1, case['size'][axis] // 2)
+            candidates.append(smaller)
+    if case['palette'] > 1:
+        candidates.append(dict(case, palette=max(1, case['palette'] // 2)))
+    if case['regions'] > 1:
+        candidates.append(dict(case, regions=1))
+    if case['tile_entities']:
+        candidates.append(dict(case, tile_entities=0.0))
+    if case['pattern'] != 'solid':
+        candidates.append(dict(case, pattern='solid'))
+    return candidates
+
+
+def shrink_case(case: Dict[str, Any], work_dir: str, formats: List[str]
+    ) ->Dict[str, Any]:
+    improved = True
+    while improved:
+        improved = False
+        for candidate in shrink_candidates(case):
+            if check_case(candidate, work_dir, formats):
+                case = candidate
+                improved = True
+                break
+    return case
+
+
+def report_failure(label: str, failures: Dict[str, List[str]]):
+    print(f'❌ {label}')
+    for fmt, problems in failures.items():
+        for problem in problems[:10]:
+            print(f'   [{fmt}] {problem}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=
+        'Check that the fast engines produce the same output as the reference converters'
+        )
+    parser.add_argument('inputs', nargs='*', help=
+        'Existing .litematic files to check in addition to random cases')
+    parser.add_argument('--cases', type=int, default=25, help=
+        'Number of random synthetic cases')
+    parser.add_argument('--seed', type=int, default=0, help=
+        'Seed for the case generator')
+    parser.add_argument('--max-size', type=int, default=32, help=
+        'Largest edge length of a random case')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=
+        FORMATS, help='Output formats to compare')
+    parser.add_argument('--no-shrink', action='store_true', help=
+        'Report failing cases without minimising them')
+    parser.add_argument('--keep', metavar='DIR', help=
+        'Copy the inputs and outputs of failing cases to DIR')
+    parser.add_argument('--no-parallel', action='store_true', help=
+        f'Skip the {PARALLEL_MIN_SECTIONS}-section .bp case packed on {PARALLEL_WORKERS} worker processes'
+        )
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    failed = 0
+    with tempfile.TemporaryDirectory(prefix='litematic_diff_') as temp_dir:
+        for i, input_path in enumerate(args.inputs):
+            work_dir = os.path.join(temp_dir, f'input_{i}')
+            failures = check_file(input_path, work_dir, args.formats)
+            if failures:
+                failed += 1
+                report_failure(input_path, failures)
+                if args.keep:
+                    shutil.copytree(work_dir, os.path.join(args.keep,
+                        f'input_{i}'), dirs_exist_ok=True)
+            else:
+                print(f'✅ {input_path}')
+        for i in range(args.cases):
+            case = random_case(rng, args.max_size)
+            work_dir = os.path.join(temp_dir, f'case_{i}')
+            failures = check_case(case, work_dir, args.formats)
+            if not failures:
+                print(f'✅ case {i + 1}/{args.cases}: {describe_case(case)}')
+                continue
+            failed += 1
+            report_failure(f'case {i + 1}/{args.cases}: {describe_case(case)}',
+                failures)
+            if not args.no_shrink:
+                case = shrink_case(case, work_dir, args.formats)
+                failures = check_case(case, work_dir, args.formats)
+                report_failure(f'minimal case: {describe_case(case)}',
+                    failures)
+            if args.keep:
+                shutil.copytree(work_dir, os.path.join(args.keep,
+                    f'case_{i}'), dirs_exist_ok=True)
+        if 'bp' in args.formats and not args.no_parallel:
+            label = (
+                f'parallel case: {describe_case(PARALLEL_CASE)} workers={PARALLEL_WORKERS}'
+                )
+            work_dir = os.path.join(temp_dir, 'parallel')
+            failures = check_case(PARALLEL_CASE, work_dir, ['bp'],
+                PARALLEL_WORKERS)
+            if failures:
+                failed += 1
+                report_failure(label, failures)
+                if args.keep:
+                    shutil.copytree(work_dir, os.path.join(args.keep,
+                        'parallel'), dirs_exist_ok=True)
+            else:
+                print(f'✅ {label}')
+    total = len(args.inputs) + args.cases + int('bp' in args.formats and
+        not args.no_parallel)
+    if failed:
+        print(f'\n❌ {failed}/{total} case(s) differ between engines')
+        return 1
+    print(f'\n✅ All {total} case(s) match byte-for-byte')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
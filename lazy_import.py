@@ -0,0 +1,59 @@
+import importlib
+import importlib.util
+import sys
+import types
+from typing import Dict, Iterable, List
+INSTALL_NAMES = {'PIL': 'Pillow'}
+
+
+class LazyModule(types.ModuleType):
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self) ->types.ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self) ->List[str]:
+        return dir(self._load())
+
+    def __repr__(self) ->str:
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f'<lazy module {self.__name__!r} ({state})>'
+
+
+def lazy_module(name: str) ->types.ModuleType:
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def missing_modules(names: Iterable[str]) ->List[str]:
+    missing = []
+    for name in names:
+        try:
+            found = importlib.util.find_spec(name.split('.')[0]) is not None
+        except (ImportError, ValueError):
+            found = False
+        if not found:
+            missing.append(name)
+    return missing
+
+
+def require_modules(names: Iterable[str], install_names: Dict[str, str]=
+    INSTALL_NAMES):
+    missing = missing_modules(names)
+    if missing:
+        packages = ' '.join(install_names.get(name.split('.')[0], name.
+            split('.')[0]) for name in missing)
+        print(
+            f"Error: Missing library: {', '.join(missing)}. Install with: pip install {packages}"
+            )
+        sys.exit(1)
@@ -0,0 +1,216 @@
+import io
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Union
+from cancellation import ConversionCancelled
+from conversion_profiler import ConversionProfiler
+from multi_format_converter import ThreadRoutedOutput
+from parallel_gzip import DEFAULT_LEVEL
+ENGINES = 'fast', 'reference'
+WARNING_MARKERS = '⚠️', 'Warning', 'Error', '❌'
+Source = Union[bytes, bytearray, memoryview, BinaryIO]
+_router_lock = threading.Lock()
+_router: Optional[ThreadRoutedOutput] = None
+_router_installed = False
+_router_users = 0
+
+
+class ConversionResult:
+
+    def __init__(self, fmt: str, success: bool, output: Optional[bytes],
+        size: int, stats: Dict[str, Any], warnings: List[str], log: str,
+        seconds: float, error: Optional[str]=None):
+        self.format = fmt
+        self.success = success
+        self.output = output
+        self.size = size
+        self.stats = stats
+        self.warnings = warnings
+        self.log = log
+        self.seconds = seconds
+        self.error = error
+
+    def __bool__(self) ->bool:
+        return self.success
+
+    def __repr__(self) ->str:
+        state = 'ok' if self.success else f'failed: {self.error}'
+        return (
+            f'<ConversionResult {self.format} {state}, {self.size} bytes, {self.seconds:.3f}s>'
+            )
+
+    def to_dict(self) ->Dict[str, Any]:
+        return {'format': self.format, 'success': self.success, 'bytes':
+            self.size, 'stats': self.stats, 'warnings': self.warnings,
+            'log': self.log, 'seconds': self.seconds, 'error': self.error}
+
+
+def _as_fileobj(source: Source) ->BinaryIO:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def _seekable(fileobj: BinaryIO) ->bool:
+    try:
+        return fileobj.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+@contextmanager
+def captured_output() ->Iterator[io.StringIO]:
+    global _router, _router_installed, _router_users
+    with _router_lock:
+        if _router_users == 0:
+            _router_installed = not isinstance(sys.stdout, ThreadRoutedOutput)
+            _router = ThreadRoutedOutput(sys.stdout
+                ) if _router_installed else sys.stdout
+            sys.stdout = _router
+        _router_users += 1
+        router = _router
+    try:
+        with router.capture() as buffer:
+            yield buffer
+    finally:
+        with _router_lock:
+            _router_users -= 1
+            if _router_users == 0:
+                if _router_installed and sys.stdout is _router:
+                    sys.stdout = _router.stream
+                _router = None
+
+
+def extract_warnings(log: str) ->List[str]:
+    return [line.strip() for line in log.splitlines() if any(marker in
+        line for marker in WARNING_MARKERS)]
+
+
+def load_litematic(source: Source, engine: str='fast', region_name:
+    Optional[str]=None, profiler: Optional[ConversionProfiler]=None,
+    name: str='upload'):
+    if engine not in ENGINES:
+        raise ValueError(f'Unknown engine {engine!r}, expected one of {ENGINES}'
+            )
+    profiler = profiler or ConversionProfiler()
+    fileobj = _as_fileobj(source)
+    with profiler.stage('load'):
+        if engine == 'fast':
+            from litematic_reader import read_litematic_selective
+            litematic = read_litematic_selective(name, region_names=None if
+                region_name is None else [region_name], fileobj=fileobj)
+        else:
+            import gzip
+            import nbtlib
+            from litemapy import Schematic
+            litematic = Schematic.from_nbt(nbtlib.File.from_fileobj(gzip.
+                GzipFile(fileobj=fileobj), 'big'))
+    if region_name is not None and region_name not in litematic.regions:
+        available = getattr(litematic, 'region_names', list(litematic.regions))
+        raise ValueError(
+            f"Region '{region_name}' not found. Available: {available}")
+    if not litematic.regions:
+        raise ValueError('No regions found')
+    return litematic
+
+
+def _run(fmt: str, profiler: ConversionProfiler, convert: Callable[[
+    BinaryIO], bool], sink: Optional[BinaryIO], direct: bool,
+    stats: Callable[[], Dict[str, Any]]=dict) ->ConversionResult:
+    started = time.perf_counter()
+    target = sink if direct else io.BytesIO()
+    start = target.tell() if direct else 0
+    error = None
+    with captured_output() as log:
+        try:
+            success = bool(convert(target))
+        except ConversionCancelled:
+            raise
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            print(f'❌ {fmt} conversion failed: {error}')
+            success = False
+    output = None
+    size = target.tell() - start if direct else len(target.getbuffer())
+    if success and not direct:
+        output = target.getvalue()
+        if sink is not None:
+            with profiler.stage('disk_write'):
+                sink.write(output)
+            output = None
+    if not success:
+        size = 0
+    report = profiler.report()
+    result_stats = dict(report.get('counters', {}))
+    result_stats.update(stats())
+    result_stats['stages'] = report.get('stages', {})
+    text = log.getvalue()
+    return ConversionResult(fmt, success, output, size, result_stats,
+        extract_warnings(text), text, time.perf_counter() - started, error)
+
+
+def convert_to_bp(source: Source, name: str='upload', sink: Optional[
+    BinaryIO]=None, engine: str='fast', region_name: Optional[str]=None,
+    workers: int=1, compresslevel: int=DEFAULT_LEVEL, compress_threads: int
+    =1, max_memory: Optional[int]=None, profiler: Optional[
+    ConversionProfiler]=None) ->ConversionResult:
+    from litematic_to_bp_converter import convert_loaded_litematic_to_bp
+    from litematic_to_bp_converter import write_bp_stream
+    profiler = profiler or ConversionProfiler()
+
+    def convert(target):
+
+        def write(output_path, header_nbt, thumbnail_data, chunks,
+            block_entities=None, profiler=None):
+            write_bp_stream(target, header_nbt, thumbnail_data, chunks,
+                block_entities, profiler, compresslevel, compress_threads)
+        litematic = load_litematic(source, engine, region_name, profiler, name)
+        return convert_loaded_litematic_to_bp(litematic, name +
+            '.litematic', name + '.bp', profiler, engine, workers,
+            region_name, write=write, max_memory=max_memory)
+    return _run('bp', profiler, convert, sink, sink is not None and
+        _seekable(sink))
+
+
+def convert_to_schem(source: Source, name: str='upload', sink: Optional[
+    BinaryIO]=None, engine: str='fast', region_name: Optional[str]=None,
+    legacy: bool=False, crop: bool=False, compresslevel: int=DEFAULT_LEVEL,
+    compress_threads: int=1, profiler: Optional[ConversionProfiler]=None
+    ) ->ConversionResult:
+    from litematic_reader import SelectiveRegion
+    from litematic_to_schem_advanced import AdvancedLitematicConverter
+    converter = AdvancedLitematicConverter(profiler, engine, compresslevel,
+        compress_threads, crop)
+    profiler = converter.profiler
+
+    def convert(target):
+        litematic = load_litematic(source, engine, region_name, profiler, name)
+        region = litematic.regions[region_name or next(iter(litematic.
+            regions))]
+        decoded = None
+        if isinstance(region, SelectiveRegion):
+            with profiler.stage('decode'):
+                decoded = region.decode()
+            profiler.count('voxels_decoded', decoded.size)
+        schematic_nbt = converter.convert_region_to_schematic(region, not
+            legacy, decoded)
+        if schematic_nbt is None:
+            return False
+        payload = converter.serialize_schematic(schematic_nbt)
+        target.write(converter.compress_schematic_payload(payload))
+        return True
+    return _run('schematic' if legacy else 'schem', profiler, convert,
+        sink, False, lambda : dict(converter.stats))
+
+
+def read_metadata(source: Source, include_preview: bool=False) ->Dict[str,
+    Any]:
+    from litematic_metadata import read_litematic_metadata
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        info = read_litematic_metadata(None, include_preview, io.BytesIO(
+            source))
+        info['file_size'] = len(source)
+        return info
+    return read_litematic_metadata(None, include_preview, source)
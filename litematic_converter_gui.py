@@ -4,7 +4,10 @@ import os
 import sys
 import threading
 from pathlib import Path
-import subprocess
+import tempfile
+import shutil
+from cancellation import DEFAULT_STALL_TIMEOUT, CancellationToken, run_watched
+from conversion_profiler import aggregate_report_files
 
 class ModernLitematicConverterGUI:
 
@@ -25,6 +28,9 @@ class ModernLitematicConverterGUI:
         self.default_output_dir = self._get_smart_output_dir()
         self.selected_files = []
         self.output_folder = tk.StringVar(value=self.default_output_dir)
+        self.profile_enabled = tk.BooleanVar(value=False)
+        self.stall_timeout = tk.IntVar(value=int(DEFAULT_STALL_TIMEOUT))
+        self.cancel_token = None
         self.converter_script = os.path.join(os.path.dirname(__file__),
             'litematic_to_bp_converter.py')
         if not os.path.exists(self.converter_script):
@@ -216,6 +222,10 @@ Make sure it's in the same folder as this GUI."""
         self.clear_all_btn = ttk.Button(file_buttons_frame, text=
             '🗑️ Clear All', command=self.clear_files, style='Modern.TButton')
         self.clear_all_btn.pack(side='left')
+        self.catalog_btn = ttk.Button(file_buttons_frame, text=
+            '📚 From Catalog', command=self.open_catalog_dialog, style=
+            'Modern.TButton')
+        self.catalog_btn.pack(side='left', padx=(10, 0))
 
     def create_output_card(self, parent):
         card_frame = tk.Frame(parent, bg=self.colors['bg_secondary'],
@@ -248,9 +258,31 @@ Make sure it's in the same folder as this GUI."""
         self.status_label = ttk.Label(header_frame, text='Status: Ready',
             style='Subtitle.TLabel')
         self.status_label.pack(side='right')
-        self.convert_btn = ttk.Button(card_content, text='🚀 Convert Files',
+        self.profile_check = tk.Checkbutton(card_content, text=
+            '📊 Write a profile report (conversion_profile.json)', variable=
+            self.profile_enabled, bg=self.colors['bg_secondary'], fg=self.
+            colors['text_secondary'], selectcolor=self.colors['bg_tertiary'],
+            activebackground=self.colors['bg_secondary'], activeforeground=
+            self.colors['text_primary'], highlightthickness=0, borderwidth=0,
+            font=('Segoe UI', 10))
+        self.profile_check.pack(anchor='w')
+        stall_frame = tk.Frame(card_content, bg=self.colors['bg_secondary'])
+        stall_frame.pack(anchor='w', pady=(10, 0))
+        tk.Label(stall_frame, text=
+            '⏱️ Stop a file after this many seconds without progress:', bg=
+            self.colors['bg_secondary'], fg=self.colors['text_secondary'],
+            font=('Segoe UI', 10)).pack(side='left')
+        ttk.Spinbox(stall_frame, from_=10, to=3600, increment=10, width=6,
+            textvariable=self.stall_timeout).pack(side='left', padx=(8, 0))
+        button_frame = tk.Frame(card_content, bg=self.colors['bg_secondary'])
+        button_frame.pack(fill='x', pady=(20, 0))
+        self.convert_btn = ttk.Button(button_frame, text='🚀 Convert Files',
             command=self.start_conversion, style='Accent.TButton')
-        self.convert_btn.pack(fill='x', pady=(20, 0))
+        self.convert_btn.pack(side='left', fill='x', expand=True)
+        self.cancel_btn = ttk.Button(button_frame, text='🛑 Cancel',
+            command=self.cancel_conversion, style='Modern.TButton', state=
+            'disabled')
+        self.cancel_btn.pack(side='left', padx=(10, 0))
 
     def create_bottom_section(self, parent):
         bottom_frame = tk.Frame(parent, bg=self.colors['bg_primary'])
@@ -289,17 +321,107 @@ Make sure it's in the same folder as this GUI."""
         files = filedialog.askopenfilenames(title='Select Litematic Files',
             filetypes=[('Litematic files', '*.litematic'), ('All files',
             '*.*')], multiple=True, initialdir=self.default_input_dir)
+        added_count = self.add_files(files)
+        if added_count > 0:
+            self.log_message(
+                f'✅ Added {added_count} file(s) to conversion queue')
+
+    def add_files(self, files):
         added_count = 0
         for file in files:
             if file not in self.selected_files:
                 self.selected_files.append(file)
-                filename = os.path.basename(file)
-                self.file_listbox.insert(tk.END, f'📄 {filename}')
+                self.file_listbox.insert(tk.END, f'📄 {os.path.basename(file)}'
+                    )
                 added_count += 1
         self.update_files_count()
-        if added_count > 0:
+        return added_count
+
+    def open_catalog_dialog(self):
+        from schematic_catalog import DEFAULT_CATALOG_PATH, SchematicCatalog
+        dialog = tk.Toplevel(self.root)
+        dialog.title('Schematic Catalog')
+        dialog.configure(bg=self.colors['bg_secondary'])
+        dialog.transient(self.root)
+        fields = {}
+        for row, (key, label) in enumerate([('author', 'Author'), ('name',
+            'Name contains'), ('min_blocks', 'Min blocks'), ('max_blocks',
+            'Max blocks'), ('block', 'Contains block')]):
+            ttk.Label(dialog, text=label, style='Subtitle.TLabel').grid(row
+                =row, column=0, sticky='w', padx=15, pady=5)
+            fields[key] = tk.StringVar()
+            ttk.Entry(dialog, textvariable=fields[key], style='Modern.TEntry'
+                ).grid(row=row, column=1, sticky='ew', padx=15, pady=5)
+        only_pending = tk.BooleanVar(value=False)
+        tk.Checkbutton(dialog, text='Only files not converted yet',
+            variable=only_pending, bg=self.colors['bg_secondary'], fg=self.
+            colors['text_secondary'], selectcolor=self.colors['bg_tertiary'
+            ], highlightthickness=0, borderwidth=0).grid(row=5, column=0,
+            columnspan=2, sticky='w', padx=15)
+        result_label = ttk.Label(dialog, text=
+            f'Catalog: {DEFAULT_CATALOG_PATH}', style='Subtitle.TLabel')
+        result_label.grid(row=6, column=0, columnspan=2, sticky='w', padx=
+            15, pady=5)
+
+        def add_matches():
+            try:
+                filters = {key: (var.get().strip() or None) for key, var in
+                    fields.items()}
+                for key in ('min_blocks', 'max_blocks'):
+                    if filters[key] is not None:
+                        filters[key] = int(filters[key].replace(',', ''))
+                with SchematicCatalog() as catalog:
+                    rows = catalog.query(kind='litematic', status='pending' if
+                        only_pending.get() else None, **filters)
+            except (ValueError, OSError) as e:
+                result_label.config(text=f'⚠️ {e}')
+                return
+            added = self.add_files([row['path'] for row in rows if os.path.
+                exists(row['path'])])
+            result_label.config(text=
+                f'{len(rows)} match(es), {added} added to the queue')
             self.log_message(
-                f'✅ Added {added_count} file(s) to conversion queue')
+                f'📚 Added {added} file(s) from the catalog ({len(rows)} matched)'
+                )
+
+        def refresh_library():
+            folder = filedialog.askdirectory(title='Folder to index',
+                initialdir=self.default_input_dir, parent=dialog)
+            if not folder:
+                return
+            result_label.config(text=f'Indexing {folder}...')
+
+            def worker():
+                try:
+                    with SchematicCatalog() as catalog:
+                        stats = catalog.refresh([folder])
+                    text = (
+                        f"📚 {stats['scanned']} scanned, {stats['added']} added, {stats['updated']} updated, {stats['removed']} removed"
+                        )
+                except Exception as e:
+                    text = f'⚠️ Indexing failed: {e}'
+                self.root.after(0, lambda : result_label.config(text=text))
+                self.root.after(0, lambda : self.log_message(text))
+            threading.Thread(target=worker, daemon=True).start()
+        buttons = tk.Frame(dialog, bg=self.colors['bg_secondary'])
+        buttons.grid(row=7, column=0, columnspan=2, sticky='ew', padx=15,
+            pady=(5, 15))
+        ttk.Button(buttons, text='🔄 Index Folder', command=refresh_library,
+            style='Modern.TButton').pack(side='left')
+        ttk.Button(buttons, text='➕ Add Matches', command=add_matches, style
+            ='Accent.TButton').pack(side='right')
+        dialog.columnconfigure(1, weight=1)
+
+    def record_conversions(self, results):
+        from schematic_catalog import DEFAULT_CATALOG_PATH, SchematicCatalog
+        if not os.path.exists(DEFAULT_CATALOG_PATH):
+            return
+        try:
+            with SchematicCatalog() as catalog:
+                for input_file, status, output_file in results:
+                    catalog.mark_conversion(input_file, status, output_file)
+        except Exception as e:
+            self.log_message(f'⚠️ Could not update the catalog: {str(e)}')
 
     def clear_files(self):
         self.selected_files.clear()
@@ -350,12 +472,32 @@ Make sure it's in the same folder as this GUI."""
             messagebox.showerror('Invalid Folder',
                 'The selected output folder does not exist.')
             return
+        self.cancel_token = CancellationToken()
         self.convert_btn.configure(state='disabled', text='🔄 Converting...')
+        self.cancel_btn.configure(state='normal')
         self.status_label.config(text='Converting...')
         self.progress.start()
         thread = threading.Thread(target=self.convert_files, daemon=True)
         thread.start()
 
+    def cancel_conversion(self):
+        if self.cancel_token is None:
+            return
+        self.cancel_token.cancel()
+        self.cancel_btn.configure(state='disabled')
+        self.status_label.config(text='Cancelling...')
+        self.log_message('🛑 Cancelling, stopping the current file...')
+
+    def _show_progress(self, index, total_files, progress):
+        self.root.after(0, lambda : self.status_label.config(text=
+            f'[{index}/{total_files}] {progress}'))
+
+    def _stall_timeout(self):
+        try:
+            return max(1, self.stall_timeout.get())
+        except tk.TclError:
+            return int(DEFAULT_STALL_TIMEOUT)
+
     def convert_files(self):
         try:
             total_files = len(self.selected_files)
@@ -364,7 +506,16 @@ Make sure it's in the same folder as this GUI."""
             self.log_message(
                 f'\n🚀 Starting conversion of {total_files} file(s)')
             self.log_message('=' * 50)
+            profile_dir = tempfile.mkdtemp(prefix='litematic_profile_'
+                ) if self.profile_enabled.get() else None
+            profile_reports = []
+            catalog_results = []
+            stall_timeout = self._stall_timeout()
+            cancelled = 0
             for i, input_file in enumerate(self.selected_files, 1):
+                if self.cancel_token.cancelled:
+                    cancelled = total_files - i + 1
+                    break
                 try:
                     if not os.path.exists(input_file):
                         failed += 1
@@ -377,27 +528,42 @@ Make sure it's in the same folder as this GUI."""
                     self.log_message(
                         f'🔄 [{i}/{total_files}] Converting: {os.path.basename(input_file)}'
                         )
-                    result = subprocess.run([sys.executable, self.
-                        converter_script, input_file, output_file],
-                        capture_output=True, text=True, timeout=120)
-                    if result.stdout:
-                        self.log_message(f'   📤 {result.stdout.strip()}')
-                    if result.stderr:
-                        self.log_message(f'   ⚠️ {result.stderr.strip()}')
-                    ret_code = result.returncode
-                    if ret_code == 0 and os.path.exists(output_file):
+                    command = [sys.executable, self.converter_script,
+                        input_file, output_file, '--progress']
+                    if profile_dir:
+                        report_path = os.path.join(profile_dir,
+                            f'{i:05d}_{input_name}.json')
+                        profile_reports.append(report_path)
+                        command += ['--profile', report_path]
+                    result = run_watched(command, self.cancel_token,
+                        stall_timeout, on_output=lambda line: self.
+                        log_message(f'   📤 {line}'), on_progress=lambda
+                        progress, i=i: self._show_progress(i, total_files,
+                        progress))
+                    if result.status == 'cancelled':
+                        cancelled = total_files - i + 1
+                        self.log_message(
+                            f'🛑 Cancelled: {os.path.basename(input_file)}')
+                        break
+                    if result.status == 'stalled':
+                        failed += 1
+                        catalog_results.append((input_file, 'failed', None))
+                        self.log_message(
+                            f'⏱️ No progress for {stall_timeout}s, stopped: {os.path.basename(input_file)}'
+                            )
+                        continue
+                    if result.returncode == 0 and os.path.exists(output_file):
                         successful += 1
+                        catalog_results.append((input_file, 'converted',
+                            output_file))
                         file_size = os.path.getsize(output_file)
                         self.log_message(f'✅ Success ({file_size:,} bytes)')
                     else:
                         failed += 1
+                        catalog_results.append((input_file, 'failed', None))
                         self.log_message(
                             f'❌ Failed to convert {os.path.basename(input_file)}'
                             )
-                except subprocess.TimeoutExpired:
-                    failed += 1
-                    self.log_message(
-                        f'⏱️ Timeout: {os.path.basename(input_file)}')
                 except Exception as e:
                     failed += 1
                     self.log_message(
@@ -407,8 +573,19 @@ Make sure it's in the same folder as this GUI."""
             self.log_message('🎯 CONVERSION COMPLETE')
             self.log_message(f'✅ Successful: {successful}')
             self.log_message(f'❌ Failed: {failed}')
+            if cancelled:
+                self.log_message(f'🛑 Cancelled: {cancelled}')
             self.log_message(f'📁 Output: {self.output_folder.get()}')
-            if failed == 0:
+            self.record_conversions(catalog_results)
+            if profile_dir:
+                self.write_batch_profile(profile_reports)
+                shutil.rmtree(profile_dir, ignore_errors=True)
+            if cancelled:
+                messagebox.showinfo('🛑 Cancelled',
+                    f"""Converted {successful} file(s) before cancelling.
+{failed} file(s) failed, {cancelled} not converted."""
+                    )
+            elif failed == 0:
                 messagebox.showinfo('🎉 Success!',
                     f'All {successful} file(s) converted successfully!')
             else:
@@ -422,9 +599,30 @@ Make sure it's in the same folder as this GUI."""
         finally:
             self.root.after(0, self._conversion_finished)
 
+    def write_batch_profile(self, report_paths):
+        report_file = os.path.join(self.output_folder.get(),
+            'conversion_profile.json')
+        try:
+            aggregate = aggregate_report_files(report_paths, report_file)
+        except Exception as e:
+            self.log_message(f'⚠️ Could not write profile report: {str(e)}')
+            return
+        self.log_message(
+            f"📊 Profiled {aggregate['file_count']} file(s) in {aggregate['total_seconds']:.2f}s"
+            )
+        stages = sorted(aggregate['stages'].items(), key=lambda item: -
+            item[1]['seconds'])
+        for name, stage in stages[:5]:
+            self.log_message(
+                f"   {name}: {stage['seconds']:.2f}s ({stage['share'] * 100:.1f}%)"
+                )
+        self.log_message(f'📊 Profile report: {report_file}')
+
     def _conversion_finished(self):
         self.progress.stop()
         self.convert_btn.configure(state='normal', text='🚀 Convert Files')
+        self.cancel_btn.configure(state='disabled')
+        self.cancel_token = None
         self.status_label.config(text='Ready')
 
     def center_window(self):
@@ -0,0 +1,140 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+import time
+import zlib
+from contextlib import nullcontext
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+from nbt_stream import TAG_COMPOUND, NBTStreamError, iter_compound, open_root
+from nbt_stream import read_payload, read_root_fields, skip_payload
+ROOT_FIELDS = 'Version', 'SubVersion', 'MinecraftDataVersion', 'Metadata'
+READ_BUFFER = 1 << 16
+
+
+def _size_tuple(compound) ->Optional[List[int]]:
+    if compound is None:
+        return None
+    return [abs(int(compound.get(axis, 0))) for axis in 'xyz']
+
+
+def _int_or_none(value) ->Optional[int]:
+    return None if value is None else int(value)
+
+
+def read_litematic_metadata(path: str, include_preview: bool=False,
+    fileobj: Optional[BinaryIO]=None) ->Dict[str, Any]:
+    skip = () if include_preview else ('PreviewImageData',)
+    with open(path, 'rb') if fileobj is None else nullcontext(fileobj
+        ) as raw:
+        with gzip.GzipFile(fileobj=raw, mode='rb') as gz:
+            fields = read_root_fields(io.BufferedReader(gz, READ_BUFFER),
+                ROOT_FIELDS, stop_after='Metadata', skip_nested={'Metadata':
+                skip})
+    if 'Metadata' not in fields:
+        raise NBTStreamError(f'{path} has no Metadata compound')
+    metadata = fields['Metadata']
+    stat = os.stat(path) if fileobj is None else None
+    info = {'path': path, 'file_size': stat and stat.st_size, 'mtime': 
+        stat and stat.st_mtime, 'name': str(metadata.get('Name', '')), 'author': str(metadata.get(
+        'Author', '')), 'description': str(metadata.get('Description', '')),
+        'enclosing_size': _size_tuple(metadata.get('EnclosingSize')),
+        'total_blocks': _int_or_none(metadata.get('TotalBlocks')),
+        'total_volume': _int_or_none(metadata.get('TotalVolume')),
+        'region_count': _int_or_none(metadata.get('RegionCount')),
+        'time_created': _int_or_none(metadata.get('TimeCreated')),
+        'time_modified': _int_or_none(metadata.get('TimeModified')),
+        'version': _int_or_none(fields.get('Version')), 'sub_version':
+        _int_or_none(fields.get('SubVersion')), 'minecraft_data_version':
+        _int_or_none(fields.get('MinecraftDataVersion'))}
+    if include_preview and 'PreviewImageData' in metadata:
+        info['preview'] = [int(pixel) for pixel in metadata['PreviewImageData']]
+    return info
+
+
+def read_litematic_palette(path: str) ->Dict[str, int]:
+    states = set()
+    with open(path, 'rb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='rb') as gz:
+            stream = io.BufferedReader(gz, READ_BUFFER)
+            open_root(stream)
+            for tag_id, name in iter_compound(stream):
+                if name != 'Regions' or tag_id != TAG_COMPOUND:
+                    skip_payload(stream, tag_id)
+                    continue
+                for region_tag, _ in iter_compound(stream):
+                    if region_tag != TAG_COMPOUND:
+                        skip_payload(stream, region_tag)
+                        continue
+                    for field_tag, field in iter_compound(stream):
+                        if field != 'BlockStatePalette':
+                            skip_payload(stream, field_tag)
+                            continue
+                        for entry in read_payload(stream, field_tag):
+                            properties = entry.get('Properties') or {}
+                            states.add((str(entry.get('Name', '')), tuple(
+                                sorted((str(key), str(value)) for key,
+                                value in properties.items()))))
+                break
+    palette: Dict[str, int] = {}
+    for block, _ in states:
+        palette[block] = palette.get(block, 0) + 1
+    return palette
+
+
+def iter_litematic_files(paths: Iterable[str], recursive: bool=True,
+    extensions: Iterable[str]=('.litematic',)) ->Iterator[str]:
+    extensions = tuple(extensions)
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.lower().endswith(extensions):
+                        yield os.path.join(root, filename)
+                if not recursive:
+                    break
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=
+        'Print .litematic metadata without loading the regions')
+    parser.add_argument('paths', nargs='+', help=
+        '.litematic files or directories to scan')
+    parser.add_argument('--json', action='store_true', help=
+        'Print one JSON object per line')
+    parser.add_argument('--no-recursive', action='store_true', help=
+        'Only scan the top level of directories')
+    args = parser.parse_args()
+    started = time.perf_counter()
+    count = failed = 0
+    for path in iter_litematic_files(args.paths, not args.no_recursive):
+        try:
+            info = read_litematic_metadata(path)
+        except (OSError, EOFError, zlib.error, gzip.BadGzipFile,
+            NBTStreamError) as e:
+            failed += 1
+            print(f'❌ {path}: {e}', file=sys.stderr)
+            continue
+        count += 1
+        if args.json:
+            print(json.dumps(info))
+            continue
+        size = 'x'.join(str(n) for n in info['enclosing_size'] or ['?'])
+        blocks = info['total_blocks']
+        print(
+            f"{path}  {info['name']!r} by {info['author'] or 'Unknown'}  {size}  {f'{blocks:,}' if blocks is not None else '?'} blocks  {info['region_count'] if info['region_count'] is not None else '?'} region(s)"
+            )
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f'📊 {count} file(s) read, {failed} failed in {elapsed:.3f}s ({rate:.0f} files/s)'
+        , file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
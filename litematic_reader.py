@@ -0,0 +1,193 @@
+import gzip
+import io
+from contextlib import nullcontext
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
+import nbtlib
+import numpy as np
+from litematic_volume import SPARSE_THRESHOLD, DecodedRegion, SparseBlocks
+from litematic_volume import sparse_air_index
+from nbt_stream import TAG_COMPOUND, NBTStreamError, iter_compound, open_root
+from nbt_stream import read_compound, read_payload, skip_payload
+CONVERSION_FIELDS = ('Position', 'Size', 'BlockStatePalette',
+    'BlockStates', 'TileEntities', 'BlockEntities')
+READ_BUFFER = 1 << 16
+UNPACK_CHUNK = 1 << 22
+
+
+def nbt_state_string(entry) ->str:
+    name = str(entry['Name'])
+    properties = entry.get('Properties')
+    if not properties:
+        return name
+    props = ','.join(f'{key}={value}' for key, value in sorted((str(key),
+        str(value)) for key, value in properties.items()))
+    return f'{name}[{props}]'
+
+
+def needed_bits(palette_size: int) ->int:
+    return max(2, (palette_size - 1).bit_length())
+
+
+def unpack_bit_array(longs, nbits: int, count: int) ->np.ndarray:
+    words = np.asarray(longs, dtype=np.int64).view(np.uint64)
+    expected = (count * nbits + 63) // 64
+    if len(words) != expected:
+        raise NBTStreamError(
+            f'BlockStates has {len(words)} longs, expected {expected} for {count} blocks at {nbits} bits'
+            )
+    words = np.append(words, np.uint64(0))
+    mask = np.uint64((1 << nbits) - 1)
+    values = np.empty(count, dtype=np.uint32)
+    for start in range(0, count, UNPACK_CHUNK):
+        bit = np.arange(start, min(start + UNPACK_CHUNK, count), dtype=np.
+            uint64) * np.uint64(nbits)
+        index = (bit >> np.uint64(6)).astype(np.intp)
+        offset = bit & np.uint64(63)
+        chunk = words[index] >> offset
+        spans = offset + np.uint64(nbits) > np.uint64(64)
+        if spans.any():
+            chunk[spans] |= words[index[spans] + 1] << np.uint64(64) - offset[
+                spans]
+        values[start:start + len(bit)] = chunk & mask
+    return values
+
+
+class SelectiveRegion:
+
+    def __init__(self, name: str, nbt: nbtlib.Compound):
+        self.name = name
+        self.nbt = nbt
+        position = nbt.get('Position', {})
+        size = nbt.get('Size', {})
+        self.x, self.y, self.z = (int(position.get(axis, 0)) for axis in 'xyz'
+            )
+        self.width, self.height, self.length = (int(size.get(axis, 0)) for
+            axis in 'xyz')
+
+    @property
+    def shape(self) ->Tuple[int, int, int]:
+        return abs(self.width), abs(self.height), abs(self.length)
+
+    @property
+    def origin(self) ->Tuple[int, int, int]:
+        return self.minx(), self.miny(), self.minz()
+
+    def minx(self) ->int:
+        return min(0, self.width + 1)
+
+    def maxx(self) ->int:
+        return max(0, self.width - 1)
+
+    def miny(self) ->int:
+        return min(0, self.height + 1)
+
+    def maxy(self) ->int:
+        return max(0, self.height - 1)
+
+    def minz(self) ->int:
+        return min(0, self.length + 1)
+
+    def maxz(self) ->int:
+        return max(0, self.length - 1)
+
+    def xrange(self) ->range:
+        return range(self.minx(), self.maxx() + 1)
+
+    def yrange(self) ->range:
+        return range(self.miny(), self.maxy() + 1)
+
+    def zrange(self) ->range:
+        return range(self.minz(), self.maxz() + 1)
+
+    @property
+    def tile_entities(self) ->List[nbtlib.Compound]:
+        if 'TileEntities' in self.nbt:
+            return list(self.nbt['TileEntities'])
+        return list(self.nbt.get('BlockEntities', []))
+
+    def decode(self, state_string: Callable=nbt_state_string,
+        sparse_threshold: float=SPARSE_THRESHOLD) ->DecodedRegion:
+        entries = list(self.nbt['BlockStatePalette'])
+        width, height, length = self.shape
+        indices = unpack_bit_array(self.nbt['BlockStates'], needed_bits(len
+            (entries)), width * height * length)
+        if len(entries) and int(indices.max(initial=0)) >= len(entries):
+            raise NBTStreamError(
+                f'Region {self.name!r} references palette entries beyond its {len(entries)} states'
+                )
+        air = np.array([(str(entry['Name']) == 'minecraft:air') for entry in
+            entries], dtype=bool)
+        palette = [state_string(entry) for entry in entries]
+        if sparse_air_index(air) is not None:
+            occupied = np.flatnonzero(~air[indices])
+            if len(occupied) < sparse_threshold * indices.size:
+                y, rest = np.divmod(occupied, length * width)
+                z, x = np.divmod(rest, width)
+                linear = (x * height + y) * length + z
+                order = np.argsort(linear, kind='stable')
+                return DecodedRegion(palette, None, self.origin, air,
+                    SparseBlocks((width, height, length), linear[order],
+                    indices[occupied][order]))
+        blocks = np.ascontiguousarray(indices.reshape(height, length, width
+            ).transpose(2, 0, 1))
+        return DecodedRegion(palette, blocks, self.origin, air)
+
+
+class SelectiveLitematic:
+
+    def __init__(self, path: str, metadata: nbtlib.Compound, regions: Dict[
+        str, SelectiveRegion], skipped: Dict[str, int], region_names:
+        Optional[List[str]]=None):
+        self.path = path
+        self.metadata = metadata
+        self.regions = regions
+        self.skipped = skipped
+        self.region_names = list(regions
+            ) if region_names is None else region_names
+        self.name = str(metadata.get('Name', ''))
+        self.author = str(metadata.get('Author', ''))
+        self.description = str(metadata.get('Description', ''))
+
+
+def _read_region(stream, fields: Iterable[str], skipped: Dict[str, int]
+    ) ->nbtlib.Compound:
+    region = nbtlib.Compound()
+    for tag_id, name in iter_compound(stream):
+        if name in fields:
+            region[name] = read_payload(stream, tag_id)
+        else:
+            skip_payload(stream, tag_id)
+            skipped[name] = skipped.get(name, 0) + 1
+    return region
+
+
+def read_litematic_selective(path: str, fields: Iterable[str]=
+    CONVERSION_FIELDS, region_names: Optional[Iterable[str]]=None, fileobj:
+    Optional[BinaryIO]=None) ->SelectiveLitematic:
+    fields = frozenset(fields)
+    wanted = None if region_names is None else set(region_names)
+    metadata = nbtlib.Compound()
+    regions: Dict[str, SelectiveRegion] = {}
+    region_names: List[str] = []
+    skipped: Dict[str, int] = {}
+    with open(path, 'rb') if fileobj is None else nullcontext(fileobj
+        ) as raw:
+        with gzip.GzipFile(fileobj=raw, mode='rb') as gz:
+            stream = io.BufferedReader(gz, READ_BUFFER)
+            open_root(stream)
+            for tag_id, name in iter_compound(stream):
+                if name == 'Metadata' and tag_id == TAG_COMPOUND:
+                    metadata = read_compound(stream, ('PreviewImageData',))
+                elif name == 'Regions' and tag_id == TAG_COMPOUND:
+                    for region_tag, region_name in iter_compound(stream):
+                        if region_tag == TAG_COMPOUND:
+                            region_names.append(region_name)
+                        if region_tag != TAG_COMPOUND or (wanted is not None and
+                            region_name not in wanted):
+                            skip_payload(stream, region_tag)
+                            continue
+                        regions[region_name] = SelectiveRegion(region_name,
+                            _read_region(stream, fields, skipped))
+                else:
+                    skip_payload(stream, tag_id)
+    return SelectiveLitematic(path, metadata, regions, skipped, region_names)
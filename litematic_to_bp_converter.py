@@ -3,6 +3,7 @@ import os
 import argparse
 import struct
 import io
+import hashlib
 import tempfile
 import math
 from pathlib import Path
@@ -13,38 +14,35 @@ if sys.platform.startswith('win'):
     except AttributeError:
         import codecs
         sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'replace')
-try:
-    from litemapy import Schematic, Region
-    import nbtlib
-    from PIL import Image, ImageDraw
-except ImportError as e:
-    print(
-        f'Error: Missing library. Install with: pip install litemapy nbtlib Pillow'
-        )
-    sys.exit(1)
+from cancellation import CANCELLED_EXIT_CODE, CancellationToken, ConversionCancelled
+from cancellation import cancel_on_signals, print_progress
+from conversion_profiler import ConversionProfiler, MeteredWriter, default_report_path
+from lazy_import import lazy_module, require_modules
+from litematic_volume import SparseBlocks, decode_region, first_seen_order
+from memory_budget import parse_memory_size, plan_bp_memory
+from parallel_gzip import DEFAULT_LEVEL, open_gzip_writer
+nbtlib = lazy_module('nbtlib')
+np = lazy_module('numpy')
+Image = lazy_module('PIL.Image')
+ImageDraw = lazy_module('PIL.ImageDraw')
+futures = lazy_module('concurrent.futures')
+shared_memory = lazy_module('multiprocessing.shared_memory')
+litematic_reader = lazy_module('litematic_reader')
 MAGIC_NUMBER = 182827830
 CURRENT_VERSION = 1
 DATA_VERSION = 4189
 DEBUG = False
+ENGINES = 'reference', 'fast'
+PARALLEL_MIN_SECTIONS = 64
+CHECKPOINT_EVERY = 4096
+_section_worker = {}
 
-def _debug_banner_alignment(tile_entities_local, positions, palette):
-    idx_to_state = {idx: state for state, idx in palette.items()}
-    banner_block_coords = [coord for coord, idx in positions.items() if 
-        'banner' in idx_to_state.get(idx, '').lower()]
-    banner_entity_coords = [(int(te.get('x')), int(te.get('y')), int(te.get
-        ('z'))) for te in tile_entities_local if te.get('id') ==
-        'minecraft:banner']
-    print('\n[DEBUG] ---- Banner alignment diagnostics ----')
-    print(f'Blocks:  {len(banner_block_coords)} banner blocks')
-    print(f'Entities: {len(banner_entity_coords)} banner entities')
-    block_set = set(banner_block_coords)
-    entity_set = set(banner_entity_coords)
-    matches = block_set & entity_set
-    print(f'Match count: {len(matches)}')
-    if matches:
-        print(f'  First 5 matches: {list(matches)[:5]}')
-    print(f'Block-only (first 5): {list(block_set - entity_set)[:5]}')
-    print(f'Entity-only (first 5): {list(entity_set - block_set)[:5]}')
+def _debug_banner_alignment(index, palette, positions, volume=None):
+    from block_entity_index import print_report
+    print('\n[DEBUG] ---- Block entity alignment diagnostics ----')
+    report = index.validate(lambda coords: block_states_at(coords, palette,
+        positions, volume))
+    print_report(report, limit=20)
     print('[DEBUG] -------------------------------------\n')
 
 def create_header_nbt(litematic, block_count, contains_air):
@@ -57,7 +55,8 @@ def create_header_nbt(litematic, block_count, contains_air):
         (30.0), 'LockedThumbnail': nbtlib.Byte(0), 'BlockCount': nbtlib.Int
         (block_count), 'ContainsAir': nbtlib.Byte(1 if contains_air else 0)})
 
-def create_thumbnail(positions, palette, dimensions, width=96, height=96):
+def create_thumbnail(positions, palette, dimensions, width=96, height=96,
+    profiler=None):
     build_width, build_height, build_length = dimensions
     if not positions:
         img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
@@ -94,7 +93,9 @@ def create_thumbnail(positions, palette, dimensions, width=96, height=96):
     cam_pos_y = center_y - cam_y * cam_distance
     cam_pos_z = center_z - cam_z * cam_distance
     faces_to_render = []
-    for (bx, by, bz), palette_idx in positions.items():
+    for index, ((bx, by, bz), palette_idx) in enumerate(positions.items()):
+        if profiler is not None and index % CHECKPOINT_EVERY == 0:
+            profiler.checkpoint('create_thumbnail', index, len(positions))
         block_state = None
         for state, idx in palette.items():
             if idx == palette_idx:
@@ -123,10 +124,15 @@ def create_thumbnail(positions, palette, dimensions, width=96, height=96):
             depth = rel_x * cam_x + rel_y * cam_y + rel_z * cam_z
             faces_to_render.append((depth, face_vertices,
                 minecraft_shaded_color, face_name, nx, ny, nz))
+    if profiler is not None:
+        profiler.count('faces_rendered', len(faces_to_render))
     faces_to_render.sort(key=lambda x: x[0], reverse=True)
     projected_faces = []
     all_screen_points = []
-    for depth, vertices, base_color, face_name, nx, ny, nz in faces_to_render:
+    for index, (depth, vertices, base_color, face_name, nx, ny, nz
+        ) in enumerate(faces_to_render):
+        if profiler is not None and index % CHECKPOINT_EVERY == 0:
+            profiler.checkpoint('project_faces', index, len(faces_to_render))
         screen_vertices = []
         for vx, vy, vz in vertices:
             rel_x = vx - cam_pos_x
@@ -373,32 +379,121 @@ def pack_data_array(data, palette_size):
     return packed_data
 
 
-def create_block_data_nbt(chunks, block_entities=None):
-    block_regions = []
-    for chunk in chunks:
-        palette_list = []
-        sorted_palette = sorted(chunk['palette'].items(), key=lambda x: x[1])
-        for block_state, index in sorted_palette:
-            if '[' in block_state and block_state.endswith(']'):
-                name, props_str = block_state.split('[', 1)
-                props_str = props_str[:-1]
-                properties = nbtlib.Compound()
-                if props_str:
-                    for prop in props_str.split(','):
-                        key, value = prop.split('=', 1)
-                        properties[key] = nbtlib.String(value)
-                palette_entry = nbtlib.Compound({'Name': nbtlib.String(name
-                    ), 'Properties': properties})
-            else:
-                palette_entry = nbtlib.Compound({'Name': nbtlib.String(
-                    block_state)})
-            palette_list.append(palette_entry)
+def pack_data_array_fast(data, palette_size):
+    bits_per_block = max(4, (palette_size - 1).bit_length())
+    blocks_per_long = 64 // bits_per_block
+    num_longs = (4096 + blocks_per_long - 1) // blocks_per_long
+    values = np.zeros(num_longs * blocks_per_long, dtype=np.uint64)
+    values[:len(data)] = data
+    shifts = np.arange(blocks_per_long, dtype=np.uint64) * np.uint64(
+        bits_per_block)
+    packed = np.bitwise_or.reduce(values.reshape(num_longs,
+        blocks_per_long) << shifts, axis=1)
+    return packed.view(np.int64)
+
+
+def pack_uniform_data_array(value, palette_size):
+    bits_per_block = max(4, (palette_size - 1).bit_length())
+    blocks_per_long = 64 // bits_per_block
+    num_longs = (4096 + blocks_per_long - 1) // blocks_per_long
+    tail_blocks = 4096 - (num_longs - 1) * blocks_per_long
+    word = tail = 0
+    for i in range(blocks_per_long):
+        word |= value << i * bits_per_block
+        if i < tail_blocks:
+            tail |= value << i * bits_per_block
+    packed = np.full(num_longs, word, dtype=np.uint64)
+    packed[-1] = tail
+    return packed.view(np.int64)
+
+
+def uniform_section_value(data):
+    first = data[0]
+    if isinstance(data, np.ndarray):
+        return int(first) if (data == first).all() else None
+    return first if data.count(first) == len(data) else None
+
+
+def create_block_states_nbt(chunk, data_array=None):
+    palette_list = []
+    sorted_palette = sorted(chunk['palette'].items(), key=lambda x: x[1])
+    for block_state, index in sorted_palette:
+        if '[' in block_state and block_state.endswith(']'):
+            name, props_str = block_state.split('[', 1)
+            props_str = props_str[:-1]
+            properties = nbtlib.Compound()
+            if props_str:
+                for prop in props_str.split(','):
+                    key, value = prop.split('=', 1)
+                    properties[key] = nbtlib.String(value)
+            palette_entry = nbtlib.Compound({'Name': nbtlib.String(name),
+                'Properties': properties})
+        else:
+            palette_entry = nbtlib.Compound({'Name': nbtlib.String(
+                block_state)})
+        palette_list.append(palette_entry)
+    if data_array is None and isinstance(chunk['data'], np.ndarray):
+        data_array = pack_data_array_fast(chunk['data'], len(palette_list))
+    elif data_array is None:
         data_array = pack_data_array(chunk['data'], len(palette_list))
-        chunk_nbt = nbtlib.Compound({'X': nbtlib.Int(chunk['x']), 'Y':
-            nbtlib.Int(chunk['y']), 'Z': nbtlib.Int(chunk['z']),
-            'BlockStates': nbtlib.Compound({'palette': nbtlib.List[nbtlib.
-            Compound](palette_list), 'data': nbtlib.LongArray(data_array)})})
-        block_regions.append(chunk_nbt)
+    return nbtlib.Compound({'palette': nbtlib.List[nbtlib.Compound](
+        palette_list), 'data': nbtlib.LongArray(data_array)})
+
+
+def create_section_nbt(chunk):
+    return nbtlib.Compound({'X': nbtlib.Int(chunk['x']), 'Y': nbtlib.Int(
+        chunk['y']), 'Z': nbtlib.Int(chunk['z']), 'BlockStates':
+        create_block_states_nbt(chunk)})
+
+
+class SectionEncoder:
+    position_format = struct.Struct('>Bh1siBh1siBh1si')
+
+    def __init__(self):
+        self.block_states_name = struct.pack('>Bh', nbtlib.Compound.tag_id,
+            len(b'BlockStates')) + b'BlockStates'
+        self.cache = {}
+        self.cache_hits = 0
+        self.uniform_sections = 0
+
+    def content_key(self, chunk):
+        states = tuple(state for state, _ in sorted(chunk['palette'].items(
+            ), key=lambda x: x[1]))
+        value = uniform_section_value(chunk['data'])
+        if value is not None:
+            return states, value
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update('\0'.join(states).encode('utf-8'))
+        digest.update(np.asarray(chunk['data'], dtype=np.uint16).tobytes())
+        return digest.digest(), None
+
+    def encode_block_states(self, chunk, uniform_value):
+        if uniform_value is not None:
+            self.uniform_sections += 1
+            block_states = create_block_states_nbt(chunk,
+                pack_uniform_data_array(uniform_value, len(chunk['palette'])))
+        else:
+            block_states = create_block_states_nbt(chunk)
+        buffer = io.BytesIO()
+        block_states.write(buffer)
+        return self.block_states_name + buffer.getvalue()
+
+    def encode(self, chunk):
+        key = self.content_key(chunk)
+        block_states = self.cache.get(key)
+        if block_states is None:
+            block_states = self.encode_block_states(chunk, key[1])
+            self.cache[key] = block_states
+        else:
+            self.cache_hits += 1
+        position = self.position_format.pack(nbtlib.Int.tag_id, 1, b'X',
+            chunk['x'], nbtlib.Int.tag_id, 1, b'Y', chunk['y'], nbtlib.Int.
+            tag_id, 1, b'Z', chunk['z'])
+        return position + block_states + nbtlib.Compound.end_tag
+
+
+def create_block_data_nbt(chunks, block_entities=None):
+    block_regions = [create_section_nbt(chunk) for chunk in chunks]
     if block_entities is None:
         block_entities = []
     return nbtlib.Compound({'DataVersion': nbtlib.Int(DATA_VERSION),
@@ -406,6 +501,84 @@ def create_block_data_nbt(chunks, block_entities=None):
         'BlockEntities': nbtlib.List[nbtlib.Compound](block_entities),
         'Entities': nbtlib.List[nbtlib.Compound]([])})
 
+
+class BlockRegionStreamWriter:
+
+    def __init__(self, fileobj, section_count):
+        self.fileobj = fileobj
+        self.section_count = section_count
+        self.sections_written = 0
+        fileobj.write(struct.pack('>Bh', nbtlib.Compound.tag_id, 0) + self.
+            serialize_named_tag('DataVersion', nbtlib.Int(DATA_VERSION)) +
+            struct.pack('>Bh', nbtlib.List.tag_id, len(b'BlockRegion')) +
+            b'BlockRegion' + struct.pack('>Bi', nbtlib.Compound.tag_id,
+            section_count))
+
+    @staticmethod
+    def serialize_named_tag(name, tag):
+        encoded_name = name.encode('utf-8')
+        buffer = io.BytesIO()
+        buffer.write(struct.pack('>Bh', tag.tag_id, len(encoded_name)))
+        buffer.write(encoded_name)
+        tag.write(buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def serialize_section(section_nbt):
+        buffer = io.BytesIO()
+        section_nbt.write(buffer)
+        return buffer.getvalue()
+
+    def write_section(self, section_nbt):
+        self.write_section_bytes(self.serialize_section(section_nbt))
+
+    def write_section_bytes(self, section_data):
+        if self.sections_written >= self.section_count:
+            raise ValueError(
+                f'BlockRegion was declared with {self.section_count} sections'
+                )
+        self.fileobj.write(section_data)
+        self.sections_written += 1
+
+    def serialize_tail(self, block_entities=None):
+        return self.serialize_named_tag('BlockEntities', nbtlib.List[nbtlib
+            .Compound](block_entities or [])) + self.serialize_named_tag(
+            'Entities', nbtlib.List[nbtlib.Compound]([])
+            ) + nbtlib.Compound.end_tag
+
+    def finish(self, block_entities=None):
+        self.finish_bytes(self.serialize_tail(block_entities))
+
+    def finish_bytes(self, tail_data):
+        if self.sections_written != self.section_count:
+            raise ValueError(
+                f'BlockRegion declared {self.section_count} sections but {self.sections_written} were written'
+                )
+        self.fileobj.write(tail_data)
+
+
+def write_block_data_stream(fileobj, chunks, block_entities=None, profiler
+    =None):
+    profiler = profiler or ConversionProfiler()
+    writer = BlockRegionStreamWriter(fileobj, len(chunks))
+    encoder = SectionEncoder()
+    for index, chunk in enumerate(chunks):
+        profiler.checkpoint('write', index, len(chunks))
+        with profiler.stage('nbt_build'):
+            if isinstance(chunk, bytes):
+                section_data = chunk
+            elif isinstance(chunk['data'], np.ndarray):
+                section_data = encoder.encode(chunk)
+            else:
+                section_data = writer.serialize_section(create_section_nbt(
+                    chunk))
+        writer.write_section_bytes(section_data)
+    with profiler.stage('nbt_build'):
+        tail_data = writer.serialize_tail(block_entities)
+    writer.finish_bytes(tail_data)
+    profiler.count('sections_deduplicated', encoder.cache_hits)
+    profiler.count('sections_uniform', encoder.uniform_sections)
+
 def get_block_state_string(block):
     try:
         if hasattr(block, 'properties'):
@@ -427,11 +600,13 @@ def get_block_state_string(block):
     return block.id
 
 
-def find_bounding_box(region):
+def find_bounding_box(region, profiler=None):
     min_x = min_y = min_z = float('inf')
     max_x = max_y = max_z = float('-inf')
     non_air_count = 0
     for x in region.xrange():
+        if profiler is not None:
+            profiler.checkpoint('bounding_box')
         for y in region.yrange():
             for z in region.zrange():
                 try:
@@ -448,12 +623,29 @@ def find_bounding_box(region):
     return min_x, max_x, min_y, max_y, min_z, max_z, non_air_count
 
 
-def collect_blocks(region, bounds):
+def find_bounding_box_fast(decoded):
+    if decoded.sparse is not None:
+        occupied = None
+        non_air_count = len(decoded.sparse)
+    else:
+        occupied = decoded.occupied()
+        non_air_count = int(np.count_nonzero(occupied))
+    if non_air_count == 0:
+        return 0, 0, 0, 0, 0, 0, 0
+    bounds = []
+    for axis, (low, high) in enumerate(decoded.occupied_bounds(occupied)):
+        bounds += [low + decoded.origin[axis], high + decoded.origin[axis]]
+    return tuple(bounds) + (non_air_count,)
+
+
+def collect_blocks(region, bounds, profiler=None):
     min_x, max_x, min_y, max_y, min_z, max_z, _ = bounds
     palette = {}
     positions = {}
     palette_index = 0
     for x in range(min_x, max_x + 1):
+        if profiler is not None:
+            profiler.checkpoint('collect_blocks', x - min_x, max_x - min_x + 1)
         for y in range(min_y, max_y + 1):
             for z in range(min_z, max_z + 1):
                 try:
@@ -471,19 +663,139 @@ def collect_blocks(region, bounds):
     return palette, positions
 
 
+def block_positions(volume, factor=1):
+    if isinstance(volume, SparseBlocks):
+        coords = volume.coords() // factor
+        values = volume.values
+        if factor > 1:
+            cells = tuple(-(-size // factor) for size in volume.shape)
+            cell_ids = np.ravel_multi_index(tuple(coords.T), cells)
+            order = np.argsort(cell_ids, kind='stable')
+            cell_ids, starts = np.unique(cell_ids[order], return_index=True)
+            values = np.maximum.reduceat(values[order], starts
+                ) if len(order) else values
+            coords = np.stack(np.unravel_index(cell_ids, cells), axis=1)
+        return dict(zip(map(tuple, coords.tolist()), values.tolist()))
+    if factor == 1:
+        occupied = volume >= 0
+        coords = np.argwhere(occupied)
+        return dict(zip(map(tuple, coords.tolist()), volume[occupied].
+            tolist()))
+    cells = tuple(-(-size // factor) for size in volume.shape)
+    positions = {}
+    for cell_x in range(cells[0]):
+        slab = np.full((factor, cells[1] * factor, cells[2] * factor), -1,
+            dtype=np.int32)
+        part = volume[cell_x * factor:(cell_x + 1) * factor]
+        slab[:part.shape[0], :part.shape[1], :part.shape[2]] = part
+        coarse = slab.reshape(factor, cells[1], factor, cells[2], factor).max(
+            axis=(0, 2, 4))
+        present = coarse >= 0
+        for (y, z), idx in zip(np.argwhere(present).tolist(), coarse[
+            present].tolist()):
+            positions[cell_x, y, z] = idx
+    return positions
+
+
+def collect_blocks_sparse(decoded, bounds, with_positions=True):
+    sparse = decoded.sparse
+    low = np.array(bounds[0:6:2]) - decoded.origin
+    shape = tuple(int(size) for size in np.array(bounds[1:6:2]) - bounds[0:
+        6:2] + 1)
+    coords = sparse.coords() - low
+    inside = np.all((coords >= 0) & (coords < shape), axis=1)
+    coords, values = coords[inside], sparse.values[inside]
+    palette = {}
+    remap = np.full(len(decoded.palette), -1, dtype=np.int32)
+    for region_idx in first_seen_order(values).tolist():
+        state = decoded.palette[region_idx]
+        if state not in palette:
+            palette[state] = len(palette)
+        remap[region_idx] = palette[state]
+    volume = SparseBlocks(shape, np.ravel_multi_index(tuple(coords.T),
+        shape), remap[values])
+    positions = block_positions(volume) if with_positions else None
+    return palette, positions, volume
+
+
+def window_inside_region(decoded, bounds):
+    return all(bounds[2 * axis] - decoded.origin[axis] >= 0 and bounds[2 *
+        axis + 1] - decoded.origin[axis] < decoded.shape[axis] for axis in
+        range(3))
+
+
+def collect_blocks_fast(decoded, bounds, with_positions=True):
+    if decoded.sparse is not None and window_inside_region(decoded, bounds):
+        return collect_blocks_sparse(decoded, bounds, with_positions)
+    sub, occupied = decoded.window(bounds)
+    order = first_seen_order(sub[occupied])
+    palette = {}
+    remap = np.full(len(decoded.palette), -1, dtype=np.int32)
+    for region_idx in order.tolist():
+        state = decoded.palette[region_idx]
+        if state not in palette:
+            palette[state] = len(palette)
+        remap[region_idx] = palette[state]
+    volume = np.where(occupied, remap[sub], -1).astype(np.int32)
+    del sub, occupied
+    positions = block_positions(volume) if with_positions else None
+    return palette, positions, volume
+
+
+def collect_region_blocks(region, bounds, decoded=None, with_positions=True,
+    profiler=None):
+    if decoded is None:
+        palette, positions = collect_blocks(region, bounds, profiler)
+        return palette, positions, None
+    return collect_blocks_fast(decoded, bounds, with_positions)
+
+
+def banner_block_coords(palette, positions, volume=None):
+    banner_ids = [idx for state, idx in palette.items() if 'banner' in
+        state.lower()]
+    if not banner_ids:
+        return np.empty((0, 3), dtype=np.int64)
+    if isinstance(volume, SparseBlocks):
+        return volume.coords()[np.isin(volume.values, banner_ids)]
+    if volume is not None:
+        return np.argwhere(np.isin(volume, banner_ids))
+    banner_ids = set(banner_ids)
+    return np.array([coord for coord, idx in positions.items() if idx in
+        banner_ids], dtype=np.int64).reshape(-1, 3)
+
+
+def block_states_at(coords, palette, positions, volume=None):
+    states = palette_states(palette)
+    if isinstance(volume, SparseBlocks):
+        indices = volume.lookup(coords).tolist()
+    elif volume is not None:
+        inside = np.all((coords >= 0) & (coords < volume.shape), axis=1)
+        indices = np.full(len(coords), -1, dtype=np.int64)
+        indices[inside] = volume[tuple(coords[inside].T)]
+        indices = indices.tolist()
+    else:
+        indices = [positions.get(coord, -1) for coord in map(tuple, coords.
+            tolist())]
+    return [(states[idx] if idx >= 0 else None) for idx in indices]
+
+
 def extract_tile_entities(litematic_file, region, bounds):
     min_x, max_x, min_y, max_y, min_z, max_z, _ = bounds
     tile_entities = []
     try:
-        data = nbtlib.load(litematic_file)
-        regions = data.get('Regions', {})
-        if regions:
-            region_name = list(regions.keys())[0]
-            region_data = regions[region_name]
-            if 'TileEntities' in region_data:
-                tile_entities = region_data['TileEntities']
-            elif 'BlockEntities' in region_data:
-                tile_entities = region_data['BlockEntities']
+        region_tile_entities = getattr(region, 'tile_entities', None)
+        if region_tile_entities is not None:
+            tile_entities = [getattr(tile_entity, 'data', tile_entity) for
+                tile_entity in region_tile_entities]
+        else:
+            regions = litematic_reader.read_litematic_selective(litematic_file, (
+                'TileEntities', 'BlockEntities')).regions
+            if regions:
+                region_data = list(regions.values())[0].nbt
+                if 'TileEntities' in region_data:
+                    tile_entities = region_data['TileEntities']
+                elif 'BlockEntities' in region_data:
+                    tile_entities = region_data['BlockEntities']
         print(f'Found {len(tile_entities)} tile entities in litematic file')
     except Exception as e:
         print(f'Warning: Failed to extract tile entities: {e}')
@@ -537,10 +849,14 @@ def extract_tile_entities(litematic_file, region, bounds):
                 'y': nbtlib.Int(local_y), 'z': nbtlib.Int(local_z), 'id':
                 nbtlib.String(str(tile_entity.get('id', '')))})
             for key, value in tile_entity.items():
-                if key not in ['x', 'y', 'z', 'id']:
-                    converted_value = convert_nbt_value(value)
-                    if converted_value is not None:
-                        block_entity_nbt[key] = converted_value
+                if key in ['x', 'y', 'z', 'id']:
+                    continue
+                if isinstance(value, nbtlib.tag.Base):
+                    block_entity_nbt[key] = value
+                    continue
+                converted_value = convert_nbt_value(value)
+                if converted_value is not None:
+                    block_entity_nbt[key] = converted_value
             block_entities.append(block_entity_nbt)
         except Exception as e:
             print(f'Warning: Failed to process tile entity: {e}')
@@ -551,6 +867,8 @@ def extract_tile_entities(litematic_file, region, bounds):
 def convert_nbt_value(value):
     if value is None:
         return None
+    if isinstance(value, nbtlib.tag.Base):
+        return value
     if isinstance(value, str):
         return nbtlib.String(value)
     elif isinstance(value, int):
@@ -593,7 +911,7 @@ def convert_nbt_value(value):
             return None
 
 
-def create_chunks(palette, positions, dimensions):
+def create_chunks(palette, positions, dimensions, profiler=None):
     width, height, length = dimensions
     chunk_min_x = 0 // 16
     chunk_max_x = (width - 1) // 16
@@ -602,7 +920,10 @@ def create_chunks(palette, positions, dimensions):
     chunk_min_z = 0 // 16
     chunk_max_z = (length - 1) // 16
     chunk_dict = {}
-    for (local_x, local_y, local_z), palette_idx in positions.items():
+    for index, ((local_x, local_y, local_z), palette_idx) in enumerate(
+        positions.items()):
+        if profiler is not None and index % CHECKPOINT_EVERY == 0:
+            profiler.checkpoint('create_chunks', index, len(positions))
         world_x, world_y, world_z = local_x, local_y, local_z
         chunk_x = world_x // 16
         chunk_y = world_y // 16
@@ -631,6 +952,198 @@ def create_chunks(palette, positions, dimensions):
     return list(chunk_dict.values())
 
 
+def section_layout(volume):
+    sections = tuple((size + 15) // 16 for size in volume.shape)
+    occupied_index = np.flatnonzero(volume >= 0)
+    if occupied_index.size == 0:
+        return sections, []
+    x, y, z = np.unravel_index(occupied_index, volume.shape)
+    section_ids = (x // 16 * sections[1] + y // 16) * sections[2] + z // 16
+    return sections, first_seen_order(section_ids).tolist()
+
+
+def padded_volume(volume, sections, buffer=None):
+    padded = np.ndarray(tuple(n * 16 for n in sections), dtype=np.int32,
+        buffer=buffer)
+    padded.fill(-1)
+    padded[:volume.shape[0], :volume.shape[1], :volume.shape[2]] = volume
+    return padded
+
+
+def palette_states(palette):
+    states = [None] * len(palette)
+    for state, idx in palette.items():
+        states[idx] = state
+    return states
+
+
+def build_section_chunk(padded, section_id, sections, states, lookup):
+    chunk_x, rest = divmod(section_id, sections[1] * sections[2])
+    chunk_y, chunk_z = divmod(rest, sections[2])
+    block = padded[chunk_x * 16:chunk_x * 16 + 16, chunk_y * 16:chunk_y * 16 +
+        16, chunk_z * 16:chunk_z * 16 + 16]
+    present = block >= 0
+    local_order = first_seen_order(block[present])
+    chunk_palette = {'minecraft:structure_void': 0}
+    for palette_idx in local_order.tolist():
+        state = states[palette_idx]
+        if state not in chunk_palette:
+            chunk_palette[state] = len(chunk_palette)
+        lookup[palette_idx] = chunk_palette[state]
+    data = np.where(present, lookup[np.maximum(block, 0)], 0)
+    lookup[local_order] = 0
+    return {'x': chunk_x, 'y': chunk_y, 'z': chunk_z, 'palette':
+        chunk_palette, 'data': data.transpose(1, 2, 0).ravel(),
+        'palette_index': len(chunk_palette)}
+
+
+def create_chunks_sparse(palette, volume):
+    sections = tuple((size + 15) // 16 for size in volume.shape)
+    coords = volume.coords()
+    section_coords = coords // 16
+    section_ids = np.ravel_multi_index(tuple(section_coords.T), sections)
+    order = first_seen_order(section_ids)
+    grouped = np.argsort(section_ids, kind='stable')
+    starts = np.searchsorted(section_ids[grouped], order)
+    ends = np.searchsorted(section_ids[grouped], order, side='right')
+    local = coords % 16
+    data_index = local[:, 1] * 256 + local[:, 2] * 16 + local[:, 0]
+    states = palette_states(palette)
+    lookup = np.zeros(len(states), dtype=np.uint16)
+    chunks = []
+    for section_id, start, end in zip(order.tolist(), starts.tolist(),
+        ends.tolist()):
+        members = grouped[start:end]
+        values = volume.values[members]
+        local_order = first_seen_order(values)
+        chunk_palette = {'minecraft:structure_void': 0}
+        for palette_idx in local_order.tolist():
+            state = states[palette_idx]
+            if state not in chunk_palette:
+                chunk_palette[state] = len(chunk_palette)
+            lookup[palette_idx] = chunk_palette[state]
+        data = np.zeros(4096, dtype=np.uint16)
+        data[data_index[members]] = lookup[values]
+        lookup[local_order] = 0
+        chunk_x, chunk_y, chunk_z = (int(c) for c in np.unravel_index(
+            section_id, sections))
+        chunks.append({'x': chunk_x, 'y': chunk_y, 'z': chunk_z, 'palette':
+            chunk_palette, 'data': data, 'palette_index': len(chunk_palette)})
+    return chunks
+
+
+def create_chunks_fast(palette, volume, workers=1, profiler=None):
+    if isinstance(volume, SparseBlocks):
+        return create_chunks_sparse(palette, volume)
+    sections, order = section_layout(volume)
+    if not order:
+        return []
+    states = palette_states(palette)
+    if workers > 1 and len(order) >= PARALLEL_MIN_SECTIONS:
+        return encode_sections_parallel(states, volume, sections, order,
+            workers, profiler)
+    padded = padded_volume(volume, sections)
+    lookup = np.zeros(len(states), dtype=np.uint16)
+    chunks = []
+    for index, section_id in enumerate(order):
+        if profiler is not None:
+            profiler.checkpoint('create_chunks', index, len(order))
+        chunks.append(build_section_chunk(padded, section_id, sections,
+            states, lookup))
+    return chunks
+
+
+class SlabChunks:
+
+    def __init__(self, palette, volume):
+        self.states = palette_states(palette)
+        self.volume = volume
+        self.sections = tuple((size + 15) // 16 for size in volume.shape)
+        self._count = None
+
+    def _padded_slab(self, chunk_x):
+        return padded_volume(self.volume[chunk_x * 16:chunk_x * 16 + 16], (
+            1,) + self.sections[1:])
+
+    def __len__(self):
+        if self._count is None:
+            _, ny, nz = self.sections
+            self._count = sum(int(np.count_nonzero((self._padded_slab(
+                chunk_x) >= 0).reshape(16, ny, 16, nz, 16).any(axis=(0, 2,
+                4)))) for chunk_x in range(self.sections[0]))
+        return self._count
+
+    def __iter__(self):
+        lookup = np.zeros(len(self.states), dtype=np.uint16)
+        for chunk_x in range(self.sections[0]):
+            padded = self._padded_slab(chunk_x)
+            slab_sections, order = section_layout(padded)
+            for section_id in order:
+                chunk = build_section_chunk(padded, section_id,
+                    slab_sections, self.states, lookup)
+                chunk['x'] = chunk_x
+                yield chunk
+
+
+def _init_section_worker(shm_name, shape, sections, states):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _section_worker.update(shm=shm, padded=np.ndarray(shape, dtype=np.int32,
+        buffer=shm.buf), sections=sections, states=states, lookup=np.zeros(
+        len(states), dtype=np.uint16), encoder=SectionEncoder())
+
+
+def _encode_section_batch(section_ids):
+    worker = _section_worker
+    encoder = worker['encoder']
+    hits, uniform = encoder.cache_hits, encoder.uniform_sections
+    encoded = [encoder.encode(build_section_chunk(worker['padded'],
+        section_id, worker['sections'], worker['states'], worker['lookup'])
+        ) for section_id in section_ids]
+    return (encoded, encoder.cache_hits - hits, encoder.uniform_sections -
+        uniform)
+
+
+def encode_sections_parallel(states, volume, sections, order, workers,
+    profiler=None):
+    profiler = profiler or ConversionProfiler()
+    shape = tuple(n * 16 for n in sections)
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+    try:
+        padded_volume(volume, sections, shm.buf)
+        batch_size = -(-len(order) // (workers * 4))
+        batches = [order[i:i + batch_size] for i in range(0, len(order),
+            batch_size)]
+        encoded = []
+        with futures.ProcessPoolExecutor(max_workers=workers, initializer=
+            _init_section_worker, initargs=(shm.name, shape, sections, states)
+            ) as pool:
+            for sections_data, hits, uniform in pool.map(
+                _encode_section_batch, batches):
+                encoded.extend(sections_data)
+                profiler.count('sections_deduplicated', hits)
+                profiler.count('sections_uniform', uniform)
+    finally:
+        shm.close()
+        shm.unlink()
+    print(f'Encoded {len(encoded)} sections on {workers} worker processes')
+    return encoded
+
+
+def region_palette_size(region, decoded=None):
+    if decoded is not None:
+        return len(decoded.palette)
+    nbt = getattr(region, 'nbt', None)
+    if nbt is not None:
+        return len(nbt.get('BlockStatePalette', ()))
+    return len(region.palette)
+
+
+def resolve_workers(workers):
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, workers)
+
+
 def write_bp_file(output_path, header_nbt, thumbnail_data, block_data_nbt):
     with open(output_path, 'wb') as f:
         f.write(struct.pack('>I', MAGIC_NUMBER))
@@ -655,22 +1168,142 @@ def write_bp_file(output_path, header_nbt, thumbnail_data, block_data_nbt):
         f.write(struct.pack('>I', len(block_data_compressed)))
         f.write(block_data_compressed)
 
-def convert_litematic_to_bp(litematic_path, output_path):
+def serialize_header(header_nbt):
+    header_buffer = io.BytesIO()
+    nbtlib.File(header_nbt).write(header_buffer)
+    return header_buffer.getvalue()
+
+
+def encode_block_data(chunks, block_entities=None, profiler=None):
+    buffer = io.BytesIO()
+    write_block_data_stream(buffer, chunks, block_entities, profiler)
+    return buffer.getvalue()
+
+
+def write_bp_payload(output_path, header_data, thumbnail_data, block_data,
+    profiler=None, compresslevel=DEFAULT_LEVEL, compress_threads=1):
+    profiler = profiler or ConversionProfiler()
+    with profiler.stage('gzip'):
+        compressed = io.BytesIO()
+        with open_gzip_writer(compressed, compresslevel, compress_threads,
+            mtime=0) as gz:
+            gz.write(block_data)
+        compressed = compressed.getvalue()
+    profiler.count('bytes_uncompressed', len(block_data))
+    profiler.set_counter('bytes_compressed', len(compressed))
+    with profiler.stage('disk_write'):
+        with open(output_path, 'wb') as f:
+            f.write(struct.pack('>I', MAGIC_NUMBER))
+            f.write(struct.pack('>I', len(header_data)))
+            f.write(header_data)
+            f.write(struct.pack('>I', len(thumbnail_data)))
+            f.write(thumbnail_data)
+            f.write(struct.pack('>I', len(compressed)))
+            f.write(compressed)
+            profiler.count('bytes_written', f.tell())
+
+
+def write_bp_stream(raw, header_nbt, thumbnail_data, chunks, block_entities
+    =None, profiler=None, compresslevel=DEFAULT_LEVEL, compress_threads=1):
+    profiler = profiler or ConversionProfiler()
+    header_data = serialize_header(header_nbt)
+    f = MeteredWriter(raw, profiler, 'disk_write', 'bytes_written')
+    f.write(struct.pack('>I', MAGIC_NUMBER))
+    f.write(struct.pack('>I', len(header_data)))
+    f.write(header_data)
+    f.write(struct.pack('>I', len(thumbnail_data)))
+    f.write(thumbnail_data)
+    length_offset = raw.tell()
+    f.write(struct.pack('>I', 0))
+    gz = MeteredWriter(open_gzip_writer(f, compresslevel, compress_threads,
+        mtime=0), profiler, 'gzip', 'bytes_uncompressed', inner=f)
+    try:
+        write_block_data_stream(gz, chunks, block_entities, profiler)
+    finally:
+        gz.close()
+    end_offset = raw.tell()
+    profiler.set_counter('bytes_compressed', end_offset - length_offset - 4)
+    raw.seek(length_offset)
+    raw.write(struct.pack('>I', end_offset - length_offset - 4))
+    raw.seek(end_offset)
+
+
+def write_bp_file_streaming(output_path, header_nbt, thumbnail_data, chunks,
+    block_entities=None, profiler=None, compresslevel=DEFAULT_LEVEL,
+    compress_threads=1):
+    with open(output_path, 'wb') as raw:
+        try:
+            write_bp_stream(raw, header_nbt, thumbnail_data, chunks,
+                block_entities, profiler, compresslevel, compress_threads)
+        except ConversionCancelled:
+            raw.close()
+            os.remove(output_path)
+            raise
+
+def convert_litematic_to_bp(litematic_path, output_path, profiler=None,
+    engine='reference', workers=1, compresslevel=DEFAULT_LEVEL,
+    compress_threads=1, max_memory=None):
+    profiler = profiler or ConversionProfiler()
+    if engine not in ENGINES:
+        raise ValueError(f'Unknown engine {engine!r}, expected one of {ENGINES}'
+            )
     print(f'Loading: {litematic_path}')
     try:
-        litematic = Schematic.load(litematic_path)
+        with profiler.stage('load'):
+            if engine == 'fast':
+                litematic = litematic_reader.read_litematic_selective(litematic_path)
+            else:
+                from litemapy import Schematic
+                litematic = Schematic.load(litematic_path)
+    except ConversionCancelled:
+        raise
     except Exception as e:
         print(f'Error loading file: {e}')
         return False
+    return convert_loaded_litematic_to_bp(litematic, litematic_path,
+        output_path, profiler, engine, workers, compresslevel=compresslevel,
+        compress_threads=compress_threads, max_memory=max_memory)
+
+
+def convert_loaded_litematic_to_bp(litematic, litematic_path, output_path,
+    profiler=None, engine='reference', workers=1, region_name=None,
+    decoded=None, write=None, compresslevel=DEFAULT_LEVEL, compress_threads
+    =1, max_memory=None):
+    from block_entity_index import BlockEntityIndex, print_report
+    from block_entity_index import summarize_report
+    profiler = profiler or ConversionProfiler()
     base_name = Path(litematic_path).stem
     litematic.name = base_name
     print(f'Name (from filename): {litematic.name}')
     print(f'Author: {litematic.author}')
     regions = litematic.regions
-    region_name = list(regions.keys())[0]
+    if not regions:
+        print('No regions found')
+        return False
+    if getattr(litematic, 'skipped', None):
+        print('Skipped unused region tags: ' + ', '.join(f'{name} ({count})'
+             for name, count in sorted(litematic.skipped.items())))
+    region_name = region_name or list(regions.keys())[0]
     region = regions[region_name]
     print(f'Original size: {region.width}x{region.height}x{region.length}')
-    bounds = find_bounding_box(region)
+    plan = None
+    if engine == 'fast' and max_memory is not None:
+        region_shape = abs(region.width), abs(region.height), abs(region.length
+            )
+        plan = plan_bp_memory(region_shape, region_palette_size(region,
+            decoded), max_memory)
+        print(f'Memory estimate before decoding: {plan.describe()}')
+    if engine == 'fast' and decoded is None:
+        with profiler.stage('decode'):
+            if isinstance(region, litematic_reader.SelectiveRegion):
+                decoded = region.decode()
+            else:
+                decoded = decode_region(region, get_block_state_string)
+    with profiler.stage('bounding_box'):
+        bounds = find_bounding_box_fast(decoded
+            ) if decoded is not None else find_bounding_box(region, profiler)
+    profiler.count('voxels_scanned', abs(region.width * region.height *
+        region.length))
     min_x, max_x, min_y, max_y, min_z, max_z, non_air_count = bounds
     if non_air_count == 0:
         print('No blocks found')
@@ -680,10 +1313,23 @@ def convert_litematic_to_bp(litematic_path, output_path):
     length = max_z - min_z + 1
     print(f'Optimized size: {width}x{height}x{length}')
     print(f'Blocks: {non_air_count}')
-    palette, positions = collect_blocks(region, bounds)
+    if plan is not None:
+        plan = plan_bp_memory(region_shape, len(decoded.palette),
+            max_memory, non_air_count, (width, height, length))
+        print(f'Memory plan: {plan.describe()}')
+        if not plan.fits:
+            print(
+                '⚠️  Even the lowest-memory mode is estimated above the budget, continuing anyway'
+                )
+    streaming = plan is not None and plan.streaming
+    with profiler.stage('collect_blocks'):
+        palette, positions, volume = collect_region_blocks(region, bounds,
+            decoded, not streaming, profiler)
+    profiler.count('voxels_scanned', width * height * length)
     print(f'Unique block types: {len(palette)}')
-    tile_entities, combined_bounds = extract_tile_entities(litematic_path,
-        region, bounds)
+    with profiler.stage('tile_entities'):
+        tile_entities, combined_bounds = extract_tile_entities(litematic_path,
+            region, bounds)
     print(f'Tile entities: {len(tile_entities)}')
     if tile_entities:
         (combined_min_x, combined_max_x, combined_min_y, combined_max_y,
@@ -692,58 +1338,82 @@ def convert_litematic_to_bp(litematic_path, output_path):
         height = combined_max_y - combined_min_y + 1
         length = combined_max_z - combined_min_z + 1
         print(f'Updated size with tile entities: {width}x{height}x{length}')
-        palette, positions = collect_blocks(region, combined_bounds + (
-            non_air_count,))
-        if tile_entities:
+        with profiler.stage('collect_blocks'):
+            palette, positions, volume = collect_region_blocks(region, 
+                combined_bounds + (non_air_count,), decoded, not streaming,
+                profiler)
+        profiler.count('voxels_scanned', width * height * length)
+        with profiler.stage('align_block_entities'):
             try:
-                idx_to_state = {idx: state for state, idx in palette.items()}
-                banner_block_coords = [coord for coord, idx in positions.
-                    items() if 'banner' in idx_to_state.get(idx, '').lower()]
-                if banner_block_coords:
-                    block_min = min(c[0] for c in banner_block_coords), min(
-                        c[1] for c in banner_block_coords), min(c[2] for c in
-                        banner_block_coords)
-                    banner_entity_coords = [(int(te['x']), int(te['y']),
-                        int(te['z'])) for te in tile_entities if te.get(
-                        'id') == 'minecraft:banner']
-                    entity_min = min(c[0] for c in banner_entity_coords), min(
-                        c[1] for c in banner_entity_coords), min(c[2] for c in
-                        banner_entity_coords)
-                    dx, dy, dz = (entity_min[i] - block_min[i] for i in
-                        range(3))
-                    if dx or dy or dz:
-                        for te in tile_entities:
-                            te['x'] = nbtlib.Int(int(te['x']) - dx)
-                            te['y'] = nbtlib.Int(int(te['y']) - dy)
-                            te['z'] = nbtlib.Int(int(te['z']) - dz)
-                        if DEBUG:
-                            print(
-                                f'[DEBUG] Shifted tile-entity coords by (dx={-dx}, dy={-dy}, dz={-dz}) for banner alignment'
-                                )
-            except Exception as shift_exc:
-                if DEBUG:
-                    print(f'[DEBUG] Alignment shift failed: {shift_exc}')
+                block_entity_index = BlockEntityIndex.from_xyz(tile_entities)
+                offset = block_entity_index.alignment_offset(
+                    banner_block_coords(palette, positions, volume),
+                    'minecraft:banner')
+                if offset is not None and any(offset):
+                    block_entity_index.shift(offset)
+                    for te, (x, y, z) in zip(tile_entities,
+                        block_entity_index.coords.tolist()):
+                        te['x'] = nbtlib.Int(x)
+                        te['y'] = nbtlib.Int(y)
+                        te['z'] = nbtlib.Int(z)
+                    if DEBUG:
+                        dx, dy, dz = offset
+                        print(
+                            f'[DEBUG] Shifted tile-entity coords by (dx={-dx}, dy={-dy}, dz={-dz}) for banner alignment'
+                            )
+                report = block_entity_index.validate(lambda coords:
+                    block_states_at(coords, palette, positions, volume))
+                summary = summarize_report(report)
+                for status in ('mismatch', 'missing'):
+                    profiler.set_counter(f'block_entities_{status}',
+                        summary[status])
+                if DEBUG or summary['mismatch'] or summary['missing']:
+                    print_report(report)
+            except Exception as e:
+                print(f'⚠️  Block entity alignment skipped: {e}')
         print(f'Unique block types (updated): {len(palette)}')
-    chunks = create_chunks(palette, positions, (width, height, length))
+    profiler.set_counter('palette_size', len(palette))
+    profiler.set_counter('blocks', non_air_count)
+    profiler.set_counter('tile_entities', len(tile_entities))
+    with profiler.stage('create_chunks'):
+        if streaming and not isinstance(volume, SparseBlocks):
+            chunks = SlabChunks(palette, volume)
+        elif volume is not None:
+            chunks = create_chunks_fast(palette, volume, workers, profiler)
+        else:
+            chunks = create_chunks(palette, positions, (width, height,
+                length), profiler)
     print(f'Chunks: {len(chunks)}')
     if not chunks:
         chunks = [{'x': 0, 'y': 0, 'z': 0, 'palette': {'minecraft:air': 0},
             'data': [0] * 4096}]
+    profiler.set_counter('sections', len(chunks))
     header_nbt = create_header_nbt(litematic, non_air_count, False)
-    thumbnail_data = create_thumbnail(positions, palette, (width, height,
-        length))
-    block_data_nbt = create_block_data_nbt(chunks, tile_entities)
-    if DEBUG:
-        try:
-            _debug_banner_alignment(tile_entities, positions, palette)
-        except Exception as dbg_exc:
-            if DEBUG:
-                print(f'[DEBUG] Banner alignment check failed: {dbg_exc}')
+    with profiler.stage('create_thumbnail'):
+        if streaming:
+            factor = plan.thumbnail_factor
+            thumbnail_data = create_thumbnail(block_positions(volume,
+                factor), palette, tuple(-(-size // factor) for size in (
+                width, height, length)), profiler=profiler)
+        else:
+            thumbnail_data = create_thumbnail(positions, palette, (width,
+                height, length), profiler=profiler)
+    if DEBUG and tile_entities:
+        _debug_banner_alignment(BlockEntityIndex.from_xyz(tile_entities),
+            palette, positions, volume)
     print(f'Writing: {output_path}')
     try:
-        write_bp_file(output_path, header_nbt, thumbnail_data, block_data_nbt)
+        if write is None:
+            write_bp_file_streaming(output_path, header_nbt, thumbnail_data,
+                chunks, tile_entities, profiler, compresslevel,
+                compress_threads)
+        else:
+            write(output_path, header_nbt, thumbnail_data, chunks,
+                tile_entities, profiler=profiler)
         print('✓ Conversion completed')
         return True
+    except ConversionCancelled:
+        raise
     except Exception as e:
         print(f'Error writing file: {e}')
         return False
@@ -755,13 +1425,65 @@ def main():
     parser.add_argument('input_file', help='Input .litematic file')
     parser.add_argument('output_file', nargs='?', help=
         'Output .bp file (optional)')
+    parser.add_argument('--engine', choices=ENGINES, default='reference',
+        help='Block processing engine (default: reference)')
+    parser.add_argument('--workers', type=int, default=0, help=
+        'Processes used to pack sections with --engine fast (default: all cores)'
+        )
+    parser.add_argument('--compression-level', type=int, choices=range(1,
+        10), default=DEFAULT_LEVEL, metavar='1-9', help=
+        'gzip level for the block data: 1 is fastest, 9 is smallest (default: 9)'
+        )
+    parser.add_argument('--compress-threads', type=int, default=1, help=
+        'Threads compressing the block data (default: 1, 0 = all cores)')
+    parser.add_argument('--max-memory', type=parse_memory_size, metavar=
+        'SIZE', help=
+        'Memory budget such as 2G; large builds switch to streaming sections and a coarse thumbnail (implies --engine fast)'
+        )
+    parser.add_argument('--track-memory', action='store_true', help=
+        'Also trace Python allocations per stage with tracemalloc (slow on large builds)')
+    parser.add_argument('--profile', nargs='?', const='', default=None,
+        metavar='REPORT', help=
+        'Write a JSON timing report (default: <output>.profile.json)')
+    parser.add_argument('--profile-pstats', metavar='PATH', help=
+        'Also dump cProfile statistics to PATH (implies --profile)')
+    parser.add_argument('--progress', action='store_true', help=
+        'Print machine-readable progress lines for the GUI watchdog')
     args = parser.parse_args()
+    if args.max_memory is not None and args.engine == 'reference':
+        print('Using the fast engine for --max-memory')
+        args.engine = 'fast'
+    require_modules(('nbtlib', 'numpy', 'PIL') + (('litemapy',) if args.
+        engine == 'reference' else ()))
     if not os.path.exists(args.input_file):
         print(f"Error: File '{args.input_file}' not found")
         return
     output_file = (args.output_file or
         f'{os.path.splitext(args.input_file)[0]}.bp')
-    success = convert_litematic_to_bp(args.input_file, output_file)
+    token = CancellationToken()
+    cancel_on_signals(token)
+    track_memory = args.track_memory or args.max_memory is not None
+    profiler = ConversionProfiler(label=args.input_file, pstats_path=args.
+        profile_pstats, track_memory=track_memory, token=token, progress=
+        print_progress if args.progress else None, trace_allocations=args.
+        track_memory).start()
+    try:
+        success = convert_litematic_to_bp(args.input_file, output_file,
+            profiler=profiler, engine=args.engine, workers=resolve_workers(
+            args.workers), compresslevel=args.compression_level,
+            compress_threads=args.compress_threads, max_memory=args.max_memory)
+    except ConversionCancelled as e:
+        profiler.stop()
+        print(f'🛑 {e}')
+        sys.exit(CANCELLED_EXIT_CODE)
+    profiler.stop()
+    if args.profile is not None or args.profile_pstats:
+        report_path = args.profile or default_report_path(output_file)
+        profiler.save(report_path)
+        profiler.print_summary()
+        print(f'📊 Profile report: {report_path}')
+    elif track_memory:
+        profiler.print_memory_summary(profiler.report()['memory'])
     if not success:
         sys.exit(1)
 if __name__ == '__main__':
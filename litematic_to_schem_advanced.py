@@ -1,33 +1,201 @@
+from __future__ import annotations
 import sys
 import os
 import argparse
+import io
 from pathlib import Path
 import traceback
 import json
 import time
-from typing import Dict, List, Optional, Tuple, Any
-try:
-    from litemapy import Schematic as LitematicSchematic
-    from litemapy import Region as LitematicRegion
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Any
+from cancellation import CANCELLED_EXIT_CODE, CancellationToken, ConversionCancelled
+from cancellation import cancel_on_signals, print_progress
+from conversion_profiler import ConversionProfiler, default_report_path
+from lazy_import import lazy_module, require_modules
+from parallel_gzip import DEFAULT_LEVEL, gzip_compress
+if TYPE_CHECKING:
     from litemapy import BlockState
-except ImportError:
-    print(
-        'Error: litemapy library not found. Install with: pip install litemapy'
-        )
-    sys.exit(1)
-try:
-    import nbtlib
-except ImportError:
-    print('Error: nbtlib library not found. Install with: pip install nbtlib')
-    sys.exit(1)
+    from litemapy import Region as LitematicRegion
+    from litematic_volume import DecodedRegion
+nbtlib = lazy_module('nbtlib')
+np = lazy_module('numpy')
+ENGINES = 'reference', 'fast'
+LEGACY_BLOCK_IDS = {'minecraft:air': (0, 0), 'minecraft:cave_air': (0, 0),
+    'minecraft:void_air': (0, 0), 'minecraft:stone': (1, 0),
+    'minecraft:granite': (1, 1), 'minecraft:polished_granite': (1, 2),
+    'minecraft:diorite': (1, 3), 'minecraft:polished_diorite': (1, 4),
+    'minecraft:andesite': (1, 5), 'minecraft:polished_andesite': (1, 6),
+    'minecraft:grass_block': (2, 0), 'minecraft:dirt': (3, 0),
+    'minecraft:coarse_dirt': (3, 1), 'minecraft:podzol': (3, 2),
+    'minecraft:cobblestone': (4, 0), 'minecraft:oak_planks': (5, 0),
+    'minecraft:spruce_planks': (5, 1), 'minecraft:birch_planks': (5, 2),
+    'minecraft:jungle_planks': (5, 3), 'minecraft:acacia_planks': (5, 4),
+    'minecraft:dark_oak_planks': (5, 5), 'minecraft:oak_sapling': (6, 0),
+    'minecraft:spruce_sapling': (6, 1), 'minecraft:birch_sapling': (6, 2),
+    'minecraft:jungle_sapling': (6, 3), 'minecraft:acacia_sapling': (6, 4),
+    'minecraft:dark_oak_sapling': (6, 5), 'minecraft:bedrock': (7, 0),
+    'minecraft:water': (9, 0), 'minecraft:lava': (11, 0), 'minecraft:sand':
+    (12, 0), 'minecraft:red_sand': (12, 1), 'minecraft:gravel': (13, 0),
+    'minecraft:gold_ore': (14, 0), 'minecraft:iron_ore': (15, 0),
+    'minecraft:coal_ore': (16, 0), 'minecraft:oak_log': (17, 0),
+    'minecraft:spruce_log': (17, 1), 'minecraft:birch_log': (17, 2),
+    'minecraft:jungle_log': (17, 3), 'minecraft:oak_wood': (17, 12),
+    'minecraft:spruce_wood': (17, 13), 'minecraft:birch_wood': (17, 14),
+    'minecraft:jungle_wood': (17, 15), 'minecraft:oak_leaves': (18, 0),
+    'minecraft:spruce_leaves': (18, 1), 'minecraft:birch_leaves': (18, 2),
+    'minecraft:jungle_leaves': (18, 3), 'minecraft:sponge': (19, 0),
+    'minecraft:wet_sponge': (19, 1), 'minecraft:glass': (20, 0),
+    'minecraft:lapis_ore': (21, 0), 'minecraft:lapis_block': (22, 0),
+    'minecraft:dispenser': (23, 0), 'minecraft:sandstone': (24, 0),
+    'minecraft:chiseled_sandstone': (24, 1), 'minecraft:cut_sandstone': (
+    24, 2), 'minecraft:note_block': (25, 0), 'minecraft:powered_rail': (27,
+    0), 'minecraft:detector_rail': (28, 0), 'minecraft:sticky_piston': (29,
+    0), 'minecraft:cobweb': (30, 0), 'minecraft:grass': (31, 1),
+    'minecraft:short_grass': (31, 1), 'minecraft:fern': (31, 2),
+    'minecraft:dead_bush': (32, 0), 'minecraft:piston': (33, 0),
+    'minecraft:piston_head': (34, 0), 'minecraft:dandelion': (37, 0),
+    'minecraft:poppy': (38, 0), 'minecraft:blue_orchid': (38, 1),
+    'minecraft:allium': (38, 2), 'minecraft:azure_bluet': (38, 3),
+    'minecraft:red_tulip': (38, 4), 'minecraft:orange_tulip': (38, 5),
+    'minecraft:white_tulip': (38, 6), 'minecraft:pink_tulip': (38, 7),
+    'minecraft:oxeye_daisy': (38, 8), 'minecraft:brown_mushroom': (39, 0),
+    'minecraft:red_mushroom': (40, 0), 'minecraft:gold_block': (41, 0),
+    'minecraft:iron_block': (42, 0), 'minecraft:smooth_stone': (43, 8),
+    'minecraft:smooth_stone_slab': (44, 0), 'minecraft:sandstone_slab': (
+    44, 1), 'minecraft:cobblestone_slab': (44, 3), 'minecraft:brick_slab':
+    (44, 4), 'minecraft:stone_brick_slab': (44, 5),
+    'minecraft:nether_brick_slab': (44, 6), 'minecraft:quartz_slab': (44, 
+    7), 'minecraft:bricks': (45, 0), 'minecraft:tnt': (46, 0),
+    'minecraft:bookshelf': (47, 0), 'minecraft:mossy_cobblestone': (48, 0),
+    'minecraft:obsidian': (49, 0), 'minecraft:torch': (50, 5),
+    'minecraft:wall_torch': (50, 0), 'minecraft:fire': (51, 0),
+    'minecraft:spawner': (52, 0), 'minecraft:oak_stairs': (53, 0),
+    'minecraft:chest': (54, 0), 'minecraft:redstone_wire': (55, 0),
+    'minecraft:diamond_ore': (56, 0), 'minecraft:diamond_block': (57, 0),
+    'minecraft:crafting_table': (58, 0), 'minecraft:wheat': (59, 0),
+    'minecraft:farmland': (60, 0), 'minecraft:furnace': (61, 0),
+    'minecraft:oak_sign': (63, 0), 'minecraft:oak_door': (64, 0),
+    'minecraft:ladder': (65, 0), 'minecraft:rail': (66, 0),
+    'minecraft:cobblestone_stairs': (67, 0), 'minecraft:oak_wall_sign': (
+    68, 0), 'minecraft:lever': (69, 0), 'minecraft:stone_pressure_plate': (
+    70, 0), 'minecraft:iron_door': (71, 0), 'minecraft:oak_pressure_plate':
+    (72, 0), 'minecraft:redstone_ore': (73, 0), 'minecraft:redstone_torch':
+    (76, 5), 'minecraft:redstone_wall_torch': (76, 0),
+    'minecraft:stone_button': (77, 0), 'minecraft:snow': (78, 0),
+    'minecraft:ice': (79, 0), 'minecraft:snow_block': (80, 0),
+    'minecraft:cactus': (81, 0), 'minecraft:clay': (82, 0),
+    'minecraft:sugar_cane': (83, 0), 'minecraft:jukebox': (84, 0),
+    'minecraft:oak_fence': (85, 0), 'minecraft:pumpkin': (86, 0),
+    'minecraft:carved_pumpkin': (86, 0), 'minecraft:netherrack': (87, 0),
+    'minecraft:soul_sand': (88, 0), 'minecraft:glowstone': (89, 0),
+    'minecraft:nether_portal': (90, 0), 'minecraft:jack_o_lantern': (91, 0
+    ), 'minecraft:cake': (92, 0), 'minecraft:repeater': (93, 0),
+    'minecraft:oak_trapdoor': (96, 0), 'minecraft:infested_stone': (97, 0),
+    'minecraft:infested_cobblestone': (97, 1),
+    'minecraft:infested_stone_bricks': (97, 2), 'minecraft:stone_bricks': (
+    98, 0), 'minecraft:mossy_stone_bricks': (98, 1),
+    'minecraft:cracked_stone_bricks': (98, 2),
+    'minecraft:chiseled_stone_bricks': (98, 3),
+    'minecraft:brown_mushroom_block': (99, 14),
+    'minecraft:red_mushroom_block': (100, 14), 'minecraft:iron_bars': (101,
+    0), 'minecraft:glass_pane': (102, 0), 'minecraft:melon': (103, 0),
+    'minecraft:pumpkin_stem': (104, 0), 'minecraft:melon_stem': (105, 0),
+    'minecraft:vine': (106, 0), 'minecraft:oak_fence_gate': (107, 0),
+    'minecraft:brick_stairs': (108, 0), 'minecraft:stone_brick_stairs': (
+    109, 0), 'minecraft:mycelium': (110, 0), 'minecraft:lily_pad': (111, 0),
+    'minecraft:nether_bricks': (112, 0), 'minecraft:nether_brick_fence': (
+    113, 0), 'minecraft:nether_brick_stairs': (114, 0),
+    'minecraft:nether_wart': (115, 0), 'minecraft:enchanting_table': (116,
+    0), 'minecraft:brewing_stand': (117, 0), 'minecraft:cauldron': (118, 0
+    ), 'minecraft:end_portal': (119, 0), 'minecraft:end_portal_frame': (120,
+    0), 'minecraft:end_stone': (121, 0), 'minecraft:dragon_egg': (122, 0),
+    'minecraft:redstone_lamp': (123, 0), 'minecraft:oak_slab': (126, 0),
+    'minecraft:spruce_slab': (126, 1), 'minecraft:birch_slab': (126, 2),
+    'minecraft:jungle_slab': (126, 3), 'minecraft:acacia_slab': (126, 4),
+    'minecraft:dark_oak_slab': (126, 5), 'minecraft:cocoa': (127, 0),
+    'minecraft:sandstone_stairs': (128, 0), 'minecraft:emerald_ore': (129,
+    0), 'minecraft:ender_chest': (130, 0), 'minecraft:tripwire_hook': (131,
+    0), 'minecraft:tripwire': (132, 0), 'minecraft:emerald_block': (133, 0
+    ), 'minecraft:spruce_stairs': (134, 0), 'minecraft:birch_stairs': (135,
+    0), 'minecraft:jungle_stairs': (136, 0), 'minecraft:command_block': (
+    137, 0), 'minecraft:beacon': (138, 0), 'minecraft:cobblestone_wall': (
+    139, 0), 'minecraft:mossy_cobblestone_wall': (139, 1),
+    'minecraft:flower_pot': (140, 0), 'minecraft:carrots': (141, 0),
+    'minecraft:potatoes': (142, 0), 'minecraft:oak_button': (143, 0),
+    'minecraft:anvil': (145, 0), 'minecraft:chipped_anvil': (145, 4),
+    'minecraft:damaged_anvil': (145, 8), 'minecraft:trapped_chest': (146, 0
+    ), 'minecraft:light_weighted_pressure_plate': (147, 0),
+    'minecraft:heavy_weighted_pressure_plate': (148, 0),
+    'minecraft:comparator': (149, 0), 'minecraft:daylight_detector': (151,
+    0), 'minecraft:redstone_block': (152, 0), 'minecraft:nether_quartz_ore':
+    (153, 0), 'minecraft:hopper': (154, 0), 'minecraft:quartz_block': (155,
+    0), 'minecraft:chiseled_quartz_block': (155, 1),
+    'minecraft:quartz_pillar': (155, 2), 'minecraft:quartz_stairs': (156, 0
+    ), 'minecraft:activator_rail': (157, 0), 'minecraft:dropper': (158, 0),
+    'minecraft:acacia_leaves': (161, 0), 'minecraft:dark_oak_leaves': (161,
+    1), 'minecraft:acacia_log': (162, 0), 'minecraft:dark_oak_log': (162, 1
+    ), 'minecraft:acacia_wood': (162, 12), 'minecraft:dark_oak_wood': (162,
+    13), 'minecraft:acacia_stairs': (163, 0), 'minecraft:dark_oak_stairs':
+    (164, 0), 'minecraft:slime_block': (165, 0), 'minecraft:barrier': (166,
+    0), 'minecraft:iron_trapdoor': (167, 0), 'minecraft:prismarine': (168,
+    0), 'minecraft:prismarine_bricks': (168, 1), 'minecraft:dark_prismarine':
+    (168, 2), 'minecraft:sea_lantern': (169, 0), 'minecraft:hay_block': (
+    170, 0), 'minecraft:terracotta': (172, 0), 'minecraft:coal_block': (173,
+    0), 'minecraft:packed_ice': (174, 0), 'minecraft:sunflower': (175, 0),
+    'minecraft:lilac': (175, 1), 'minecraft:tall_grass': (175, 2),
+    'minecraft:large_fern': (175, 3), 'minecraft:rose_bush': (175, 4),
+    'minecraft:peony': (175, 5), 'minecraft:red_sandstone': (179, 0),
+    'minecraft:chiseled_red_sandstone': (179, 1),
+    'minecraft:cut_red_sandstone': (179, 2), 'minecraft:red_sandstone_stairs':
+    (180, 0), 'minecraft:red_sandstone_slab': (182, 0),
+    'minecraft:spruce_fence_gate': (183, 0), 'minecraft:birch_fence_gate':
+    (184, 0), 'minecraft:jungle_fence_gate': (185, 0),
+    'minecraft:dark_oak_fence_gate': (186, 0), 'minecraft:acacia_fence_gate':
+    (187, 0), 'minecraft:spruce_fence': (188, 0), 'minecraft:birch_fence':
+    (189, 0), 'minecraft:jungle_fence': (190, 0), 'minecraft:dark_oak_fence':
+    (191, 0), 'minecraft:acacia_fence': (192, 0), 'minecraft:spruce_door':
+    (193, 0), 'minecraft:birch_door': (194, 0), 'minecraft:jungle_door': (
+    195, 0), 'minecraft:acacia_door': (196, 0), 'minecraft:dark_oak_door':
+    (197, 0), 'minecraft:end_rod': (198, 0), 'minecraft:chorus_plant': (199,
+    0), 'minecraft:chorus_flower': (200, 0), 'minecraft:purpur_block': (201,
+    0), 'minecraft:purpur_pillar': (202, 0), 'minecraft:purpur_stairs': (
+    203, 0), 'minecraft:purpur_slab': (205, 0), 'minecraft:end_stone_bricks':
+    (206, 0), 'minecraft:beetroots': (207, 0), 'minecraft:dirt_path': (208,
+    0), 'minecraft:grass_path': (208, 0), 'minecraft:end_gateway': (209, 0),
+    'minecraft:repeating_command_block': (210, 0),
+    'minecraft:chain_command_block': (211, 0), 'minecraft:frosted_ice': (
+    212, 0), 'minecraft:magma_block': (213, 0),
+    'minecraft:nether_wart_block': (214, 0), 'minecraft:red_nether_bricks':
+    (215, 0), 'minecraft:bone_block': (216, 0), 'minecraft:structure_void':
+    (217, 0), 'minecraft:observer': (218, 0), 'minecraft:structure_block':
+    (255, 0)}
+LEGACY_COLORED_BLOCKS = [('_stained_glass_pane', 160, False), (
+    '_stained_glass', 95, False), ('_glazed_terracotta', 235, True), (
+    '_shulker_box', 219, True), ('_concrete_powder', 252, False), (
+    '_concrete', 251, False), ('_terracotta', 159, False), ('_carpet', 171,
+    False), ('_wool', 35, False)]
+LEGACY_SUFFIX_BLOCKS = [('_wall_banner', (177, 0)), ('_banner', (176, 0)),
+    ('_bed', (26, 0)), ('_wall_skull', (144, 0)), ('_skull', (144, 1)), (
+    '_wall_head', (144, 0)), ('_head', (144, 1))]
 
 class AdvancedLitematicConverter:
 
-    def __init__(self):
+    def __init__(self, profiler: Optional[ConversionProfiler]=None, engine:
+        str='reference', compresslevel: int=DEFAULT_LEVEL, compress_threads:
+        int=1, crop: bool=False):
+        if engine not in ENGINES:
+            raise ValueError(
+                f'Unknown engine {engine!r}, expected one of {ENGINES}')
+        self.profiler = profiler or ConversionProfiler()
+        self.engine = engine
+        self.compresslevel = compresslevel
+        self.compress_threads = compress_threads
+        self.crop = crop
         self.block_palette = {}
         self.block_id_counter = 0
         self.stats = {'total_blocks': 0, 'processed_blocks': 0,
-            'unique_blocks': 0, 'entities': 0, 'tile_entities': 0,
+            'non_air_blocks': 0, 'air_blocks': 0, 'unique_blocks': 0,
+            'block_counts': {}, 'entities': 0, 'tile_entities': 0,
             'banners_converted': 0}
         self.color_name_to_id = {'white': 0, 'orange': 1, 'magenta': 2,
             'light_blue': 3, 'yellow': 4, 'lime': 5, 'pink': 6, 'gray': 7,
@@ -95,12 +263,45 @@ class AdvancedLitematicConverter:
             self.block_id_counter += 1
         return self.block_palette[block_state]
 
+    def get_legacy_block(self, block_state: str) ->Tuple[int, int]:
+        name = self.convert_block_name(block_state.split('[', 1)[0])
+        if name in LEGACY_BLOCK_IDS:
+            return LEGACY_BLOCK_IDS[name]
+        short_name = name.split(':', 1)[1]
+        for suffix, base_id, color_in_id in LEGACY_COLORED_BLOCKS:
+            if short_name.endswith(suffix):
+                color = short_name[:-len(suffix)]
+                if color in self.color_name_to_id:
+                    color_id = self.color_name_to_id[color]
+                    if color_in_id:
+                        return base_id + color_id, 0
+                    return base_id, color_id
+        for suffix, legacy_block in LEGACY_SUFFIX_BLOCKS:
+            if short_name.endswith(suffix):
+                return legacy_block
+        return 0, 0
+
+    def build_legacy_lookup(self) ->Tuple[np.ndarray, np.ndarray]:
+        legacy_ids = np.zeros(len(self.block_palette), dtype=np.uint8)
+        legacy_meta = np.zeros(len(self.block_palette), dtype=np.uint8)
+        unmapped = []
+        for block_state, block_id in self.block_palette.items():
+            legacy_ids[block_id], legacy_meta[block_id
+                ] = self.get_legacy_block(block_state)
+            if legacy_ids[block_id] == 0 and block_state.split('[', 1)[0
+                ] not in LEGACY_BLOCK_IDS:
+                unmapped.append(block_state)
+        if unmapped:
+            print(
+                f'  ⚠️  {len(unmapped)} block state(s) have no legacy ID and were written as air'
+                )
+        return legacy_ids, legacy_meta
+
     def convert_banner_tile_entity(self, litematic_banner) ->Optional[nbtlib
         .Compound]:
         try:
-            if hasattr(litematic_banner, 'data') and litematic_banner.data:
-                nbt_data = litematic_banner.data
-            else:
+            nbt_data = getattr(litematic_banner, 'data', litematic_banner)
+            if not nbt_data:
                 print(f'  ⚠️  Banner tile entity missing data')
                 return None
             entity_id = nbt_data.get('id', 'minecraft:banner')
@@ -133,10 +334,9 @@ class AdvancedLitematicConverter:
     def convert_tile_entity(self, litematic_tile_entity) ->Optional[nbtlib.
         Compound]:
         try:
-            if hasattr(litematic_tile_entity, 'data'
-                ) and litematic_tile_entity.data:
-                nbt_data = litematic_tile_entity.data
-            else:
+            nbt_data = getattr(litematic_tile_entity, 'data',
+                litematic_tile_entity)
+            if not nbt_data:
                 print(f'  ⚠️  Tile entity missing data')
                 return None
             entity_id = nbt_data.get('id', 'unknown')
@@ -149,15 +349,17 @@ class AdvancedLitematicConverter:
             for key, value in nbt_data.items():
                 if key not in ['id', 'x', 'y', 'z']:
                     try:
-                        if isinstance(value, str):
+                        if isinstance(value, nbtlib.tag.Base):
+                            tile_entity_data[key] = value
+                        elif isinstance(value, str):
                             tile_entity_data[key] = nbtlib.String(value)
+                        elif isinstance(value, bool):
+                            tile_entity_data[key] = nbtlib.Byte(1 if value else
+                                0)
                         elif isinstance(value, int):
                             tile_entity_data[key] = nbtlib.Int(value)
                         elif isinstance(value, float):
                             tile_entity_data[key] = nbtlib.Float(value)
-                        elif isinstance(value, bool):
-                            tile_entity_data[key] = nbtlib.Byte(1 if value else
-                                0)
                         elif isinstance(value, list):
                             tile_entity_data[key] = nbtlib.List(value)
                         elif hasattr(value, '__dict__') or isinstance(value,
@@ -190,10 +392,16 @@ class AdvancedLitematicConverter:
                     f'Found {len(litematic_tile_entities)} tile entities in region'
                     )
                 for i, tile_entity_data in enumerate(litematic_tile_entities):
+                    if i >= 10:
+                        converted = self.convert_tile_entity(tile_entity_data)
+                        if converted:
+                            tile_entities.append(converted)
+                            self.stats['tile_entities'] += 1
+                        continue
                     print(
                         f'Processing tile entity {i + 1}/{len(litematic_tile_entities)}'
                         )
-                    if hasattr(tile_entity_data, '__dict__'):
+                    if not isinstance(tile_entity_data, dict):
                         print(f'  Type: {type(tile_entity_data).__name__}')
                         print(
                             f"  Available attributes: {[attr for attr in dir(tile_entity_data) if not attr.startswith('_')]}"
@@ -280,29 +488,140 @@ class AdvancedLitematicConverter:
             String('Fabric-Official'), 'Version': nbtlib.String(
             '7.3.14+7149-8bea01b')})})})})})
 
-    def encode_block_data(self, blocks: List[int], palette_size: int) ->bytes:
-        if palette_size <= 1:
-            bits_per_block = 1
+    def encode_block_data_fast(self, blocks: np.ndarray) ->bytes:
+        values = np.asarray(blocks, dtype=np.uint32)
+        lengths = np.ones(values.size, dtype=np.int64)
+        for shift in (7, 14, 21, 28):
+            lengths += values >= 1 << shift
+        if values.size == 0 or lengths.max() == 1:
+            return values.astype(np.uint8).tobytes()
+        offsets = np.cumsum(lengths) - lengths
+        data = np.empty(int(lengths.sum()), dtype=np.uint8)
+        for byte in range(int(lengths.max())):
+            has_byte = lengths > byte
+            group = values[has_byte] >> 7 * byte & 127
+            more = (lengths[has_byte] > byte + 1).astype(np.uint32) << 7
+            data[offsets[has_byte] + byte] = group | more
+        return data.tobytes()
+
+    def collect_block_ids_fast(self, region: LitematicRegion, shape: Tuple[
+        int, int, int], decoded: Optional[DecodedRegion]=None) ->Optional[
+        np.ndarray]:
+        from litematic_volume import compact_uint_dtype, decode_region, first_seen_order
+        if decoded is None:
+            decoded = decode_region(region, self.create_block_state_string)
+        if decoded.shape != shape:
+            print(
+                f'  ⚠️  Decoded volume {decoded.shape} does not match {shape}, using reference engine'
+                )
+            return None
+        if decoded.sparse is not None:
+            return self.collect_block_ids_sparse(decoded)
+        ordered = decoded.blocks.transpose(1, 2, 0).ravel()
+        remap = np.zeros(len(decoded.palette), dtype=np.uint32)
+        for region_idx in first_seen_order(ordered).tolist():
+            remap[region_idx] = self.get_block_id(decoded.palette[region_idx])
+        return remap.astype(compact_uint_dtype(self.block_id_counter - 1))[
+            ordered]
+
+    def collect_block_ids_sparse(self, decoded: DecodedRegion) ->np.ndarray:
+        from litematic_volume import compact_uint_dtype
+        sparse = decoded.sparse
+        width, height, length = sparse.shape
+        x, y, z = np.unravel_index(sparse.indices, sparse.shape)
+        ordered_index = (y * length + z) * width + x
+        order = np.argsort(ordered_index, kind='stable')
+        ordered_index = ordered_index[order]
+        values = sparse.values[order]
+        unique, first = np.unique(values, return_index=True)
+        first_seen = list(zip(ordered_index[first].tolist(), unique.tolist()))
+        gaps = np.flatnonzero(ordered_index != np.arange(len(ordered_index)))
+        first_air = int(gaps[0]) if len(gaps) else len(ordered_index)
+        air_index = decoded.air_index()
+        if first_air < sparse.size:
+            first_seen.append((first_air, air_index))
+        remap = np.zeros(len(decoded.palette), dtype=np.uint32)
+        for _, region_idx in sorted(first_seen):
+            remap[region_idx] = self.get_block_id(decoded.palette[region_idx])
+        block_ids = np.full(sparse.size, remap[air_index], dtype=
+            compact_uint_dtype(self.block_id_counter - 1))
+        block_ids[ordered_index] = remap[values]
+        return block_ids
+
+    def count_blocks(self, blocks: np.ndarray):
+        counts = np.bincount(blocks, minlength=len(self.block_palette))
+        air_block_id = self.block_palette.get('minecraft:air')
+        air_blocks = int(counts[air_block_id]) if air_block_id is not None else 0
+        self.stats['air_blocks'] = air_blocks
+        self.stats['non_air_blocks'] = len(blocks) - air_blocks
+        self.stats['unique_blocks'] = len(self.block_palette)
+        self.stats['block_counts'] = {block_state: int(counts[block_id]) for
+            block_state, block_id in self.block_palette.items()}
+
+    def block_states_at(self, coords: np.ndarray, blocks, dimensions: Tuple
+        [int, int, int]) ->List[Optional[str]]:
+        width, height, length = dimensions
+        states = [None] * len(self.block_palette)
+        for block_state, block_id in self.block_palette.items():
+            states[block_id] = block_state
+        inside = np.all((coords >= 0) & (coords < (width, height, length)),
+            axis=1)
+        x, y, z = coords[inside].T
+        block_ids = np.full(len(coords), -1, dtype=np.int64)
+        block_ids[inside] = np.asarray(blocks)[(y * length + z) * width + x]
+        return [(states[block_id] if block_id >= 0 else None) for block_id in
+            block_ids.tolist()]
+
+    def crop_to_content(self, region: LitematicRegion, shape: Tuple[int,
+        int, int], decoded: Optional[DecodedRegion], tile_entities: List[
+        nbtlib.Compound]) ->Tuple[Optional[DecodedRegion], Tuple[int, int,
+        int], Tuple[int, int, int]]:
+        from litematic_volume import decode_region
+        if decoded is None:
+            with self.profiler.stage('decode'):
+                decoded = decode_region(region, self.create_block_state_string)
+        if decoded.shape != shape:
+            print(
+                f'  ⚠️  Decoded volume {decoded.shape} does not match {shape}, not cropping'
+                )
+            return None, (0, 0, 0), shape
+        with self.profiler.stage('crop'):
+            bounds = decoded.occupied_bounds()
+            low = [bound[0] for bound in bounds] if bounds else None
+            high = [bound[1] for bound in bounds] if bounds else None
+            for tile_entity in tile_entities:
+                pos = [int(value) for value in tile_entity['Pos']]
+                if not all(0 <= value < size for value, size in zip(pos,
+                    shape)):
+                    continue
+                if low is None:
+                    low, high = list(pos), list(pos)
+                low = [min(a, b) for a, b in zip(low, pos)]
+                high = [max(a, b) for a, b in zip(high, pos)]
+            if low is None:
+                print('  No blocks found, keeping the full region')
+                return decoded, (0, 0, 0), shape
+            cropped = decoded.crop(tuple(low), tuple(high))
+            for tile_entity in tile_entities:
+                tile_entity['Pos'] = nbtlib.IntArray([int(value) - offset for
+                    value, offset in zip(tile_entity['Pos'], low)])
+        dimensions = cropped.shape
+        removed = decoded.size - cropped.size
+        air_id_bytes = max(1, (max(len(decoded.palette) - 1, 1).bit_length(
+            ) + 6) // 7)
+        self.profiler.set_counter('voxels_cropped', removed)
+        self.profiler.set_counter('crop_bytes_saved', removed * air_id_bytes)
+        if removed:
+            print(
+                f"  ✂️  Cropped {'x'.join(map(str, shape))} to {'x'.join(map(str, dimensions))} at offset {tuple(low)}: {removed:,} air blocks and ~{removed * air_id_bytes:,} bytes of uncompressed block data removed"
+                )
         else:
-            bits_per_block = max((palette_size - 1).bit_length(), 1)
-        data = bytearray()
-        current_long = 0
-        bits_used = 0
-        for block_id in blocks:
-            current_long |= block_id << bits_used
-            bits_used += bits_per_block
-            while bits_used >= 64:
-                for i in range(8):
-                    data.append(current_long >> i * 8 & 255)
-                current_long >>= 64
-                bits_used -= 64
-        if bits_used > 0:
-            for i in range(8):
-                data.append(current_long >> i * 8 & 255)
-        return bytes(data)
+            print('  ✂️  No air margin to crop')
+        return cropped, tuple(low), dimensions
 
     def convert_region_to_schematic(self, region: LitematicRegion,
-        use_modern_format: bool=True) ->nbtlib.Compound:
+        use_modern_format: bool=True, decoded: Optional[DecodedRegion]=None
+        ) ->nbtlib.Compound:
         width = region.width
         height = region.height
         length = region.length
@@ -329,6 +648,14 @@ class AdvancedLitematicConverter:
                 f'  Region min/max: x({region.minx()}, {region.maxx()}), y({region.miny()}, {region.maxy()}), z({region.minz()}, {region.maxz()})'
                 )
             return None
+        tile_entities = None
+        offset = 0, 0, 0
+        if self.crop:
+            print('Converting tile entities...')
+            with self.profiler.stage('tile_entities'):
+                tile_entities = self.get_tile_entities_from_region(region)
+            decoded, offset, (width, height, length) = self.crop_to_content(
+                region, (width, height, length), decoded, tile_entities)
         if use_modern_format:
             schematic_nbt = self.create_modern_schematic_nbt(width, height,
                 length)
@@ -336,138 +663,142 @@ class AdvancedLitematicConverter:
             schematic_nbt = nbtlib.Compound({'Width': nbtlib.Short(width),
                 'Height': nbtlib.Short(height), 'Length': nbtlib.Short(
                 length), 'Materials': nbtlib.String('Alpha'), 'Blocks':
-                nbtlib.ByteArray([0] * (width * height * length)), 'Data':
-                nbtlib.ByteArray([0] * (width * height * length)),
+                nbtlib.ByteArray([]), 'Data': nbtlib.ByteArray([]),
                 'Entities': nbtlib.List[nbtlib.Compound]([]),
                 'TileEntities': nbtlib.List[nbtlib.Compound]([])})
+        if any(offset):
+            if use_modern_format:
+                schematic_nbt['Offset'] = nbtlib.IntArray(list(offset))
+            else:
+                for axis, value in zip('XYZ', offset):
+                    schematic_nbt[f'WEOrigin{axis}'] = nbtlib.Int(0)
+                    schematic_nbt[f'WEOffset{axis}'] = nbtlib.Int(value)
         self.block_palette = {}
         self.block_id_counter = 0
-        blocks = []
         self.stats['total_blocks'] = width * height * length
         self.stats['processed_blocks'] = 0
         print('Converting blocks...')
-        print(f'  Region coordinate ranges:')
-        print(
-            f'    X: {region.minx()} to {region.maxx()} (range: {len(region.xrange())})'
-            )
-        print(
-            f'    Y: {region.miny()} to {region.maxy()} (range: {len(region.yrange())})'
-            )
-        print(
-            f'    Z: {region.minz()} to {region.maxz()} (range: {len(region.zrange())})'
-            )
-        try:
-            test_x = region.minx()
-            test_y = region.miny()
-            test_z = region.minz()
-            test_block = region[test_x, test_y, test_z]
+        self.profiler.count('voxels_scanned', width * height * length)
+        block_loop_started = time.perf_counter()
+        blocks = None
+        if self.engine == 'fast' or decoded is not None:
+            blocks = self.collect_block_ids_fast(region, (width, height,
+                length), decoded)
+        if blocks is None:
+            from litematic_volume import compact_uint_dtype
+            blocks = np.empty(width * height * length, dtype=np.uint8)
+            capacity = np.iinfo(blocks.dtype).max
+            print(f'  Region coordinate ranges:')
             print(
-                f'  Test block at ({test_x}, {test_y}, {test_z}): {test_block} (type: {type(test_block)})'
+                f'    X: {region.minx()} to {region.maxx()} (range: {len(region.xrange())})'
                 )
             print(
-                f"  Test block ID: {getattr(test_block, 'id', 'no id attribute')}"
+                f'    Y: {region.miny()} to {region.maxy()} (range: {len(region.yrange())})'
                 )
-        except Exception as e:
             print(
-                f'  Error accessing block at ({test_x}, {test_y}, {test_z}): {e}'
+                f'    Z: {region.minz()} to {region.maxz()} (range: {len(region.zrange())})'
                 )
-        for rel_y in range(height):
-            for rel_z in range(length):
-                for rel_x in range(width):
-                    try:
-                        abs_x = region.minx() + rel_x
-                        abs_y = region.miny() + rel_y
-                        abs_z = region.minz() + rel_z
-                        block = region[abs_x, abs_y, abs_z]
-                        if self.stats['processed_blocks'] < 10:
-                            print(
-                                f"    Block at rel({rel_x}, {rel_y}, {rel_z}) abs({abs_x}, {abs_y}, {abs_z}): {block} (id: {getattr(block, 'id', 'no id')})"
-                                )
-                        block_state = self.create_block_state_string(block)
-                        if 'banner' in block_state.lower():
-                            print(
-                                f'  Found banner block at ({abs_x}, {abs_y}, {abs_z}): {block_state}'
+            try:
+                test_x = region.minx()
+                test_y = region.miny()
+                test_z = region.minz()
+                test_block = region[test_x, test_y, test_z]
+                print(
+                    f'  Test block at ({test_x}, {test_y}, {test_z}): {test_block} (type: {type(test_block)})'
+                    )
+                print(
+                    f"  Test block ID: {getattr(test_block, 'id', 'no id attribute')}"
+                    )
+            except Exception as e:
+                print(
+                    f'  Error accessing block at ({test_x}, {test_y}, {test_z}): {e}'
+                    )
+            for rel_y in range(height):
+                self.profiler.checkpoint('convert_blocks', rel_y, height)
+                for rel_z in range(length):
+                    for rel_x in range(width):
+                        try:
+                            abs_x = region.minx() + rel_x
+                            abs_y = region.miny() + rel_y
+                            abs_z = region.minz() + rel_z
+                            block = region[abs_x, abs_y, abs_z]
+                            if self.stats['processed_blocks'] < 10:
+                                print(
+                                    f"    Block at rel({rel_x}, {rel_y}, {rel_z}) abs({abs_x}, {abs_y}, {abs_z}): {block} (id: {getattr(block, 'id', 'no id')})"
+                                    )
+                            block_state = self.create_block_state_string(block)
+                            if 'banner' in block_state.lower():
+                                print(
+                                    f'  Found banner block at ({abs_x}, {abs_y}, {abs_z}): {block_state}'
+                                    )
+                            block_id = self.get_block_id(block_state)
+                        except Exception as e:
+                            if self.stats['processed_blocks'] < 10:
+                                print(
+                                    f'    Error accessing block at rel({rel_x}, {rel_y}, {rel_z}): {e}'
+                                    )
+                            block_id = self.get_block_id('minecraft:air')
+                        if block_id > capacity:
+                            blocks = blocks.astype(compact_uint_dtype(block_id)
                                 )
-                        block_id = self.get_block_id(block_state)
-                    except Exception as e:
-                        if self.stats['processed_blocks'] < 10:
+                            capacity = np.iinfo(blocks.dtype).max
+                        blocks[self.stats['processed_blocks']] = block_id
+                        self.stats['processed_blocks'] += 1
+                        if self.stats['processed_blocks'] % 10000 == 0:
+                            progress = 100 * self.stats['processed_blocks'
+                                ] / self.stats['total_blocks']
                             print(
-                                f'    Error accessing block at rel({rel_x}, {rel_y}, {rel_z}): {e}'
+                                f"Progress: {self.stats['processed_blocks']}/{self.stats['total_blocks']} blocks ({progress:.1f}%)"
                                 )
-                        block_id = self.get_block_id('minecraft:air')
-                    blocks.append(block_id)
-                    if not use_modern_format:
-                        index = (rel_y * length + rel_z) * width + rel_x
-                        if block_id <= 255:
-                            schematic_nbt['Blocks'][index] = block_id
-                        else:
-                            schematic_nbt['Blocks'][index] = 0
-                        schematic_nbt['Data'][index] = 0
-                    self.stats['processed_blocks'] += 1
-                    if self.stats['processed_blocks'] % 10000 == 0:
-                        progress = 100 * self.stats['processed_blocks'
-                            ] / self.stats['total_blocks']
-                        print(
-                            f"Progress: {self.stats['processed_blocks']}/{self.stats['total_blocks']} blocks ({progress:.1f}%)"
-                            )
-        air_block_id = self.block_palette.get('minecraft:air', -1)
-        non_air_blocks = sum(1 for block_id in blocks if block_id !=
-            air_block_id)
+        else:
+            self.stats['processed_blocks'] = len(blocks)
+        self.profiler.add_time('convert_blocks', time.perf_counter() -
+            block_loop_started)
+        self.profiler.set_counter('palette_size', len(self.block_palette))
+        self.count_blocks(blocks)
         print(f'  Total blocks processed: {len(blocks)}')
-        print(f'  Non-air blocks found: {non_air_blocks}')
-        print(f'  Air blocks: {len(blocks) - non_air_blocks}')
+        print(f"  Non-air blocks found: {self.stats['non_air_blocks']}")
+        print(f"  Air blocks: {self.stats['air_blocks']}")
         print(f'  Blocks in palette: {len(self.block_palette)}')
         if use_modern_format:
-            palette = {}
-            for block_state, block_id in self.block_palette.items():
-                palette[block_state] = nbtlib.Int(block_id)
+            palette = {block_state: nbtlib.Int(block_id) for block_state,
+                block_id in self.block_palette.items()}
             temp_banner_blocks = {k: v for k, v in self.block_palette.items
                 () if 'banner' in k.lower()}
             if temp_banner_blocks:
                 print(f'  Banner blocks in palette: {temp_banner_blocks}')
             schematic_nbt['Blocks']['Palette'] = nbtlib.Compound(palette)
-            try:
-                block_data = self.encode_block_data(blocks, len(self.
-                    block_palette))
-                schematic_nbt['Blocks']['Data'] = nbtlib.ByteArray(list(
-                    block_data))
-            except Exception as e:
-                print(
-                    f'Warning: Failed to encode block data, using simple encoding: {e}'
-                    )
-                block_data_bytes = []
-                for block_id in blocks:
-                    if block_id <= 255:
-                        block_data_bytes.append(block_id)
-                    else:
-                        block_data_bytes.append(0)
-                schematic_nbt['Blocks']['Data'] = nbtlib.ByteArray(
-                    block_data_bytes)
-        self.stats['unique_blocks'] = len(self.block_palette)
-        print('Converting tile entities...')
-        tile_entities = self.get_tile_entities_from_region(region)
-        banner_blocks_in_palette = {k: v for k, v in self.block_palette.
-            items() if 'banner' in k.lower()}
-        banner_tile_entity_positions = []
-        for te in tile_entities:
-            if hasattr(te, 'get') and te.get('id') == 'minecraft:banner':
-                if hasattr(te, 'get') and 'Pos' in te:
-                    pos = te['Pos']
-                    if hasattr(pos, '__len__') and len(pos) == 3:
-                        banner_tile_entity_positions.append(tuple(pos))
-                        print(f'  Banner tile entity at position: {tuple(pos)}'
-                            )
-        if banner_tile_entity_positions:
-            print(
-                f'  Total banner tile entities: {len(banner_tile_entity_positions)}'
-                )
-            print(
-                f'  Banner blocks in palette: {len(banner_blocks_in_palette)}')
-            if len(banner_tile_entity_positions) != len(
-                banner_blocks_in_palette):
-                print(
-                    f'  ⚠️  Mismatch: {len(banner_tile_entity_positions)} tile entities vs {len(banner_blocks_in_palette)} blocks'
-                    )
+            with self.profiler.stage('encode_block_data'):
+                block_data = self.encode_block_data_fast(blocks)
+            schematic_nbt['Blocks']['Data'] = nbtlib.ByteArray(np.frombuffer
+                (block_data, dtype=np.int8))
+        else:
+            with self.profiler.stage('legacy_remap'):
+                legacy_ids, legacy_meta = self.build_legacy_lookup()
+                schematic_nbt['Blocks'] = nbtlib.ByteArray(legacy_ids[
+                    blocks].view(np.int8))
+                schematic_nbt['Data'] = nbtlib.ByteArray(legacy_meta[
+                    blocks].view(np.int8))
+        if tile_entities is None:
+            print('Converting tile entities...')
+            with self.profiler.stage('tile_entities'):
+                tile_entities = self.get_tile_entities_from_region(region)
+        if tile_entities:
+            with self.profiler.stage('validate_block_entities'):
+                from block_entity_index import BlockEntityIndex, print_report
+                from block_entity_index import summarize_report
+                try:
+                    report = BlockEntityIndex.from_pos(tile_entities).validate(
+                        lambda coords: self.block_states_at(coords, blocks,
+                        (width, height, length)))
+                    summary = summarize_report(report)
+                    for status in ('mismatch', 'missing'):
+                        self.profiler.set_counter(f'block_entities_{status}',
+                            summary[status])
+                    if summary['mismatch'] or summary['missing']:
+                        print_report(report, indent='  ')
+                except Exception as e:
+                    print(f'  ⚠️  Block entity validation skipped: {e}')
         if use_modern_format:
             schematic_nbt['Blocks']['BlockEntities'] = nbtlib.List[nbtlib.
                 Compound](tile_entities)
@@ -487,7 +818,9 @@ class AdvancedLitematicConverter:
             output_file = f'{base_name}.schem'
         try:
             print(f'Loading litematic file: {input_file}')
-            litematic = LitematicSchematic.load(input_file)
+            with self.profiler.stage('load'):
+                from litemapy import Schematic as LitematicSchematic
+                litematic = LitematicSchematic.load(input_file)
             if hasattr(litematic, 'name') and litematic.name:
                 print(f'Name: {litematic.name}')
             if hasattr(litematic, 'author') and litematic.author:
@@ -507,8 +840,7 @@ class AdvancedLitematicConverter:
                     print(f"\nConverting region '{name}' to {region_output}")
                     schematic_nbt = self.convert_region_to_schematic(region,
                         use_modern_format)
-                    root = nbtlib.File({'Schematic': schematic_nbt})
-                    root.save(region_output, gzipped=True)
+                    self.save_schematic(schematic_nbt, region_output)
                     print(f"✅ Region '{name}' converted successfully!")
                     self.print_stats()
                 return True
@@ -532,21 +864,48 @@ class AdvancedLitematicConverter:
             schematic_nbt = self.convert_region_to_schematic(region,
                 use_modern_format)
             print(f'Saving to: {output_file}')
-            root = nbtlib.File({'Schematic': schematic_nbt})
-            root.save(output_file, gzipped=True)
+            self.save_schematic(schematic_nbt, output_file)
             print(f'✅ Conversion completed successfully!')
             print(f'📁 Output: {output_file}')
             self.print_stats()
             return True
+        except ConversionCancelled:
+            raise
         except Exception as e:
             print(f'❌ Error during conversion: {str(e)}')
             print('Full traceback:')
             traceback.print_exc()
             return False
 
+    def save_schematic(self, schematic_nbt: nbtlib.Compound, output_file: str
+        ):
+        self.write_schematic_payload(self.serialize_schematic(schematic_nbt
+            ), output_file)
+
+    def serialize_schematic(self, schematic_nbt: nbtlib.Compound) ->bytes:
+        with self.profiler.stage('nbt_serialize'):
+            buffer = io.BytesIO()
+            nbtlib.File({'Schematic': schematic_nbt}).write(buffer)
+            return buffer.getvalue()
+
+    def compress_schematic_payload(self, payload: bytes) ->bytes:
+        with self.profiler.stage('gzip'):
+            compressed = gzip_compress(payload, self.compresslevel, self.
+                compress_threads)
+        self.profiler.count('bytes_uncompressed', len(payload))
+        self.profiler.count('bytes_compressed', len(compressed))
+        return compressed
+
+    def write_schematic_payload(self, payload: bytes, output_file: str):
+        compressed = self.compress_schematic_payload(payload)
+        with self.profiler.stage('disk_write'):
+            with open(output_file, 'wb') as f:
+                f.write(compressed)
+
     def print_stats(self):
         print(f'📊 Statistics:')
         print(f"   🧱 Total blocks: {self.stats['processed_blocks']:,}")
+        print(f"   🧱 Non-air blocks: {self.stats['non_air_blocks']:,}")
         print(f"   🎨 Unique block types: {self.stats['unique_blocks']}")
         if self.stats['entities'] > 0:
             print(f"   👤 Entities: {self.stats['entities']}")
@@ -569,6 +928,8 @@ Examples:
   python litematic_to_schem_advanced.py castle.litematic --all-regions
   # Use legacy format (compatible with older tools)
   python litematic_to_schem_advanced.py castle.litematic --legacy
+  # Drop the air margin around the build
+  python litematic_to_schem_advanced.py castle.litematic --crop
         """
         )
     parser.add_argument('input_file', help='Path to the input .litematic file')
@@ -579,16 +940,52 @@ Examples:
         'Convert all regions to separate files')
     parser.add_argument('--legacy', action='store_true', help=
         'Use legacy .schematic format instead of modern .schem')
+    parser.add_argument('--engine', choices=ENGINES, default='reference',
+        help='Block processing engine (default: reference)')
+    parser.add_argument('--crop', action='store_true', help=
+        'Crop to the blocks and block entities, dropping the air margin')
+    parser.add_argument('--compression-level', type=int, choices=range(1,
+        10), default=DEFAULT_LEVEL, metavar='1-9', help=
+        'gzip level: 1 is fastest, 9 is smallest (default: 9)')
+    parser.add_argument('--compress-threads', type=int, default=1, help=
+        'Threads compressing the output (default: 1, 0 = all cores)')
+    parser.add_argument('--profile', nargs='?', const='', default=None,
+        metavar='REPORT', help=
+        'Write a JSON timing report (default: <output>.profile.json)')
+    parser.add_argument('--profile-pstats', metavar='PATH', help=
+        'Also dump cProfile statistics to PATH (implies --profile)')
+    parser.add_argument('--progress', action='store_true', help=
+        'Print machine-readable progress lines for the GUI watchdog')
     parser.add_argument('--version', action='version', version=
         'Advanced Litematic to Schematic Converter 2.0')
     args = parser.parse_args()
     if len(sys.argv) == 1:
         parser.print_help()
         return
-    converter = AdvancedLitematicConverter()
-    success = converter.convert_litematic_to_schem(input_file=args.
-        input_file, output_file=args.output_file, region_name=args.region,
-        all_regions=args.all_regions, use_modern_format=not args.legacy)
+    require_modules(('litemapy', 'nbtlib', 'numpy'))
+    token = CancellationToken()
+    cancel_on_signals(token)
+    profiler = ConversionProfiler(label=args.input_file, pstats_path=args.
+        profile_pstats, token=token, progress=print_progress if args.
+        progress else None).start()
+    converter = AdvancedLitematicConverter(profiler=profiler, engine=args.
+        engine, compresslevel=args.compression_level, compress_threads=args
+        .compress_threads, crop=args.crop)
+    try:
+        success = converter.convert_litematic_to_schem(input_file=args.
+            input_file, output_file=args.output_file, region_name=args.
+            region, all_regions=args.all_regions, use_modern_format=not
+            args.legacy)
+    except ConversionCancelled as e:
+        print(f'🛑 {e}')
+        sys.exit(CANCELLED_EXIT_CODE)
+    profiler.stop()
+    if args.profile is not None or args.profile_pstats:
+        output_file = args.output_file or f'{os.path.splitext(args.input_file)[0]}.schem'
+        report_path = args.profile or default_report_path(output_file)
+        profiler.save(report_path)
+        profiler.print_summary()
+        print(f'📊 Profile report: {report_path}')
     if not success:
         sys.exit(1)
 if __name__ == '__main__':
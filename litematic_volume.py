@@ -0,0 +1,186 @@
+from __future__ import annotations
+from typing import Callable, List, Optional, Tuple
+from lazy_import import lazy_module
+np = lazy_module('numpy')
+SPARSE_THRESHOLD = 0.01
+
+
+class SparseBlocks:
+
+    def __init__(self, shape: Tuple[int, int, int], indices: np.ndarray,
+        values: np.ndarray):
+        self.shape = tuple(shape)
+        self.indices = indices
+        self.values = values
+
+    @classmethod
+    def from_dense(cls, blocks: np.ndarray, occupied: np.ndarray
+        ) ->'SparseBlocks':
+        indices = np.flatnonzero(occupied)
+        return cls(blocks.shape, indices, blocks.reshape(-1)[indices])
+
+    @property
+    def size(self) ->int:
+        return int(np.prod(self.shape))
+
+    def __len__(self) ->int:
+        return len(self.indices)
+
+    def coords(self) ->np.ndarray:
+        return np.stack(np.unravel_index(self.indices, self.shape), axis=1)
+
+    def lookup(self, coords: np.ndarray, missing: int=-1) ->np.ndarray:
+        found = np.full(len(coords), missing, dtype=np.int64)
+        inside = np.all((coords >= 0) & (coords < self.shape), axis=1)
+        linear = np.ravel_multi_index(tuple(coords[inside].T), self.shape)
+        slot = np.searchsorted(self.indices, linear)
+        slot_valid = slot < len(self.indices)
+        hit = np.zeros(len(linear), dtype=bool)
+        hit[slot_valid] = self.indices[slot[slot_valid]] == linear[slot_valid]
+        values = np.full(len(linear), missing, dtype=np.int64)
+        values[hit] = self.values[slot[hit]]
+        found[inside] = values
+        return found
+
+    def to_dense(self, fill: int, dtype=None) ->np.ndarray:
+        dense = np.full(self.size, fill, dtype=dtype or np.uint32)
+        dense[self.indices] = self.values
+        return dense.reshape(self.shape)
+
+
+class DecodedRegion:
+
+    def __init__(self, palette: List[str], blocks: Optional[np.ndarray],
+        origin: Tuple[int, int, int], air: Optional[np.ndarray]=None,
+        sparse: Optional[SparseBlocks]=None):
+        self.palette = palette
+        self._blocks = blocks
+        self.sparse = sparse
+        self.origin = origin
+        if air is None:
+            air = np.array([(state.split('[', 1)[0] == 'minecraft:air') for
+                state in palette], dtype=bool)
+        self.air = air
+
+    @property
+    def blocks(self) ->np.ndarray:
+        if self._blocks is None:
+            self._blocks = self.sparse.to_dense(self.air_index())
+        return self._blocks
+
+    @property
+    def shape(self) ->Tuple[int, int, int]:
+        if self.sparse is not None:
+            return self.sparse.shape
+        return self._blocks.shape
+
+    @property
+    def size(self) ->int:
+        return int(np.prod(self.shape))
+
+    def air_index(self) ->int:
+        return int(np.flatnonzero(self.air)[0])
+
+    def occupied(self) ->np.ndarray:
+        return ~self.air[self.blocks]
+
+    def occupied_bounds(self, occupied: Optional[np.ndarray]=None
+        ) ->Optional[Tuple[Tuple[int, int], ...]]:
+        if self.sparse is not None:
+            if not len(self.sparse):
+                return None
+            coords = self.sparse.coords()
+            return tuple((int(coords[:, axis].min()), int(coords[:, axis].
+                max())) for axis in range(3))
+        if occupied is None:
+            occupied = self.occupied()
+        bounds = []
+        for axis in range(3):
+            other_axes = tuple(a for a in range(3) if a != axis)
+            present = np.flatnonzero(occupied.any(axis=other_axes))
+            if not len(present):
+                return None
+            bounds.append((int(present[0]), int(present[-1])))
+        return tuple(bounds)
+
+    def crop(self, low: Tuple[int, int, int], high: Tuple[int, int, int]
+        ) ->'DecodedRegion':
+        origin = tuple(o + l for o, l in zip(self.origin, low))
+        if self.sparse is not None:
+            shape = tuple(h - l + 1 for l, h in zip(low, high))
+            coords = self.sparse.coords()
+            inside = np.all((coords >= low) & (coords <= high), axis=1)
+            indices = np.ravel_multi_index(tuple((coords[inside] - low).T),
+                shape)
+            return DecodedRegion(self.palette, None, origin, self.air,
+                SparseBlocks(shape, indices, self.sparse.values[inside]))
+        blocks = self._blocks[low[0]:high[0] + 1, low[1]:high[1] + 1, low[2
+            ]:high[2] + 1]
+        return DecodedRegion(self.palette, blocks, origin, self.air)
+
+    def window(self, bounds) ->Tuple[np.ndarray, np.ndarray]:
+        axes = []
+        valid = []
+        for axis, (low, high) in enumerate(((bounds[0], bounds[1]), (
+            bounds[2], bounds[3]), (bounds[4], bounds[5]))):
+            size = self.blocks.shape[axis]
+            index = np.arange(low, high + 1) - self.origin[axis]
+            in_range = (index >= -size) & (index < size)
+            axes.append(np.where(in_range, index % size, 0))
+            valid.append(in_range)
+        sub = self.blocks[np.ix_(*axes)]
+        mask = ~self.air[sub] & valid[0][:, None, None] & valid[1][None, :,
+            None] & valid[2][None, None, :]
+        return sub, mask
+
+
+def sparse_air_index(air: np.ndarray) ->Optional[int]:
+    air_indices = np.flatnonzero(air)
+    return int(air_indices[0]) if len(air_indices) == 1 else None
+
+
+def choose_representation(palette: List[str], blocks: np.ndarray, origin:
+    Tuple[int, int, int], air: np.ndarray, threshold: float=
+    SPARSE_THRESHOLD) ->DecodedRegion:
+    if sparse_air_index(air) is not None:
+        occupied = ~air[blocks]
+        if np.count_nonzero(occupied) < threshold * blocks.size:
+            return DecodedRegion(palette, None, origin, air, SparseBlocks.
+                from_dense(blocks, occupied))
+    return DecodedRegion(palette, blocks, origin, air)
+
+
+def decode_region(region, state_string: Callable, sparse_threshold: float
+    =SPARSE_THRESHOLD) ->DecodedRegion:
+    palette_blocks = list(region.palette)
+    shape = len(region.xrange()), len(region.yrange()), len(region.zrange())
+    origin = region.minx(), region.miny(), region.minz()
+    blocks = getattr(region, '_Region__blocks', None)
+    if not isinstance(blocks, np.ndarray) or blocks.shape != shape:
+        index = {block: i for i, block in enumerate(palette_blocks)}
+        blocks = np.zeros(shape, dtype=np.uint32)
+        for x in range(shape[0]):
+            for y in range(shape[1]):
+                for z in range(shape[2]):
+                    block = region[origin[0] + x, origin[1] + y, origin[2] + z]
+                    if block not in index:
+                        index[block] = len(palette_blocks)
+                        palette_blocks.append(block)
+                    blocks[x, y, z] = index[block]
+    air = np.array([(block.id == 'minecraft:air') for block in
+        palette_blocks], dtype=bool)
+    palette = [state_string(block) for block in palette_blocks]
+    return choose_representation(palette, blocks, origin, air,
+        sparse_threshold)
+
+
+def compact_uint_dtype(max_value: int) ->np.dtype:
+    for dtype in (np.uint8, np.uint16):
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint32)
+
+
+def first_seen_order(values: np.ndarray) ->np.ndarray:
+    unique, first_index = np.unique(values, return_index=True)
+    return unique[np.argsort(first_index, kind='stable')]
@@ -0,0 +1,229 @@
+import os
+import re
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from lazy_import import lazy_module
+tracemalloc = lazy_module('tracemalloc')
+SECTION_SIZE = 16
+UNPACK_CHUNK = 1 << 22
+DECODED_BYTES_PER_VOXEL = 4
+UNPACK_BYTES_PER_VOXEL = 42
+WINDOW_BYTES_PER_VOXEL = 20
+VOLUME_BYTES_PER_VOXEL = 4
+POSITION_BYTES_PER_BLOCK = 116
+COLLECT_BYTES_PER_BLOCK = 250
+SECTION_BYTES = 16896
+ENCODED_SECTION_BYTES = 4096
+THUMBNAIL_BYTES_PER_BLOCK = 4500
+MAX_THUMBNAIL_FACTOR = 64
+SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+
+def parse_memory_size(text: str) ->int:
+    match = re.fullmatch('\\s*([0-9]*\\.?[0-9]+)\\s*([KMGT]?)(?:I?B)?\\s*',
+        str(text).upper())
+    if not match:
+        raise ValueError(
+            f'Invalid memory size {text!r}, expected e.g. 512M or 2G')
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def format_bytes(size: float) ->str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024 or unit == 'GB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TB'
+
+
+def section_count_bound(shape: Tuple[int, int, int]) ->int:
+    count = 1
+    for size in shape:
+        count *= -(-size // SECTION_SIZE)
+    return count
+
+
+class MemoryPlan:
+
+    def __init__(self, budget: Optional[int], stages: Dict[str, int],
+        streaming: bool, thumbnail_factor: int):
+        self.budget = budget
+        self.stages = stages
+        self.streaming = streaming
+        self.thumbnail_factor = thumbnail_factor
+
+    @property
+    def peak(self) ->int:
+        return max(self.stages.values())
+
+    @property
+    def fits(self) ->bool:
+        return self.budget is None or self.peak <= self.budget
+
+    def describe(self) ->str:
+        modes = []
+        if self.streaming:
+            modes.append('streaming sections')
+        if self.thumbnail_factor > 1:
+            modes.append(f'coarse thumbnail 1:{self.thumbnail_factor}')
+        text = f'~{format_bytes(self.peak)}'
+        if self.budget is not None:
+            text += f' of {format_bytes(self.budget)} budget'
+        return text + (f" ({', '.join(modes)})" if modes else '')
+
+
+def estimate_bp_memory(shape: Tuple[int, int, int], palette_size: int,
+    block_count: Optional[int]=None, window: Optional[Tuple[int, int, int]]
+    =None, streaming: bool=False, thumbnail_factor: int=1) ->Dict[str, int]:
+    voxels = shape[0] * shape[1] * shape[2]
+    window = window or shape
+    window_voxels = window[0] * window[1] * window[2]
+    blocks = voxels if block_count is None else block_count
+    bits = max(2, (max(palette_size, 1) - 1).bit_length())
+    packed = voxels * bits // 8
+    decoded = packed + voxels * DECODED_BYTES_PER_VOXEL
+    stages = {'decode': decoded + min(voxels, UNPACK_CHUNK) *
+        UNPACK_BYTES_PER_VOXEL}
+    positions = 0 if streaming else blocks * POSITION_BYTES_PER_BLOCK
+    stages['collect_blocks'] = (decoded + window_voxels *
+        WINDOW_BYTES_PER_VOXEL + (0 if streaming else blocks *
+        COLLECT_BYTES_PER_BLOCK))
+    retained = decoded + window_voxels * VOLUME_BYTES_PER_VOXEL + positions
+    sections = min(section_count_bound(window), blocks)
+    if streaming:
+        slab = SECTION_SIZE * (window[1] + SECTION_SIZE) * (window[2] +
+            SECTION_SIZE) * VOLUME_BYTES_PER_VOXEL
+        stages['create_chunks'] = retained + slab
+        chunks = 0
+    else:
+        padded = section_count_bound(window) * SECTION_SIZE ** 3 * (
+            VOLUME_BYTES_PER_VOXEL)
+        chunks = sections * SECTION_BYTES
+        stages['create_chunks'] = retained + padded + chunks
+    thumbnail_blocks = min(blocks, -(-window_voxels // thumbnail_factor ** 3))
+    stages['create_thumbnail'] = (retained + chunks + thumbnail_blocks * (
+        THUMBNAIL_BYTES_PER_BLOCK + (POSITION_BYTES_PER_BLOCK if streaming else
+        0)))
+    stages['write'] = retained + chunks + sections * ENCODED_SECTION_BYTES
+    return stages
+
+
+def plan_bp_memory(shape: Tuple[int, int, int], palette_size: int, budget:
+    Optional[int]=None, block_count: Optional[int]=None, window: Optional[
+    Tuple[int, int, int]]=None) ->MemoryPlan:
+    stages = estimate_bp_memory(shape, palette_size, block_count, window)
+    plan = MemoryPlan(budget, stages, False, 1)
+    if plan.fits:
+        return plan
+    factor = 1
+    while True:
+        stages = estimate_bp_memory(shape, palette_size, block_count,
+            window, True, factor)
+        plan = MemoryPlan(budget, stages, True, factor)
+        if plan.fits or factor >= MAX_THUMBNAIL_FACTOR or stages[
+            'create_thumbnail'] < max(stages['collect_blocks'], stages[
+            'decode']):
+            return plan
+        factor *= 2
+
+
+def current_rss() ->Optional[int]:
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def peak_rss() ->Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryTracker:
+
+    def __init__(self, interval: float=0.01, trace: bool=True):
+        self.interval = interval
+        self.trace = trace
+        self.stages: Dict[str, Dict[str, int]] = {}
+        self.active: List[str] = []
+        self.peak_rss = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owns_tracemalloc = False
+
+    def start(self) ->'MemoryTracker':
+        if self.trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+            tracemalloc.reset_peak()
+        if current_rss() is not None:
+            self._thread = threading.Thread(target=self._sample, name=
+                'memory-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._boundary()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def _record(self, traced: Optional[int], rss: Optional[int]):
+        with self._lock:
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss, rss)
+            for name in set(self.active):
+                stage = self.stages.setdefault(name, {'peak_traced_bytes':
+                    0, 'peak_rss_bytes': 0} if self.trace else {
+                    'peak_rss_bytes': 0})
+                if traced is not None:
+                    stage['peak_traced_bytes'] = max(stage[
+                        'peak_traced_bytes'], traced)
+                if rss is not None:
+                    stage['peak_rss_bytes'] = max(stage['peak_rss_bytes'], rss)
+
+    def _boundary(self):
+        traced = None
+        if self.trace and tracemalloc.is_tracing():
+            traced = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+        self._record(traced, current_rss())
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._record(None, current_rss())
+
+    def enter(self, name: str):
+        self._boundary()
+        with self._lock:
+            self.active.append(name)
+
+    def exit(self, name: str):
+        self._boundary()
+        with self._lock:
+            for index in range(len(self.active) - 1, -1, -1):
+                if self.active[index] == name:
+                    del self.active[index]
+                    break
+
+    def report(self) ->Dict[str, Any]:
+        rss = peak_rss()
+        return {'peak_rss_bytes': max(self.peak_rss, rss or 0), 'stages':
+            {name: dict(stage) for name, stage in self.stages.items()}}
@@ -0,0 +1,291 @@
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional
+from cancellation import ConversionCancelled
+from conversion_profiler import ConversionProfiler
+from lazy_import import require_modules
+from parallel_gzip import DEFAULT_LEVEL
+FORMAT_EXTENSIONS = {'bp': '.bp', 'schem': '.schem', 'schematic':
+    '.schematic'}
+DEFAULT_FORMATS = 'bp', 'schem'
+
+
+class PendingWrite:
+
+    def __init__(self, fmt: str, output_path: str, write: Callable[[], None]
+        ):
+        self.fmt = fmt
+        self.output_path = output_path
+        self.write = write
+
+
+Sink = Callable[[PendingWrite], None]
+
+
+class SharedDecode:
+
+    def __init__(self, path: str, litematic, region_name: str, decoded):
+        self.path = path
+        self.litematic = litematic
+        self.region_name = region_name
+        self.region = litematic.regions[region_name]
+        self.decoded = decoded
+
+
+def load_shared(path: str, region_name: Optional[str]=None, profiler:
+    Optional[ConversionProfiler]=None, fileobj: Optional[BinaryIO]=None
+    ) ->SharedDecode:
+    from litematic_reader import read_litematic_selective
+    profiler = profiler or ConversionProfiler()
+    with profiler.stage('load'):
+        litematic = read_litematic_selective(path, region_names=None if
+            region_name is None else [region_name], fileobj=fileobj)
+    if not litematic.regions:
+        raise ValueError(f'{path} has no region named {region_name!r}' if
+            region_name else f'{path} has no regions')
+    region_name = region_name or next(iter(litematic.regions))
+    region = litematic.regions[region_name]
+    with profiler.stage('decode'):
+        decoded = region.decode()
+    profiler.count('voxels_decoded', decoded.size)
+    return SharedDecode(path, litematic, region_name, decoded)
+
+
+def write_bp(shared: SharedDecode, output_path: str, profiler:
+    ConversionProfiler, workers: int=1, sink: Optional[Sink]=None,
+    compresslevel: int=DEFAULT_LEVEL, compress_threads: int=1) ->bool:
+    from litematic_to_bp_converter import convert_loaded_litematic_to_bp
+    from litematic_to_bp_converter import encode_block_data, serialize_header
+    from litematic_to_bp_converter import write_bp_payload
+    write = None
+    if sink is not None:
+
+        def write(output_path, header_nbt, thumbnail_data, chunks,
+            block_entities=None, profiler=None):
+            with profiler.stage('nbt_build'):
+                header_data = serialize_header(header_nbt)
+            block_data = encode_block_data(chunks, block_entities, profiler)
+            sink(PendingWrite('bp', output_path, lambda : write_bp_payload(
+                output_path, header_data, thumbnail_data, block_data,
+                profiler, compresslevel, compress_threads)))
+    return convert_loaded_litematic_to_bp(shared.litematic, shared.path,
+        output_path, profiler, 'fast', workers, shared.region_name, shared.
+        decoded, write, compresslevel, compress_threads)
+
+
+def _write_schematic(shared: SharedDecode, output_path: str, profiler:
+    ConversionProfiler, use_modern_format: bool, sink: Optional[Sink]=None,
+    compresslevel: int=DEFAULT_LEVEL, compress_threads: int=1) ->bool:
+    from litematic_to_schem_advanced import AdvancedLitematicConverter
+    converter = AdvancedLitematicConverter(profiler=profiler, engine=
+        'fast', compresslevel=compresslevel, compress_threads=compress_threads
+        )
+    schematic_nbt = converter.convert_region_to_schematic(shared.region,
+        use_modern_format, shared.decoded)
+    if schematic_nbt is None:
+        return False
+    if sink is None:
+        converter.save_schematic(schematic_nbt, output_path)
+    else:
+        payload = converter.serialize_schematic(schematic_nbt)
+        sink(PendingWrite('schem' if use_modern_format else 'schematic',
+            output_path, lambda : converter.write_schematic_payload(payload,
+            output_path)))
+    converter.print_stats()
+    return True
+
+
+def write_schem(shared: SharedDecode, output_path: str, profiler:
+    ConversionProfiler, workers: int=1, sink: Optional[Sink]=None,
+    compresslevel: int=DEFAULT_LEVEL, compress_threads: int=1) ->bool:
+    return _write_schematic(shared, output_path, profiler, True, sink,
+        compresslevel, compress_threads)
+
+
+def write_legacy_schematic(shared: SharedDecode, output_path: str,
+    profiler: ConversionProfiler, workers: int=1, sink: Optional[Sink]=None,
+    compresslevel: int=DEFAULT_LEVEL, compress_threads: int=1) ->bool:
+    return _write_schematic(shared, output_path, profiler, False, sink,
+        compresslevel, compress_threads)
+
+
+WRITERS: Dict[str, Callable[..., bool]] = {'bp': write_bp, 'schem':
+    write_schem, 'schematic': write_legacy_schematic}
+
+
+class ThreadRoutedOutput:
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text: str) ->int:
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    @contextmanager
+    def capture(self):
+        previous = getattr(self.local, 'buffer', None)
+        self.local.buffer = io.StringIO()
+        try:
+            yield self.local.buffer
+        finally:
+            self.local.buffer = previous
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def output_paths(input_path: str, formats: Iterable[str], output_dir:
+    Optional[str]=None) ->Dict[str, str]:
+    directory = output_dir or os.path.dirname(os.path.abspath(input_path))
+    stem = Path(input_path).stem
+    return {fmt: os.path.join(directory, stem + FORMAT_EXTENSIONS[fmt]) for
+        fmt in formats}
+
+
+def _run_writer(fmt: str, shared: SharedDecode, output_path: str,
+    profiler: ConversionProfiler, workers: int, sink: Optional[Sink]=None,
+    compresslevel: int=DEFAULT_LEVEL, compress_threads: int=1) ->bool:
+    try:
+        return bool(WRITERS[fmt](shared, output_path, profiler, workers,
+            sink, compresslevel, compress_threads))
+    except ConversionCancelled:
+        raise
+    except Exception as e:
+        print(f'❌ {fmt} writer failed: {e}')
+        return False
+
+
+def convert_to_formats(input_path: str, formats: Iterable[str]=
+    DEFAULT_FORMATS, output_dir: Optional[str]=None, region_name: Optional
+    [str]=None, concurrent: bool=True, workers: int=1, profiler: Optional[
+    ConversionProfiler]=None, fileobj: Optional[BinaryIO]=None, sink:
+    Optional[Sink]=None, compresslevel: int=DEFAULT_LEVEL, compress_threads:
+    int=1) ->Dict[str, Any]:
+    formats = list(dict.fromkeys(formats))
+    unknown = [fmt for fmt in formats if fmt not in WRITERS]
+    if unknown:
+        raise ValueError(
+            f"Unknown format(s) {', '.join(unknown)}, expected {', '.join(WRITERS)}"
+            )
+    profiler = profiler or ConversionProfiler()
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    paths = output_paths(input_path, formats, output_dir)
+    print(f'Loading: {input_path}')
+    try:
+        shared = load_shared(input_path, region_name, profiler, fileobj)
+    except ConversionCancelled:
+        raise
+    except Exception as e:
+        print(f'❌ Error loading {input_path}: {e}')
+        return {fmt: False for fmt in formats}
+    print(
+        f"Decoded region '{shared.region_name}' once ({shared.decoded.size:,} voxels), writing {', '.join(formats)}"
+        )
+    writer_profilers = {fmt: ConversionProfiler(label=f'{input_path} [{fmt}]',
+        token=profiler.token, progress=profiler.progress) for fmt in formats}
+    results = {}
+    if concurrent and len(formats) > 1:
+        routed = ThreadRoutedOutput(sys.stdout)
+
+        def run(fmt):
+            with routed.capture() as log:
+                success = _run_writer(fmt, shared, paths[fmt],
+                    writer_profilers[fmt], workers, sink, compresslevel,
+                    compress_threads)
+            return success, log.getvalue()
+        sys.stdout = routed
+        try:
+            with profiler.stage('write_outputs'):
+                with ThreadPoolExecutor(max_workers=len(formats)) as pool:
+                    logs = dict(zip(formats, pool.map(run, formats)))
+        finally:
+            sys.stdout = routed.stream
+        for fmt in formats:
+            results[fmt], log = logs[fmt]
+            print(f'\n--- {fmt}: {paths[fmt]} ---')
+            print(log, end='')
+    else:
+        with profiler.stage('write_outputs'):
+            for fmt in formats:
+                print(f'\n--- {fmt}: {paths[fmt]} ---')
+                results[fmt] = _run_writer(fmt, shared, paths[fmt],
+                    writer_profilers[fmt], workers, sink, compresslevel,
+                    compress_threads)
+    for fmt, writer_profiler in writer_profilers.items():
+        profiler.merge(writer_profiler, prefix=f'{fmt}.')
+    return {fmt: (paths[fmt] if success else False) for fmt, success in
+        results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=
+        'Decode each .litematic once and write several output formats from it'
+        )
+    parser.add_argument('inputs', nargs='+', help='Input .litematic files')
+    parser.add_argument('-o', '--output-dir', help=
+        'Directory for the outputs (default: next to each input)')
+    parser.add_argument('--formats', nargs='+', choices=sorted(WRITERS),
+        default=list(DEFAULT_FORMATS), help=
+        'Formats to write (default: bp schem)')
+    parser.add_argument('--region', help=
+        'Region to convert (default: the first one)')
+    parser.add_argument('--sequential', action='store_true', help=
+        'Run the writers one after another instead of concurrently')
+    parser.add_argument('--workers', type=int, default=0, help=
+        'Processes used to pack .bp sections (default: all cores)')
+    parser.add_argument('--compression-level', type=int, choices=range(1,
+        10), default=DEFAULT_LEVEL, metavar='1-9', help=
+        'gzip level: 1 is fastest, 9 is smallest (default: 9)')
+    parser.add_argument('--compress-threads', type=int, default=1, help=
+        'Threads compressing each output (default: 1, 0 = all cores)')
+    parser.add_argument('--profile', nargs='?', const='', default=None,
+        metavar='REPORT', help=
+        'Write a JSON timing report per input (default: <input>.multi.profile.json)'
+        )
+    args = parser.parse_args()
+    require_modules(('nbtlib', 'numpy') + (('PIL',) if 'bp' in args.
+        formats else ()))
+    from litematic_to_bp_converter import resolve_workers
+    failed = 0
+    started = time.perf_counter()
+    for input_path in args.inputs:
+        profiler = ConversionProfiler(label=input_path).start()
+        results = convert_to_formats(input_path, args.formats, args.
+            output_dir, args.region, not args.sequential, resolve_workers(
+            args.workers), profiler, compresslevel=args.compression_level,
+            compress_threads=args.compress_threads)
+        profiler.stop()
+        for fmt, output in results.items():
+            if output:
+                print(f'✅ {fmt}: {output}')
+            else:
+                failed += 1
+                print(f'❌ {fmt}: conversion failed')
+        if args.profile is not None:
+            report_path = (args.profile if args.profile and len(args.
+                inputs) == 1 else f'{os.path.splitext(input_path)[0]}.multi.profile.json'
+                )
+            profiler.save(report_path)
+            profiler.print_summary()
+            print(f'📊 Profile report: {report_path}')
+    print(
+        f'🎯 {len(args.inputs)} file(s), {failed} failed output(s) in {time.perf_counter() - started:.2f}s'
+        )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
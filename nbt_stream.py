@@ -0,0 +1,113 @@
+import struct
+from typing import BinaryIO, Container, Dict, Iterator, Optional, Tuple
+import nbtlib
+TAG_END = 0
+TAG_LIST = 9
+TAG_COMPOUND = 10
+FIXED_SIZES = {1: 1, 2: 2, 3: 4, 4: 8, 5: 4, 6: 8}
+ARRAY_ITEM_SIZES = {7: 1, 11: 4, 12: 8}
+SKIP_CHUNK = 1 << 16
+
+
+class NBTStreamError(ValueError):
+    pass
+
+
+def read_exact(fileobj: BinaryIO, size: int) ->bytes:
+    data = fileobj.read(size)
+    if len(data) != size:
+        raise NBTStreamError(
+            f'Unexpected end of NBT data (wanted {size} bytes, got {len(data)})'
+            )
+    return data
+
+
+def skip_bytes(fileobj: BinaryIO, size: int):
+    while size > 0:
+        skipped = len(fileobj.read(min(size, SKIP_CHUNK)))
+        if not skipped:
+            raise NBTStreamError('Unexpected end of NBT data while skipping')
+        size -= skipped
+
+
+def read_tag_header(fileobj: BinaryIO) ->Tuple[int, Optional[str]]:
+    tag_id = read_exact(fileobj, 1)[0]
+    if tag_id == TAG_END:
+        return tag_id, None
+    name_length, = struct.unpack('>H', read_exact(fileobj, 2))
+    return tag_id, read_exact(fileobj, name_length).decode('utf-8')
+
+
+def read_payload(fileobj: BinaryIO, tag_id: int) ->nbtlib.tag.Base:
+    tag_class = nbtlib.tag.Base.all_tags.get(tag_id)
+    if tag_class is None:
+        raise NBTStreamError(f'Unknown NBT tag id {tag_id}')
+    return tag_class.parse(fileobj, 'big')
+
+
+def skip_payload(fileobj: BinaryIO, tag_id: int):
+    if tag_id in FIXED_SIZES:
+        skip_bytes(fileobj, FIXED_SIZES[tag_id])
+    elif tag_id in ARRAY_ITEM_SIZES:
+        length, = struct.unpack('>i', read_exact(fileobj, 4))
+        skip_bytes(fileobj, length * ARRAY_ITEM_SIZES[tag_id])
+    elif tag_id == 8:
+        length, = struct.unpack('>H', read_exact(fileobj, 2))
+        skip_bytes(fileobj, length)
+    elif tag_id == TAG_LIST:
+        item_id = read_exact(fileobj, 1)[0]
+        count, = struct.unpack('>i', read_exact(fileobj, 4))
+        if item_id in FIXED_SIZES:
+            skip_bytes(fileobj, count * FIXED_SIZES[item_id])
+        else:
+            for _ in range(count):
+                skip_payload(fileobj, item_id)
+    elif tag_id == TAG_COMPOUND:
+        for child_id, _ in iter_compound(fileobj):
+            skip_payload(fileobj, child_id)
+    else:
+        raise NBTStreamError(f'Unknown NBT tag id {tag_id}')
+
+
+def iter_compound(fileobj: BinaryIO) ->Iterator[Tuple[int, str]]:
+    while True:
+        tag_id, name = read_tag_header(fileobj)
+        if tag_id == TAG_END:
+            return
+        yield tag_id, name
+
+
+def read_compound(fileobj: BinaryIO, skip: Container[str]=()
+    ) ->nbtlib.Compound:
+    compound = nbtlib.Compound()
+    for tag_id, name in iter_compound(fileobj):
+        if name in skip:
+            skip_payload(fileobj, tag_id)
+        else:
+            compound[name] = read_payload(fileobj, tag_id)
+    return compound
+
+
+def open_root(fileobj: BinaryIO) ->str:
+    tag_id, name = read_tag_header(fileobj)
+    if tag_id != TAG_COMPOUND:
+        raise NBTStreamError(f'Root tag is {tag_id}, expected a compound')
+    return name
+
+
+def read_root_fields(fileobj: BinaryIO, wanted: Container[str], stop_after:
+    Optional[str]=None, skip_nested: Optional[Dict[str, Container[str]]]=None
+    ) ->Dict[str, nbtlib.tag.Base]:
+    open_root(fileobj)
+    fields = {}
+    skip_nested = skip_nested or {}
+    for tag_id, name in iter_compound(fileobj):
+        if name not in wanted:
+            skip_payload(fileobj, tag_id)
+        elif tag_id == TAG_COMPOUND:
+            fields[name] = read_compound(fileobj, skip_nested.get(name, ()))
+        else:
+            fields[name] = read_payload(fileobj, tag_id)
+        if name == stop_after:
+            break
+    return fields
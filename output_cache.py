@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from parallel_gzip import DEFAULT_LEVEL
+DEFAULT_CACHE_DIR = os.environ.get('LITEMATIC_CACHE') or os.path.join(os.
+    path.expanduser('~'), '.litematic_converter', 'cache')
+DEFAULT_MAX_BYTES = 1 << 30
+CACHE_FORMAT = 1
+EXTENSIONS = {'bp': '.bp', 'schem': '.schem', 'schematic': '.schematic'}
+CONVERTER_MODULES = ('litematic_to_bp_converter.py',
+    'litematic_to_schem_advanced.py', 'litematic_volume.py',
+    'litematic_reader.py', 'block_entity_index.py', 'nbt_stream.py',
+    'parallel_gzip.py', 'multi_format_converter.py', 'litematic_api.py')
+_converter_version: Optional[str] = None
+
+
+def content_hash(data: bytes) ->str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def converter_version() ->str:
+    global _converter_version
+    if _converter_version is None:
+        digest = hashlib.blake2b(str(CACHE_FORMAT).encode(), digest_size=16)
+        root = os.path.dirname(os.path.abspath(__file__))
+        for name in CONVERTER_MODULES:
+            try:
+                with open(os.path.join(root, name), 'rb') as f:
+                    digest.update(f.read())
+            except OSError:
+                digest.update(b'missing:' + name.encode())
+        _converter_version = digest.hexdigest()
+    return _converter_version
+
+
+def output_options(fmt: str, name: str, region: Optional[str]=None, crop:
+    bool=False, compression_level: int=DEFAULT_LEVEL) ->Dict[str, Any]:
+    options = {'region': region, 'compression_level': compression_level}
+    if fmt == 'bp':
+        options['name'] = name
+    else:
+        options['crop'] = crop
+    return options
+
+
+def write_atomic(path: str, data: bytes):
+    directory, name = os.path.split(os.path.abspath(path))
+    tmp_path = os.path.join(directory,
+        f'.tmp-{os.getpid()}-{threading.get_ident()}-{name}')
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class OutputCache:
+
+    def __init__(self, directory: str=DEFAULT_CACHE_DIR, max_bytes: int=
+        DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith('.'):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._size += size
+        with self._lock:
+            self._evict()
+
+    def key(self, input_hash: str, fmt: str, options: Dict[str, Any]) ->str:
+        text = json.dumps({'input': input_hash, 'format': fmt, 'version':
+            converter_version(), 'options': options}, sort_keys=True)
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=20
+            ).hexdigest() + EXTENSIONS.get(fmt, '')
+
+    def get(self, key: str) ->Optional[bytes]:
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+                if key in self._entries:
+                    self._size -= self._entries.pop(key)
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(data)
+            if key not in self._entries:
+                self._size += len(data)
+            self._entries[key] = len(data)
+            self._entries.move_to_end(key)
+        return data
+
+    def put(self, key: str, data: bytes) ->bool:
+        if len(data) > self.max_bytes:
+            return False
+        try:
+            write_atomic(os.path.join(self.directory, key), data)
+        except OSError:
+            return False
+        with self._lock:
+            self._size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self.stores += 1
+            self._evict()
+        return True
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def stats(self) ->Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'directory': self.directory, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': round(self.hits /
+                lookups, 4) if lookups else 0.0, 'bytes_saved': self.
+                bytes_saved, 'stores': self.stores, 'evictions': self.
+                evictions, 'entries': len(self._entries), 'size_bytes':
+                self._size, 'max_bytes': self.max_bytes}
+
@@ -0,0 +1,116 @@
+import gzip
+import io
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+DEFAULT_LEVEL = 9
+DEFAULT_BLOCK_SIZE = 1 << 20
+DICTIONARY_SIZE = 1 << 15
+
+
+def resolve_threads(threads: int) ->int:
+    return threads if threads > 0 else os.cpu_count() or 1
+
+
+def gzip_header(level: int, mtime: Optional[float]=None) ->bytes:
+    if mtime is None:
+        mtime = time.time()
+    extra_flags = 2 if level == 9 else 4 if level == 1 else 0
+    return b'\x1f\x8b\x08\x00' + struct.pack('<I', int(mtime) & 4294967295
+        ) + bytes((extra_flags, 255))
+
+
+def deflate_block(data: bytes, level: int, dictionary: Optional[bytes],
+    last: bool) ->bytes:
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS,
+            zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if
+        last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter:
+
+    def __init__(self, fileobj: BinaryIO, compresslevel: int=DEFAULT_LEVEL,
+        threads: int=0, block_size: int=DEFAULT_BLOCK_SIZE, mtime: Optional
+        [float]=None):
+        self.fileobj = fileobj
+        self.compresslevel = compresslevel
+        self.threads = resolve_threads(threads)
+        self.block_size = block_size
+        self.crc = 0
+        self.size = 0
+        self.closed = False
+        self._buffer = bytearray()
+        self._dictionary = b''
+        self._pending = deque()
+        self._pool = ThreadPoolExecutor(max_workers=self.threads)
+        self.fileobj.write(gzip_header(compresslevel, mtime))
+
+    def _submit(self, block: bytes, last: bool):
+        self._pending.append(self._pool.submit(deflate_block, block, self.
+            compresslevel, self._dictionary, last))
+        self._dictionary = block[-DICTIONARY_SIZE:]
+        while len(self._pending) > 2 * self.threads:
+            self.fileobj.write(self._pending.popleft().result())
+
+    def write(self, data) ->int:
+        if self.closed:
+            raise ValueError('write to closed ParallelGzipWriter')
+        data = memoryview(data).cast('B')
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block, False)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._submit(bytes(self._buffer), True)
+            self._buffer = bytearray()
+            while self._pending:
+                self.fileobj.write(self._pending.popleft().result())
+            self.fileobj.write(struct.pack('<II', self.crc, self.size &
+                4294967295))
+        finally:
+            self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_gzip_writer(fileobj: BinaryIO, compresslevel: int=DEFAULT_LEVEL,
+    threads: int=1, mtime: Optional[float]=None):
+    if threads == 1:
+        return gzip.GzipFile(filename='', mode='wb', fileobj=fileobj,
+            compresslevel=compresslevel, mtime=mtime)
+    return ParallelGzipWriter(fileobj, compresslevel, threads, mtime=mtime)
+
+
+def gzip_compress(data: bytes, compresslevel: int=DEFAULT_LEVEL, threads:
+    int=1, mtime: Optional[float]=None) ->bytes:
+    if threads == 1 or len(data) <= DEFAULT_BLOCK_SIZE:
+        return gzip.compress(data, compresslevel, mtime=mtime)
+    buffer = io.BytesIO()
+    with ParallelGzipWriter(buffer, compresslevel, threads, mtime=mtime
+        ) as gz:
+        gz.write(data)
+    return buffer.getvalue()
@@ -0,0 +1,359 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from bp_inspector import LazyBlueprint
+from litematic_metadata import iter_litematic_files, read_litematic_metadata
+from litematic_metadata import read_litematic_palette
+DEFAULT_CATALOG_PATH = os.environ.get('LITEMATIC_CATALOG') or os.path.join(os
+    .path.expanduser('~'), '.litematic_converter', 'catalog.sqlite')
+HASH_CHUNK = 1 << 20
+CATALOG_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    name TEXT,
+    author TEXT,
+    description TEXT,
+    size_x INTEGER,
+    size_y INTEGER,
+    size_z INTEGER,
+    total_blocks INTEGER,
+    total_volume INTEGER,
+    region_count INTEGER,
+    palette_size INTEGER,
+    content_hash TEXT,
+    error TEXT,
+    indexed_at REAL NOT NULL,
+    conversion_status TEXT,
+    converted_path TEXT,
+    converted_at REAL
+);
+CREATE TABLE IF NOT EXISTS palette (
+    path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    block TEXT NOT NULL,
+    states INTEGER NOT NULL,
+    PRIMARY KEY (path, block)
+);
+CREATE INDEX IF NOT EXISTS files_author ON files(author);
+CREATE INDEX IF NOT EXISTS files_blocks ON files(total_blocks);
+CREATE INDEX IF NOT EXISTS files_hash ON files(content_hash);
+CREATE INDEX IF NOT EXISTS palette_block ON palette(block);
+"""
+FILE_COLUMNS = ('path', 'kind', 'size', 'mtime', 'name', 'author',
+    'description', 'size_x', 'size_y', 'size_z', 'total_blocks',
+    'total_volume', 'region_count', 'palette_size', 'content_hash', 'error',
+    'indexed_at')
+SORT_COLUMNS = {'path', 'name', 'author', 'total_blocks', 'size', 'mtime',
+    'indexed_at'}
+
+
+def content_hash(path: str) ->str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda : f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_litematic(path: str, read_palette: bool=True) ->Dict[str, Any]:
+    info = read_litematic_metadata(path)
+    size = info['enclosing_size'] or [None, None, None]
+    record = {'kind': 'litematic', 'name': info['name'], 'author': info[
+        'author'], 'description': info['description'], 'size_x': size[0],
+        'size_y': size[1], 'size_z': size[2], 'total_blocks': info[
+        'total_blocks'], 'total_volume': info['total_volume'],
+        'region_count': info['region_count'], 'palette': None}
+    if read_palette:
+        record['palette'] = read_litematic_palette(path)
+        record['palette_size'] = sum(record['palette'].values())
+    return record
+
+
+def index_blueprint(path: str, read_palette: bool=True) ->Dict[str, Any]:
+    blueprint = LazyBlueprint(path)
+    info = blueprint.info()
+    record = {'kind': 'bp', 'name': info['name'], 'author': info['author'],
+        'total_blocks': info['block_count'], 'palette': None}
+    if read_palette:
+        record['palette'] = blueprint.palette()
+        record['palette_size'] = sum(record['palette'].values())
+    return record
+
+
+INDEXERS: Dict[str, Callable[..., Dict[str, Any]]] = {'.litematic':
+    index_litematic, '.bp': index_blueprint}
+
+
+class SchematicCatalog:
+
+    def __init__(self, db_path: str=DEFAULT_CATALOG_PATH):
+        self.db_path = db_path
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)),
+                exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.executescript(SCHEMA)
+        if self.connection.execute('PRAGMA user_version').fetchone()[0
+            ] < CATALOG_VERSION:
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE files SET mtime = -1 WHERE kind = 'litematic'")
+                self.connection.execute(
+                    f'PRAGMA user_version = {CATALOG_VERSION}')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def refresh(self, paths: Iterable[str], recursive: bool=True, prune:
+        bool=True, read_palette: bool=True, hash_content: bool=True,
+        progress: Optional[Callable[[str], None]]=None) ->Dict[str, int]:
+        stats = {'scanned': 0, 'added': 0, 'updated': 0, 'unchanged': 0,
+            'removed': 0, 'failed': 0}
+        known = {row['path']: (row['size'], row['mtime']) for row in self.
+            connection.execute('SELECT path, size, mtime FROM files')}
+        seen = set()
+        paths = [os.path.abspath(path) for path in paths]
+        with self.connection:
+            for path in iter_litematic_files(paths, recursive, INDEXERS):
+                stats['scanned'] += 1
+                seen.add(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if known.get(path) == (stat.st_size, stat.st_mtime):
+                    stats['unchanged'] += 1
+                    continue
+                if progress is not None:
+                    progress(path)
+                failed = not self.index_file(path, stat, read_palette,
+                    hash_content)
+                stats['failed'] += failed
+                stats['updated' if path in known else 'added'] += 1
+            if prune:
+                roots = [os.path.join(path, '') for path in paths if os.path
+                    .isdir(path)]
+                missing = [path for path in known if path not in seen and (
+                    path in paths or any(path.startswith(root) for root in
+                    roots))]
+                for path in missing:
+                    self.connection.execute('DELETE FROM files WHERE path = ?',
+                        (path,))
+                stats['removed'] = len(missing)
+        return stats
+
+    def index_file(self, path: str, stat: Optional[os.stat_result]=None,
+        read_palette: bool=True, hash_content: bool=True) ->bool:
+        stat = stat or os.stat(path)
+        extension = os.path.splitext(path)[1].lower()
+        record = {column: None for column in FILE_COLUMNS}
+        record.update({'path': path, 'kind': extension.lstrip('.'), 'size':
+            stat.st_size, 'mtime': stat.st_mtime, 'indexed_at': time.time()})
+        palette = None
+        try:
+            indexed = INDEXERS[extension](path, read_palette=read_palette)
+            palette = indexed.pop('palette', None)
+            record.update(indexed)
+            if hash_content:
+                record['content_hash'] = content_hash(path)
+        except Exception as e:
+            record['error'] = f'{type(e).__name__}: {e}'
+        placeholders = ', '.join('?' for _ in FILE_COLUMNS)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in
+            FILE_COLUMNS[1:])
+        self.connection.execute(
+            f"""INSERT INTO files ({', '.join(FILE_COLUMNS)}) VALUES ({placeholders})
+            ON CONFLICT(path) DO UPDATE SET {updates},
+            conversion_status = CASE WHEN files.content_hash IS excluded.content_hash
+                THEN files.conversion_status END,
+            converted_path = CASE WHEN files.content_hash IS excluded.content_hash
+                THEN files.converted_path END,
+            converted_at = CASE WHEN files.content_hash IS excluded.content_hash
+                THEN files.converted_at END"""
+            , [record[column] for column in FILE_COLUMNS])
+        if palette is not None:
+            self.connection.execute('DELETE FROM palette WHERE path = ?', (
+                path,))
+            self.connection.executemany(
+                'INSERT INTO palette (path, block, states) VALUES (?, ?, ?)',
+                [(path, block, states) for block, states in palette.items()])
+        return record['error'] is None
+
+    def mark_conversion(self, path: str, status: str, converted_path:
+        Optional[str]=None):
+        with self.connection:
+            self.connection.execute(
+                'UPDATE files SET conversion_status = ?, converted_path = ?, converted_at = ? WHERE path = ?'
+                , (status, converted_path, time.time(), os.path.abspath(path)))
+
+    def query(self, author: Optional[str]=None, name: Optional[str]=None,
+        min_blocks: Optional[int]=None, max_blocks: Optional[int]=None,
+        block: Optional[str]=None, kind: Optional[str]=None, status:
+        Optional[str]=None, under: Optional[str]=None, order_by: str='path',
+        limit: Optional[int]=None) ->List[Dict[str, Any]]:
+        if order_by.lstrip('-') not in SORT_COLUMNS:
+            raise ValueError(f'Cannot sort by {order_by!r}')
+        clauses = []
+        params: List[Any] = []
+        if author is not None:
+            clauses.append('author = ? COLLATE NOCASE')
+            params.append(author)
+        if name is not None:
+            clauses.append('name LIKE ?')
+            params.append(f'%{name}%')
+        if min_blocks is not None:
+            clauses.append('total_blocks >= ?')
+            params.append(min_blocks)
+        if max_blocks is not None:
+            clauses.append('total_blocks <= ?')
+            params.append(max_blocks)
+        if block is not None:
+            clauses.append(
+                'path IN (SELECT path FROM palette WHERE block = ?)')
+            params.append(block if ':' in block else f'minecraft:{block}')
+        if kind is not None:
+            clauses.append('kind = ?')
+            params.append(kind)
+        if status is not None:
+            clauses.append('IFNULL(conversion_status, ?) = ?')
+            params += ['pending', status]
+        if under is not None:
+            clauses.append('path LIKE ?')
+            params.append(os.path.join(os.path.abspath(under), '') + '%')
+        sql = 'SELECT * FROM files'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        direction = 'DESC' if order_by.startswith('-') else 'ASC'
+        sql += f" ORDER BY {order_by.lstrip('-')} {direction}"
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def palette(self, path: str) ->Dict[str, int]:
+        return {row['block']: row['states'] for row in self.connection.
+            execute('SELECT block, states FROM palette WHERE path = ?', (os
+            .path.abspath(path),))}
+
+    def duplicates(self) ->List[List[str]]:
+        groups = {}
+        for row in self.connection.execute(
+            'SELECT content_hash, path FROM files WHERE content_hash IN (SELECT content_hash FROM files WHERE content_hash IS NOT NULL GROUP BY content_hash HAVING COUNT(*) > 1) ORDER BY path'
+            ):
+            groups.setdefault(row['content_hash'], []).append(row['path'])
+        return list(groups.values())
+
+    def stats(self) ->Dict[str, Any]:
+        row = self.connection.execute(
+            'SELECT COUNT(*) AS files, SUM(size) AS bytes, SUM(total_blocks) AS blocks, SUM(error IS NOT NULL) AS errors FROM files'
+            ).fetchone()
+        stats = {key: row[key] or 0 for key in row.keys()}
+        stats['by_status'] = {(r['status'] or 'pending'): r['count'] for r in
+            self.connection.execute(
+            'SELECT conversion_status AS status, COUNT(*) AS count FROM files GROUP BY conversion_status'
+            )}
+        return stats
+
+
+def print_rows(rows: List[Dict[str, Any]]):
+    for row in rows:
+        size = 'x'.join('?' if row[f'size_{axis}'] is None else str(row[
+            f'size_{axis}']) for axis in 'xyz')
+        blocks = row['total_blocks']
+        status = row['conversion_status'] or 'pending'
+        print(
+            f"{row['path']}  {row['name']!r} by {row['author'] or 'Unknown'}  {size}  {f'{blocks:,}' if blocks is not None else '?'} blocks  [{status}]"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=
+        'Index a schematic library into a SQLite catalog and query it')
+    parser.add_argument('--db', default=DEFAULT_CATALOG_PATH, help=
+        f'Catalog database (default: {DEFAULT_CATALOG_PATH})')
+    commands = parser.add_subparsers(dest='command', required=True)
+    refresh = commands.add_parser('refresh', help=
+        'Index new and changed files')
+    refresh.add_argument('paths', nargs='+', help='Files or directories')
+    refresh.add_argument('--no-recursive', action='store_true')
+    refresh.add_argument('--no-prune', action='store_true', help=
+        'Keep entries for files that no longer exist')
+    refresh.add_argument('--no-palette', action='store_true', help=
+        'Skip reading region palettes')
+    refresh.add_argument('--no-hash', action='store_true', help=
+        'Skip hashing file contents')
+    query = commands.add_parser('query', help='List matching files')
+    query.add_argument('--author')
+    query.add_argument('--name', help='Substring of the schematic name')
+    query.add_argument('--min-blocks', type=int)
+    query.add_argument('--max-blocks', type=int)
+    query.add_argument('--block', help='Only files whose palette has this block'
+        )
+    query.add_argument('--kind', help='File kind: litematic or bp')
+    query.add_argument('--status', help=
+        'Conversion status: pending, converted or failed')
+    query.add_argument('--under', help='Only files below this directory')
+    query.add_argument('--sort', default='path', choices=sorted(
+        SORT_COLUMNS), help='Sort column')
+    query.add_argument('--desc', action='store_true', help=
+        'Sort in descending order')
+    query.add_argument('--limit', type=int)
+    query.add_argument('--json', action='store_true', help=
+        'Print one JSON object per line')
+    query.add_argument('--paths-only', action='store_true', help=
+        'Print only file paths, e.g. for batch scripts')
+    commands.add_parser('duplicates', help=
+        'List files with identical content')
+    commands.add_parser('stats', help='Summarise the catalog')
+    args = parser.parse_args()
+    with SchematicCatalog(args.db) as catalog:
+        if args.command == 'refresh':
+            started = time.perf_counter()
+            stats = catalog.refresh(args.paths, recursive=not args.
+                no_recursive, prune=not args.no_prune, read_palette=not args
+                .no_palette, hash_content=not args.no_hash)
+            elapsed = time.perf_counter() - started
+            print(
+                f"📚 {stats['scanned']} scanned: {stats['added']} added, {stats['updated']} updated, {stats['unchanged']} unchanged, {stats['removed']} removed, {stats['failed']} failed ({elapsed:.2f}s)"
+                )
+            return 1 if stats['failed'] else 0
+        if args.command == 'query':
+            rows = catalog.query(author=args.author, name=args.name,
+                min_blocks=args.min_blocks, max_blocks=args.max_blocks,
+                block=args.block, kind=args.kind, status=args.status, under
+                =args.under, order_by=f"{'-' if args.desc else ''}{args.sort}", limit
+                =args.limit)
+            if args.paths_only:
+                for row in rows:
+                    print(row['path'])
+            elif args.json:
+                for row in rows:
+                    print(json.dumps(row))
+            else:
+                print_rows(rows)
+        elif args.command == 'duplicates':
+            for group in catalog.duplicates():
+                print('\n'.join(group) + '\n')
+        else:
+            print(json.dumps(catalog.stats(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
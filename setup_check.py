@@ -4,8 +4,18 @@ Setup Verification Script for Litematic Converter
 Run this script to verify that all dependencies are installed correctly.
 """
 
+import os
+import subprocess
 import sys
 import importlib
+import time
+
+# Extra startup time, on top of a bare interpreter, that `--help` on a
+# converter script may cost. Heavy libraries must load lazily.
+STARTUP_BUDGET_MS = 150
+STARTUP_RUNS = 5
+HEAVY_MODULES = ("litemapy", "nbtlib", "numpy", "PIL")
+CLI_SCRIPTS = ("litematic_to_bp_converter.py", "litematic_to_schem_advanced.py")
 
 def check_python_version():
     """Check if Python version is compatible."""
@@ -35,6 +45,45 @@ def check_dependency(name, import_name=None):
         print(f"❌ {name}: Not installed")
         return False
 
+def best_run_ms(args, runs=STARTUP_RUNS):
+    """Return the fastest wall time of running args, in milliseconds."""
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def heavy_imports(script):
+    """List the heavy modules imported by `script --help`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", script, "--help"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    imported = {line.rsplit("|", 1)[-1].strip() for line in result.stderr.splitlines()}
+    return [name for name in HEAVY_MODULES if name in imported]
+
+def check_startup_budget(budget_ms=STARTUP_BUDGET_MS):
+    """Check that the converter scripts start quickly and import heavy libraries lazily."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    baseline = best_run_ms([sys.executable, "-c", "pass"])
+    ok = True
+    for name in CLI_SCRIPTS:
+        script = os.path.join(here, name)
+        if not os.path.exists(script):
+            continue
+        overhead = best_run_ms([sys.executable, script, "--help"]) - baseline
+        heavy = heavy_imports(script)
+        if heavy:
+            print(f"❌ {name}: imports {', '.join(heavy)} at startup")
+            ok = False
+        elif overhead > budget_ms:
+            print(f"❌ {name}: {overhead:.0f} ms startup overhead (budget {budget_ms} ms)")
+            ok = False
+        else:
+            print(f"✅ {name}: {overhead:.0f} ms startup overhead (budget {budget_ms} ms)")
+    return ok
+
 def main():
     """Run all checks."""
     print("🔍 Checking Litematic Converter Setup...\n")
@@ -49,6 +98,7 @@ def main():
     dependencies = [
         ("litemapy", "litemapy"),
         ("nbtlib", "nbtlib"), 
+        ("numpy", "numpy"),
         ("Pillow", "PIL"),
         ("tkinter", "tkinter")
     ]
@@ -59,6 +109,11 @@ def main():
     
     print()
     
+    print("⏱️  Checking Startup Time:")
+    all_ok &= check_startup_budget()
+    
+    print()
+    
     if all_ok:
         print("🎉 All checks passed! You're ready to use the Litematic Converter.")
         print("\nTo start the GUI, run:")
@@ -0,0 +1,266 @@
+import argparse
+import time
+from typing import Dict, List, Optional, Tuple
+import nbtlib
+import numpy as np
+LITEMATIC_VERSION = 6
+LITEMATIC_SUBVERSION = 1
+MINECRAFT_DATA_VERSION = 4189
+SOLID_BLOCKS = ['minecraft:stone', 'minecraft:granite',
+    'minecraft:diorite', 'minecraft:andesite', 'minecraft:cobblestone',
+    'minecraft:oak_planks', 'minecraft:spruce_planks',
+    'minecraft:birch_planks', 'minecraft:stone_bricks', 'minecraft:bricks',
+    'minecraft:glass', 'minecraft:sandstone', 'minecraft:quartz_block',
+    'minecraft:deepslate', 'minecraft:blackstone', 'minecraft:end_stone']
+COLORS = ['white', 'orange', 'magenta', 'light_blue', 'yellow', 'lime',
+    'pink', 'gray', 'light_gray', 'cyan', 'purple', 'blue', 'brown',
+    'green', 'red', 'black']
+BANNER_STATE = 'minecraft:white_banner[rotation=0]'
+CHEST_STATE = 'minecraft:chest[facing=north,type=single,waterlogged=false]'
+PATTERNS = ['minecraft:cross', 'minecraft:border', 'minecraft:stripe_top',
+    'minecraft:gradient', 'minecraft:creeper', 'minecraft:flower']
+
+
+def iter_block_states():
+    for name in SOLID_BLOCKS:
+        yield name
+    for suffix in ('wool', 'concrete', 'terracotta', 'stained_glass'):
+        for color in COLORS:
+            yield f'minecraft:{color}_{suffix}'
+    for facing in ('east', 'north', 'south', 'west'):
+        for half in ('bottom', 'top'):
+            for shape in ('inner_left', 'inner_right', 'outer_left',
+                'outer_right', 'straight'):
+                for waterlogged in ('false', 'true'):
+                    yield (
+                        f'minecraft:oak_stairs[facing={facing},half={half},shape={shape},waterlogged={waterlogged}]'
+                        )
+    for instrument in ('banjo', 'basedrum', 'bass', 'bell', 'bit', 'chime',
+        'cow_bell', 'didgeridoo', 'flute', 'guitar', 'harp', 'hat',
+        'iron_xylophone', 'pling', 'snare', 'xylophone'):
+        for note in range(25):
+            for powered in ('false', 'true'):
+                yield (
+                    f'minecraft:note_block[instrument={instrument},note={note},powered={powered}]'
+                    )
+    sides = ('none', 'side', 'up')
+    for power in range(16):
+        for east in sides:
+            for north in sides:
+                for south in sides:
+                    for west in sides:
+                        yield (
+                            f'minecraft:redstone_wire[east={east},north={north},power={power},south={south},west={west}]'
+                            )
+    heights = ('low', 'none', 'tall')
+    for wall in ('cobblestone_wall', 'stone_brick_wall', 'brick_wall',
+        'andesite_wall', 'granite_wall', 'diorite_wall'):
+        for east in heights:
+            for north in heights:
+                for south in heights:
+                    for up in ('false', 'true'):
+                        for waterlogged in ('false', 'true'):
+                            for west in heights:
+                                yield (
+                                    f'minecraft:{wall}[east={east},north={north},south={south},up={up},waterlogged={waterlogged},west={west}]'
+                                    )
+
+
+def make_palette(palette_size: int, with_tile_entities: bool=False) ->List[
+    str]:
+    states = ['minecraft:air']
+    for state in iter_block_states():
+        if len(states) > palette_size:
+            break
+        states.append(state)
+    if len(states) <= palette_size:
+        raise ValueError(
+            f'palette_size {palette_size} exceeds the {len(states) - 1} generated states'
+            )
+    if with_tile_entities:
+        states += [BANNER_STATE, CHEST_STATE]
+    return states
+
+
+def palette_entry(block_state: str) ->nbtlib.Compound:
+    if '[' not in block_state:
+        return nbtlib.Compound({'Name': nbtlib.String(block_state)})
+    name, props = block_state[:-1].split('[', 1)
+    properties = nbtlib.Compound()
+    for prop in props.split(','):
+        key, value = prop.split('=', 1)
+        properties[key] = nbtlib.String(value)
+    return nbtlib.Compound({'Name': nbtlib.String(name), 'Properties':
+        properties})
+
+
+def bits_for_palette(palette_length: int) ->int:
+    return max((palette_length - 1).bit_length(), 2)
+
+
+def pack_litematica_states(indices: np.ndarray, nbits: int, chunk_size: int
+    =1 << 20) ->np.ndarray:
+    indices = np.ascontiguousarray(indices, dtype=np.uint64).ravel()
+    total_longs = (indices.size * nbits + 63) // 64
+    packed = np.zeros(total_longs, dtype='<u8')
+    shifts = np.arange(nbits, dtype=np.uint64)
+    chunk_size -= chunk_size % 64
+    for start in range(0, indices.size, chunk_size):
+        values = indices[start:start + chunk_size]
+        bits = (values[:, None] >> shifts & 1).astype(np.uint8)
+        packed_bytes = np.packbits(bits.ravel(), bitorder='little')
+        padding = -packed_bytes.size % 8
+        if padding:
+            packed_bytes = np.concatenate([packed_bytes, np.zeros(padding,
+                dtype=np.uint8)])
+        longs = packed_bytes.view('<u8')
+        offset = start * nbits // 64
+        packed[offset:offset + longs.size] = longs
+    return packed.view('<i8')
+
+
+def generate_indices(rng: np.random.Generator, shape: Tuple[int, int, int],
+    palette_size: int, fill: float, pattern: str) ->np.ndarray:
+    height, length, width = shape
+    indices = np.zeros(shape, dtype=np.uint16 if palette_size < 65535 else
+        np.uint32)
+    for y in range(height):
+        if pattern == 'layered':
+            layer = np.full((length, width), y % palette_size + 1, dtype=
+                indices.dtype)
+        elif pattern == 'solid':
+            layer = np.ones((length, width), dtype=indices.dtype)
+        else:
+            layer = rng.integers(1, palette_size + 1, size=(length, width),
+                dtype=indices.dtype)
+        if fill < 1.0:
+            layer[rng.random((length, width)) >= fill] = 0
+        indices[y] = layer
+    return indices
+
+
+def make_tile_entity(block_state: str, x: int, y: int, z: int, rng: np.
+    random.Generator) ->nbtlib.Compound:
+    position = {'x': nbtlib.Int(x), 'y': nbtlib.Int(y), 'z': nbtlib.Int(z)}
+    if block_state == BANNER_STATE:
+        patterns = [nbtlib.Compound({'color': nbtlib.String(COLORS[int(rng.
+            integers(len(COLORS)))]), 'pattern': nbtlib.String(PATTERNS[int
+            (rng.integers(len(PATTERNS)))])}) for _ in range(int(rng.
+            integers(1, 7)))]
+        return nbtlib.Compound({'id': nbtlib.String('minecraft:banner'), **
+            position, 'patterns': nbtlib.List[nbtlib.Compound](patterns)})
+    items = []
+    for slot in range(int(rng.integers(1, 28))):
+        shulker_items = nbtlib.List[nbtlib.Compound]([nbtlib.Compound({
+            'slot': nbtlib.Int(i), 'item': nbtlib.Compound({'id': nbtlib.
+            String('minecraft:diamond'), 'count': nbtlib.Int(64)})}) for i in
+            range(27)])
+        items.append(nbtlib.Compound({'Slot': nbtlib.Byte(slot), 'id':
+            nbtlib.String('minecraft:shulker_box'), 'count': nbtlib.Int(1),
+            'components': nbtlib.Compound({'minecraft:container':
+            shulker_items})}))
+    return nbtlib.Compound({'id': nbtlib.String('minecraft:chest'), **
+        position, 'Items': nbtlib.List[nbtlib.Compound](items)})
+
+
+def generate_region(size: Tuple[int, int, int], position: Tuple[int, int,
+    int], palette_size: int=16, fill: float=0.5, tile_entity_density: float
+    =0.0, pattern: str='random', seed: int=0) ->Tuple[nbtlib.Compound, int]:
+    width, height, length = size
+    rng = np.random.default_rng(seed)
+    palette = make_palette(palette_size, tile_entity_density > 0)
+    indices = generate_indices(rng, (height, length, width), palette_size,
+        fill, pattern)
+    tile_entities = []
+    if tile_entity_density > 0:
+        occupied = np.flatnonzero(indices)
+        count = min(occupied.size, int(round(occupied.size *
+            tile_entity_density)))
+        chosen = np.sort(rng.choice(occupied, size=count, replace=False))
+        banner_id = palette.index(BANNER_STATE)
+        chest_id = palette.index(CHEST_STATE)
+        flat = indices.reshape(-1)
+        for n, linear in enumerate(chosen.tolist()):
+            block_id = banner_id if n % 2 == 0 else chest_id
+            flat[linear] = block_id
+            y, rest = divmod(linear, width * length)
+            z, x = divmod(rest, width)
+            tile_entities.append(make_tile_entity(palette[block_id], x, y,
+                z, rng))
+    block_count = int(np.count_nonzero(indices))
+    block_states = pack_litematica_states(indices, bits_for_palette(len(
+        palette)))
+    region = nbtlib.Compound({'Position': nbtlib.Compound({'x': nbtlib.Int
+        (position[0]), 'y': nbtlib.Int(position[1]), 'z': nbtlib.Int(
+        position[2])}), 'Size': nbtlib.Compound({'x': nbtlib.Int(width),
+        'y': nbtlib.Int(height), 'z': nbtlib.Int(length)}),
+        'BlockStatePalette': nbtlib.List[nbtlib.Compound]([palette_entry(
+        state) for state in palette]), 'Entities': nbtlib.List[nbtlib.
+        Compound]([]), 'TileEntities': nbtlib.List[nbtlib.Compound](
+        tile_entities), 'PendingBlockTicks': nbtlib.List[nbtlib.Compound]([
+        ]), 'PendingFluidTicks': nbtlib.List[nbtlib.Compound]([]),
+        'BlockStates': nbtlib.LongArray(block_states)})
+    return region, block_count
+
+
+def generate_litematic(output_path: str, size: Tuple[int, int, int]=(32,
+    32, 32), palette_size: int=16, fill: float=0.5, tile_entity_density:
+    float=0.0, region_count: int=1, pattern: str='random', seed: int=0,
+    name: str='Synthetic', author: str='benchmark') ->Dict[str, int]:
+    width, height, length = size
+    regions = nbtlib.Compound()
+    total_blocks = 0
+    for i in range(region_count):
+        region, block_count = generate_region(size, (i * width, 0, 0),
+            palette_size=palette_size, fill=fill, tile_entity_density=
+            tile_entity_density, pattern=pattern, seed=seed + i)
+        regions[f'Region{i + 1}' if region_count > 1 else name] = region
+        total_blocks += block_count
+    now = int(time.time() * 1000)
+    metadata = nbtlib.Compound({'EnclosingSize': nbtlib.Compound({'x':
+        nbtlib.Int(width * region_count), 'y': nbtlib.Int(height), 'z':
+        nbtlib.Int(length)}), 'Author': nbtlib.String(author),
+        'Description': nbtlib.String(
+        f'palette={palette_size} fill={fill} tile_entities={tile_entity_density} pattern={pattern} seed={seed}'
+        ), 'Name': nbtlib.String(name), 'RegionCount': nbtlib.Int(
+        region_count), 'TimeCreated': nbtlib.Long(now), 'TimeModified':
+        nbtlib.Long(now), 'TotalBlocks': nbtlib.Int(total_blocks),
+        'TotalVolume': nbtlib.Int(width * height * length * region_count)})
+    root = nbtlib.File({'Version': nbtlib.Int(LITEMATIC_VERSION),
+        'SubVersion': nbtlib.Int(LITEMATIC_SUBVERSION),
+        'MinecraftDataVersion': nbtlib.Int(MINECRAFT_DATA_VERSION),
+        'Metadata': metadata, 'Regions': regions})
+    root.save(output_path, gzipped=True)
+    return {'total_blocks': total_blocks, 'total_volume': width * height *
+        length * region_count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=
+        'Generate synthetic .litematic files for benchmarking and testing')
+    parser.add_argument('output_file', help='Path to the output .litematic')
+    parser.add_argument('--size', type=int, nargs=3, default=[32, 32, 32],
+        metavar=('X', 'Y', 'Z'), help='Region size')
+    parser.add_argument('--palette', type=int, default=16, help=
+        'Number of non-air block states')
+    parser.add_argument('--fill', type=float, default=0.5, help=
+        'Fraction of voxels that are not air')
+    parser.add_argument('--tile-entities', type=float, default=0.0, help=
+        'Fraction of blocks replaced with banners/chests')
+    parser.add_argument('--regions', type=int, default=1, help=
+        'Number of regions')
+    parser.add_argument('--pattern', choices=['random', 'layered', 'solid'
+        ], default='random', help='Block layout')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    info = generate_litematic(args.output_file, tuple(args.size),
+        palette_size=args.palette, fill=args.fill, tile_entity_density=args
+        .tile_entities, region_count=args.regions, pattern=args.pattern,
+        seed=args.seed)
+    print(
+        f"Wrote {args.output_file}: {info['total_blocks']:,} blocks in {info['total_volume']:,} voxels"
+        )
+
+
+if __name__ == '__main__':
+    main()
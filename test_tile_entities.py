@@ -0,0 +1,40 @@
+import nbtlib
+from litematic_to_schem_advanced import AdvancedLitematicConverter
+
+
+def spawner_compound():
+    return nbtlib.Compound({'id': nbtlib.String('minecraft:spawner'), 'x':
+        nbtlib.Int(1), 'y': nbtlib.Int(2), 'z': nbtlib.Int(3), 'Delay':
+        nbtlib.Short(20), 'SpawnCount': nbtlib.Short(4), 'Powered': nbtlib.
+        Byte(1), 'LastSeen': nbtlib.Long(2 ** 40 + 7), 'Speed': nbtlib.
+        Double(0.1234567890123), 'Scale': nbtlib.Float(1.5), 'MaxNearby':
+        nbtlib.Int(6), 'CustomName': nbtlib.String('Cage'), 'Seeds': nbtlib
+        .LongArray([2 ** 40, -1]), 'Flags': nbtlib.ByteArray([1, 0, 1]),
+        'Ids': nbtlib.IntArray([5, 6]), 'Offsets': nbtlib.List[nbtlib.Short
+        ]([1, 2]), 'SpawnData': nbtlib.Compound({'entity': nbtlib.Compound(
+        {'id': nbtlib.String('minecraft:zombie')})})})
+
+
+def test_tile_entity_tags_keep_their_types():
+    source = spawner_compound()
+    converted = AdvancedLitematicConverter().convert_tile_entity(source)
+    assert converted is not None
+    data = converted['Data']
+    for key, value in source.items():
+        if key in ('id', 'x', 'y', 'z'):
+            continue
+        assert type(data[key]) is type(value), key
+        assert data[key] == value, key
+    assert converted['Pos'] == nbtlib.IntArray([1, 2, 3])
+    assert converted['Id'] == 'minecraft:spawner'
+
+
+def test_tile_entity_raw_values_are_wrapped():
+    converted = AdvancedLitematicConverter().convert_tile_entity({'id':
+        'minecraft:chest', 'x': 0, 'y': 0, 'z': 0, 'Lock': 'key', 'Count':
+        3, 'Ratio': 0.5, 'Open': True})
+    data = converted['Data']
+    assert type(data['Lock']) is nbtlib.String
+    assert type(data['Count']) is nbtlib.Int
+    assert type(data['Ratio']) is nbtlib.Float
+    assert type(data['Open']) is nbtlib.Byte and data['Open'] == 1